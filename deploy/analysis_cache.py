@@ -0,0 +1,343 @@
+"""
+분석 결과 디스크 캐시
+
+SQLite 파일 하나에 분석 결과를 저장합니다. 프로세스를 재시작해도 유지되고,
+같은 파일을 바라보는 여러 워커(레플리카)가 결과를 함께 씁니다.
+
+- 키: 입력(스크립트, 캡션, 영상 분석 항목, 주제)과 모델, 프롬프트 버전을 정규화해 만든 해시
+- 용량: 전체 크기가 max_bytes 를 넘으면 가장 오래 조회되지 않은 항목부터 삭제 (LRU)
+- 만료: 저장 후 ttl 초가 지난 항목은 없는 것으로 취급
+- 통계: 적중/미스 횟수를 파일에 함께 기록해 모든 워커의 합계를 볼 수 있음
+- 조회는 쓰기 잠금 없이 읽기만 하고, 적중/미스 횟수와 조회 시각(LRU)은 메모리에 모았다가
+  STATS_FLUSH_INTERVAL초 또는 STATS_FLUSH_EVERY번마다 한 번에 기록 (적중이 많아도 서로 기다리지 않음)
+- 전체 크기는 stats 테이블의 bytes 값으로 저장/삭제할 때 함께 갱신 (저장할 때마다 전체를 더하지 않음)
+- 지운 항목(용량/만료/삭제)의 키는 add_evict_listener로 등록한 함수에 알림 (유사 입력 인덱스 정리용)
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from contextlib import closing
+
+from api_config import ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_MAX_BYTES, ANALYSIS_CACHE_TTL
+
+# 메모리에 모아 둔 적중/미스 횟수와 조회 시각을 파일에 기록하는 간격(초)과 조회 횟수
+STATS_FLUSH_INTERVAL = 5.0
+STATS_FLUSH_EVERY = 100
+
+_WHITESPACE = re.compile(r"\s+")
+
+logger = logging.getLogger("reels_benchmark.analysis_cache")
+_evict_listeners = []
+
+
+def add_evict_listener(fn):
+    """
+    캐시에서 항목을 지울 때마다(용량 초과, 만료, delete, clear) fn(지운 키 목록)을 호출하도록 등록
+    fn은 트랜잭션이 끝난 뒤 지운 프로세스에서만 불리고, fn에서 난 예외는 기록만 하고 넘어갑니다.
+    """
+    _evict_listeners.append(fn)
+
+
+def _notify_evicted(keys):
+    if not keys:
+        return
+    for fn in list(_evict_listeners):
+        try:
+            fn(keys)
+        except Exception:
+            logger.exception("캐시에서 지운 항목을 알리지 못했습니다.")
+
+
+def normalize_text(value):
+    """
+    캐시 키 계산용 텍스트 정규화 (유니코드 NFC, 앞뒤 공백 제거, 연속 공백 하나로)
+    """
+    if value is None:
+        return ""
+    value = unicodedata.normalize("NFC", str(value))
+    return _WHITESPACE.sub(" ", value).strip()
+
+
+def make_cache_key(*parts, **fields):
+    """
+    정규화한 입력값으로 내용 기반(content-addressed) 키를 만드는 함수
+    dict 는 키 순서와 관계없이 같은 키가 나오도록 정렬해서 직렬화합니다.
+    """
+    def _normalize(value):
+        if isinstance(value, dict):
+            return {k: _normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [_normalize(v) for v in value]
+        return normalize_text(value)
+
+    payload = json.dumps(
+        {"parts": _normalize(list(parts)), "fields": _normalize(fields)},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, path, max_bytes=ANALYSIS_CACHE_MAX_BYTES, ttl=ANALYSIS_CACHE_TTL):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # 아직 파일에 기록하지 않은 적중/미스 횟수와 {키: 마지막 조회 시각}
+        self._pending_lock = threading.Lock()
+        self._pending = {"hits": 0, "misses": 0}
+        self._accessed = {}
+        self._flushed_at = time.time()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # WAL 모드는 트랜잭션 밖에서 한 번만 켜면 파일에 유지됨
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    structured TEXT,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            # 구조화된 결과(structured) 열이 생기기 전에 만든 캐시 파일
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "structured" not in columns:
+                conn.execute("ALTER TABLE entries ADD COLUMN structured TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+            # 만료 항목 삭제(_evict)가 표 전체를 읽지 않도록
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_created ON entries (created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0)")
+            # 전체 크기 합계 (bytes 값이 생기기 전에 만든 캐시 파일은 한 번만 더함)
+            conn.execute(
+                "INSERT OR IGNORE INTO stats (name, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries"
+            )
+        atexit.register(self.flush)
+
+    def _connect(self):
+        # 스레드마다 따로 연결 (sqlite3 연결은 스레드 간 공유하지 않음)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return _Transaction(conn)
+
+    def _read(self):
+        # 조회는 쓰기 잠금(BEGIN IMMEDIATE) 없이 문장 하나씩 읽음 (WAL이라 저장 중에도 막히지 않음)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return closing(conn)
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and now - created_at >= self.ttl
+
+    def get(self, key):
+        """
+        캐시된 값을 반환 (없거나 만료되었으면 None)
+        만료된 항목은 다음 저장(set) 때 지웁니다.
+        """
+        now = time.time()
+        with self._read() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        hit = row is not None and not self._expired(row[1], now)
+        with self._pending_lock:
+            if hit:
+                self._pending["hits"] += 1
+                self._accessed[key] = now
+            else:
+                self._pending["misses"] += 1
+            due = (sum(self._pending.values()) >= STATS_FLUSH_EVERY
+                   or now - self._flushed_at >= STATS_FLUSH_INTERVAL)
+        if due:
+            self.flush()
+        return json.loads(row[0]) if hit else None
+
+    def _take_pending(self):
+        with self._pending_lock:
+            pending, accessed = self._pending, self._accessed
+            self._pending = {"hits": 0, "misses": 0}
+            self._accessed = {}
+            self._flushed_at = time.time()
+        return pending, accessed
+
+    def _write_pending(self, conn, pending, accessed):
+        # 다른 워커가 더 최근에 조회했으면 그 시각을 유지
+        conn.executemany(
+            "UPDATE entries SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+            [(at, key) for key, at in accessed.items()]
+        )
+        conn.executemany(
+            "UPDATE stats SET value = value + ? WHERE name = ?",
+            [(count, name) for name, count in pending.items() if count]
+        )
+
+    def flush(self):
+        """
+        메모리에 모아 둔 적중/미스 횟수와 조회 시각을 파일에 기록
+        """
+        pending, accessed = self._take_pending()
+        if not (accessed or any(pending.values())):
+            return
+        with self._connect() as conn:
+            self._write_pending(conn, pending, accessed)
+
+    def get_structured(self, key):
+        """
+        값과 함께 저장한 구조화된 결과를 반환 (없거나 만료되었으면 None, 적중 통계에는 넣지 않음)
+        """
+        with self._read() as conn:
+            row = conn.execute(
+                "SELECT structured, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or row[0] is None or self._expired(row[1], time.time()):
+            return None
+        return json.loads(row[0])
+
+    def has(self, key):
+        """
+        만료되지 않은 값이 있는지 (조회 시각과 적중 통계는 바꾸지 않음)
+        """
+        with self._read() as conn:
+            row = conn.execute("SELECT created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        return bool(row) and not self._expired(row[0], time.time())
+
+    def set(self, key, value, structured=None):
+        """
+        값 저장 (structured를 넘기면 화면 표시용 구조화 결과도 같은 항목에 저장)
+        """
+        data = json.dumps(value, ensure_ascii=False)
+        extra = json.dumps(structured, ensure_ascii=False) if structured is not None else None
+        size = len(data.encode("utf-8")) + (len(extra.encode("utf-8")) if extra else 0)
+        now = time.time()
+        pending, accessed = self._take_pending()
+        with self._connect() as conn:
+            # 용량을 넘었을 때 최근에 조회한 항목을 지우지 않도록 모아 둔 조회 시각도 함께 기록
+            self._write_pending(conn, pending, accessed)
+            old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, structured, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, data, extra, size, now, now)
+            )
+            self._add_bytes(conn, size - (old[0] if old else 0))
+            evicted = self._evict(conn, now)
+        _notify_evicted(evicted)
+
+    def delete(self, key):
+        with self._connect() as conn:
+            row = conn.execute("DELETE FROM entries WHERE key = ? RETURNING size", (key,)).fetchone()
+            if row:
+                self._add_bytes(conn, -row[0])
+        if row:
+            _notify_evicted([key])
+
+    def _add_bytes(self, conn, delta):
+        if delta:
+            conn.execute("UPDATE stats SET value = value + ? WHERE name = 'bytes'", (delta,))
+
+    def _evict(self, conn, now):
+        """
+        만료된 항목과 용량을 넘는 만큼의 오래 조회되지 않은 항목을 삭제하고 지운 키 목록을 반환
+        """
+        removed = 0
+        evicted = []
+        if self.ttl is not None:
+            for key, size in conn.execute(
+                "DELETE FROM entries WHERE created_at <= ? RETURNING key, size", (now - self.ttl,)
+            ).fetchall():
+                evicted.append(key)
+                removed += size
+        total = conn.execute("SELECT value FROM stats WHERE name = 'bytes'").fetchone()[0] - removed
+        if self.max_bytes and total > self.max_bytes:
+            # 가장 오래 조회되지 않은 항목부터 용량이 한도 아래로 내려갈 때까지 삭제
+            stale = []
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+                removed += size
+            conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+            evicted += [key for (key,) in stale]
+        self._add_bytes(conn, -removed)
+        return evicted
+
+    def stats(self):
+        """
+        적중/미스 횟수, 항목 수, 전체 크기(바이트)
+        """
+        self.flush()
+        with self._read() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats"))
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            size = counters.get("bytes", 0)
+        lookups = counters.get("hits", 0) + counters.get("misses", 0)
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "hit_rate": counters.get("hits", 0) / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size
+        }
+
+    def clear(self):
+        with self._connect() as conn:
+            keys = [key for (key,) in conn.execute("DELETE FROM entries RETURNING key").fetchall()]
+            conn.execute("UPDATE stats SET value = 0")
+        self._take_pending()
+        _notify_evicted(keys)
+
+
+class _Transaction:
+    """
+    with 블록 하나를 트랜잭션 하나로 묶고, 끝나면 연결을 닫는 래퍼
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    """
+    프로세스 전체에서 공유하는 분석 캐시
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache(ANALYSIS_CACHE_PATH)
+    return _cache
@@ -0,0 +1,250 @@
+"""
+GPT 분석 결과(마크다운)를 구조화된 형태로 읽는 파서
+
+    # 1. 주제:                        -> Section(number=1, title="주제:")
+    - **설명: ...**                    -> Section.description
+    - ✅ **모수**: "누구나 가능합니다"    -> CheckItem(label="모수", passed=True, quotes=["누구나 가능합니다"])
+    ## 카피라이팅 :                    -> 하위 Section (level=2)
+
+AnalysisParser는 스트리밍으로 받은 조각을 feed()로 넘기면 줄 단위로 한 번만 읽고,
+다음 "# " 제목이 나와 끝난 섹션을 바로 돌려주므로 완성된 섹션부터 화면에 그릴 수 있습니다.
+6번 벤치마킹 기획은 자유 형식이므로 제목 아래 내용을 나누지 않고 그대로 보관합니다.
+"""
+import re
+from dataclasses import dataclass, field, asdict
+
+PLANNING_NUMBER = 6
+
+_HEADING = re.compile(r"^(#{1,2})\s+(.*?)\s*$")
+_NUMBERED = re.compile(r"^(\d+)\.\s*(.*)$")
+_CHECK_ITEM = re.compile(r"^\s*[-*]\s*(✅|❌)\s*\*\*(.+?)\*\*\s*:?\s*(.*)$")
+_DESCRIPTION = re.compile(r"^\s*[-*]\s*\*\*설명\s*:\s*(.*?)\*\*\s*$")
+_QUOTE = re.compile(r"\"([^\"]+)\"|“([^”]+)”|'([^']+)'")
+
+
+@dataclass
+class CheckItem:
+    label: str
+    passed: bool
+    text: str
+    quotes: list = field(default_factory=list)
+
+
+@dataclass
+class Section:
+    level: int
+    number: int | None
+    title: str
+    description: str = ""
+    body: str = ""
+    items: list = field(default_factory=list)
+    subsections: list = field(default_factory=list)
+
+    @property
+    def heading(self):
+        number = f"{self.number}. " if self.number is not None else ""
+        return f"{'#' * self.level} {number}{self.title}"
+
+    def all_items(self):
+        """
+        이 섹션과 하위 섹션의 체크리스트 항목 전체
+        """
+        items = list(self.items)
+        for sub in self.subsections:
+            items.extend(sub.all_items())
+        return items
+
+    def to_markdown(self, heading=None):
+        """
+        섹션을 다시 마크다운으로 (heading(section)으로 제목 표시를 바꿀 수 있음)
+        """
+        blocks = [(heading or _plain_heading)(self)]
+        if self.body:
+            blocks.append(self.body)
+        text = "\n".join(blocks)
+        for sub in self.subsections:
+            text += "\n\n" + sub.to_markdown(heading)
+        return text
+
+
+@dataclass
+class ParsedAnalysis:
+    sections: list = field(default_factory=list)
+
+    @property
+    def analysis_sections(self):
+        return [section for section in self.sections if section.number != PLANNING_NUMBER]
+
+    @property
+    def planning(self):
+        for section in self.sections:
+            if section.number == PLANNING_NUMBER:
+                return section
+        return None
+
+    def checklist(self):
+        """
+        [(섹션 제목, CheckItem)] - 1~5번 분석의 ✅/❌ 판단 전체
+        """
+        return [
+            (section.heading, item)
+            for section in self.analysis_sections
+            for item in section.all_items()
+        ]
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(sections=[_section_from_dict(section) for section in data.get("sections", [])])
+
+
+def _section_from_dict(data):
+    data = dict(data)
+    data["items"] = [CheckItem(**item) for item in data.get("items", [])]
+    data["subsections"] = [_section_from_dict(sub) for sub in data.get("subsections", [])]
+    return Section(**data)
+
+
+def _plain_heading(section):
+    return section.heading
+
+
+def _quotes(text):
+    return [next(filter(None, match)) for match in _QUOTE.findall(text)]
+
+
+class _SectionBuilder:
+    # 읽는 중인 섹션 (본문 줄은 목록에 모았다가 끝날 때 한 번만 이어 붙임)
+
+    def __init__(self, level, title):
+        numbered = _NUMBERED.match(title)
+        if numbered:
+            self.section = Section(level, int(numbered.group(1)), numbered.group(2))
+        else:
+            self.section = Section(level, None, title)
+        self.lines = []
+        self.children = []
+
+    def add(self, line):
+        self.lines.append(line)
+        item = _CHECK_ITEM.match(line)
+        if item:
+            rest = item.group(3).strip()
+            self.section.items.append(CheckItem(
+                label=item.group(2).strip(),
+                passed=item.group(1) == "✅",
+                text=rest,
+                quotes=_quotes(rest)
+            ))
+            return
+        description = _DESCRIPTION.match(line)
+        if description and not self.section.description:
+            self.section.description = description.group(1).strip()
+
+    def build(self):
+        self.section.body = "\n".join(self.lines).strip()
+        self.section.subsections = [child.build() for child in self.children]
+        return self.section
+
+    def snapshot(self):
+        # 아직 끝나지 않은 섹션의 현재까지 내용 (스트리밍 표시용, 체크 항목은 빼고 본문만)
+        return Section(self.section.level, self.section.number, self.section.title,
+                       body="\n".join(self.lines).strip(),
+                       subsections=[child.snapshot() for child in self.children])
+
+
+class AnalysisParser:
+    """
+    조각 단위로 받는 분석 결과를 한 번만 훑어 구조화하는 파서
+    feed(조각)은 이번 조각으로 끝난 최상위 섹션 목록을, close()는 남은 섹션을 반환합니다.
+    """
+
+    def __init__(self):
+        self._partial = ""
+        self._sections = []
+        self._current = None
+        self._sub = None
+
+    def feed(self, chunk):
+        if not chunk:
+            return []
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        finished = []
+        for line in lines:
+            section = self._add_line(line)
+            if section is not None:
+                finished.append(section)
+        return finished
+
+    def close(self):
+        finished = []
+        if self._partial:
+            section = self._add_line(self._partial)
+            self._partial = ""
+            if section is not None:
+                finished.append(section)
+        if self._current is not None:
+            finished.append(self._finish())
+        return finished
+
+    def result(self):
+        """
+        지금까지 끝난 섹션으로 만든 ParsedAnalysis (close() 후에 부르면 전체 결과)
+        """
+        return ParsedAnalysis(sections=list(self._sections))
+
+    def current(self):
+        """
+        아직 끝나지 않은 섹션의 현재까지 내용 (다음 줄이 오기 전의 조각 포함), 없으면 None
+        """
+        if self._current is None:
+            return None
+        target = self._sub or self._current
+        target.lines.append(self._partial)
+        try:
+            return self._current.snapshot()
+        finally:
+            target.lines.pop()
+
+    @property
+    def in_planning(self):
+        return self._current is not None and self._current.section.number == PLANNING_NUMBER
+
+    def _add_line(self, line):
+        heading = _HEADING.match(line)
+        # 6번 기획 안의 제목은 기획 본문의 일부
+        if heading and not self.in_planning:
+            level, title = len(heading.group(1)), heading.group(2)
+            if level == 1:
+                finished = self._finish() if self._current is not None else None
+                self._current = _SectionBuilder(1, title)
+                return finished
+            if self._current is not None:
+                self._sub = _SectionBuilder(2, title)
+                self._current.children.append(self._sub)
+                return None
+        if self._current is None:
+            # 첫 제목 전의 머리말은 버림
+            return None
+        (self._sub or self._current).add(line)
+        return None
+
+    def _finish(self):
+        section = self._current.build()
+        self._sections.append(section)
+        self._current = None
+        self._sub = None
+        return section
+
+
+def parse_analysis(text):
+    """
+    분석 결과 전체 텍스트를 한 번에 구조화
+    """
+    parser = AnalysisParser()
+    parser.feed(text)
+    parser.close()
+    return parser.result()
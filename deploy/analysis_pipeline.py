@@ -0,0 +1,278 @@
+"""
+동기(reels_extraction)/비동기(async_analysis) 분석 파이프라인이 함께 쓰는 부분
+
+두 파이프라인은 실행 방식(스레드 풀/asyncio 작업)만 다르고 아래는 같아야 서로의 캐시 결과를 재사용합니다.
+- 요청 메시지와 캐시 키 (릴스 분석, 주제별 기획, 긴 스크립트 구간 정리)
+- 캐시 미스로 받는 조각의 구조화(파서)와 캐시 적중/미스/합쳐짐 지표 (CachedJob)
+- 동시에 받은 조각을 순서대로 이어 붙이는 규칙 (OrderedMerge)
+- 스트림 조각에서 본문과 토큰 사용량을 꺼내는 방법
+- SINGLE_FLIGHT_MODE에 맞는 single-flight (file이면 두 파이프라인이 같은 잠금 파일을 씀)
+"""
+import tempfile
+import time
+from pathlib import Path
+
+import metrics
+from analysis_cache import make_cache_key
+from analysis_parser import AnalysisParser, ParsedAnalysis, parse_analysis
+from api_config import SINGLE_FLIGHT_MODE, TRANSCRIPT_CHUNK_MODEL
+from lecture_index import lecture_fingerprint, retrieve_passages
+from prompts import (
+    ANALYSIS_PROMPT,
+    CHUNK_PROMPT_VERSION,
+    NO_TOPIC_MESSAGE,
+    PLANNING_HEADER,
+    count_message_tokens,
+    lecture_query,
+    output_budget,
+)
+from single_flight import AsyncFileLockSingleFlight, AsyncSingleFlight, FileLockSingleFlight, SingleFlight
+
+ANALYSIS_MODEL = "gpt-4o"
+# 프롬프트(prompts.ANALYSIS_PROMPT)를 바꾸면 버전을 올려서 이전 프롬프트의 캐시 결과를 쓰지 않게 함
+PROMPT_VERSION = ANALYSIS_PROMPT.version
+
+# 분석을 나누는 단위 (순서대로 이어 붙이면 display_analysis_results가 기대하는 1~6번 순서가 됨)
+ANALYSIS_PARTS = ANALYSIS_PROMPT.all_parts
+# 주제와 무관하게 릴스 입력만으로 작성하는 1~5번 항목
+REEL_PARTS = ("topic", "intro", "content")
+# 주제가 없을 때 기획 요청 대신 넣는 안내 문구
+NO_TOPIC_PLANNING = f"{PLANNING_HEADER}\n{NO_TOPIC_MESSAGE}"
+
+# SINGLE_FLIGHT_MODE=file 일 때 워커끼리 함께 쓰는 잠금 파일 디렉토리
+LOCK_DIR = Path(tempfile.gettempdir()) / "reels_benchmark" / "locks"
+
+
+def new_single_flight():
+    """
+    동기 파이프라인용 single-flight (thread: 프로세스 안에서만, file: 같은 서버의 워커끼리도)
+    """
+    if SINGLE_FLIGHT_MODE == "file":
+        return FileLockSingleFlight(LOCK_DIR)
+    return SingleFlight()
+
+
+def new_async_single_flight():
+    """
+    비동기 파이프라인용 single-flight (new_single_flight와 같은 잠금 파일을 씀)
+    """
+    if SINGLE_FLIGHT_MODE == "file":
+        return AsyncFileLockSingleFlight(LOCK_DIR)
+    return AsyncSingleFlight()
+
+
+def build_analysis_messages(info, input_data, parts=ANALYSIS_PARTS, checked_items=()):
+    """
+    분석 요청 메시지 생성
+    parts로 일부 항목만 지정하면 해당 항목만 작성하도록 요청합니다.
+    기획만 따로 요청할 때는 checked_items(planning_checklist)로 1~5번 분석의 ✅ 항목을 함께 넘깁니다.
+    """
+    passages = retrieve_passages(lecture_query(info, input_data, parts))
+    return ANALYSIS_PROMPT.build(info, input_data, parts, lecture_passages=passages,
+                                 checked_items=checked_items)
+
+
+def build_analysis_request(info, input_data, parts=ANALYSIS_PARTS, checked_items=()):
+    """
+    분석 요청 메시지와 요청한 항목에 맞춘 max_tokens
+    반환: (messages, max_tokens, 입력 토큰 수)
+    """
+    messages = build_analysis_messages(info, input_data, parts, checked_items)
+    input_tokens = count_message_tokens(messages)
+    return messages, output_budget(parts, info, input_tokens), input_tokens
+
+
+def chunk_cache_key(chunk, index, total, max_tokens):
+    return make_cache_key(
+        section="chunk",
+        chunk=chunk,
+        index=index,
+        total=total,
+        max_tokens=max_tokens,
+        model=TRANSCRIPT_CHUNK_MODEL,
+        prompt_version=CHUNK_PROMPT_VERSION
+    )
+
+
+def reel_cache_key(info, input_data, mode):
+    # 1~5번 분석은 주제와 무관하므로 릴스 입력만으로 키를 만듦
+    return make_cache_key(
+        section="reel",
+        transcript=info['refined_transcript'],
+        caption=info['caption'],
+        video_analysis=input_data['video_analysis'],
+        model=ANALYSIS_MODEL,
+        prompt_version=PROMPT_VERSION,
+        lecture=lecture_fingerprint(),
+        mode=mode
+    )
+
+
+def planning_cache_key(info, input_data):
+    return make_cache_key(
+        section="planning",
+        transcript=info['refined_transcript'],
+        caption=info['caption'],
+        video_analysis=input_data['video_analysis'],
+        topic=input_data['content_info']['topic'],
+        model=ANALYSIS_MODEL,
+        prompt_version=PROMPT_VERSION,
+        lecture=lecture_fingerprint()
+    )
+
+
+def planning_checklist(reel_text, structured=None):
+    """
+    기획 프롬프트에 넣을 1~5번 분석의 ✅ 항목 ("**항목명**: 설명", 중복 제외)
+    structured: 캐시에 함께 저장한 구조화된 결과 (없으면 reel_text를 다시 읽음)
+    """
+    parsed = ParsedAnalysis.from_dict(structured) if structured else parse_analysis(reel_text)
+    items = []
+    for _, item in parsed.checklist():
+        line = f"**{item.label}**: {item.text}" if item.text else f"**{item.label}**"
+        if item.passed and line not in items:
+            items.append(line)
+    return items
+
+
+def completion_params(messages, max_tokens, model, timeout):
+    # 스트리밍 요청 인자 (마지막 조각으로 토큰 사용량(usage)을 받음)
+    return {
+        "model": model,
+        "messages": messages,
+        "temperature": 0,
+        "max_tokens": max_tokens,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+        "timeout": timeout
+    }
+
+
+def completion_delta(chunk, call):
+    """
+    스트림 조각 하나의 토큰 사용량을 call(metrics.UpstreamCall)에 기록하고 본문 조각을 반환 (없으면 None)
+    """
+    if chunk.usage:
+        call.usage(chunk.usage)
+    if not chunk.choices:
+        return None
+    delta = chunk.choices[0].delta.content
+    if not delta:
+        return None
+    call.token()
+    return delta
+
+
+class CachedJob:
+    """
+    캐시된 섹션 하나를 계산하는 _cached_job 한 번의 상태
+
+    캐시 조회/저장과 실행(스레드, 코루틴)은 각 파이프라인이 맡고, 여기서는 대기 시간과
+    캐시 적중/미스/합쳐짐 지표, 받는 조각의 구조화를 맡습니다. parse=False이면 구조화하지 않습니다.
+    (스크립트 구간 정리)
+    """
+
+    def __init__(self, section, parse=True):
+        self.section = section
+        self.parse = parse
+        self.ran = False
+        self.streamed = False
+        self.started = time.perf_counter()
+        self._chunks = []
+        self._parser = None
+
+    def begin(self):
+        # single-flight에서 이 호출이 실행을 맡음 (잠금을 기다린 시간까지 대기 시간으로 기록)
+        self.ran = True
+        metrics.observe_stage("queue", time.perf_counter() - self.started)
+
+    def lookup(self, cached):
+        """
+        캐시 조회 결과를 기록하고 적중이면 True (미스면 새로 받을 조각을 구조화할 준비)
+        """
+        if cached is not None:
+            metrics.record_cache(self.section, "hit")
+            return True
+        metrics.record_cache(self.section, "miss")
+        if self.parse:
+            self._parser = AnalysisParser()
+        return False
+
+    def feed(self, delta):
+        # 받는 조각을 그대로 파서에 넘겨 결과를 다시 읽지 않고 구조화
+        self.streamed = True
+        self._chunks.append(delta)
+        if self._parser is not None:
+            with metrics.stage("parse"):
+                self._parser.feed(delta)
+
+    def finish(self, text=None):
+        """
+        캐시에 넣을 (텍스트, 구조화된 결과) - text를 주지 않으면 받은 조각을 이어 붙임
+        """
+        text = ("".join(self._chunks) if text is None else text).strip()
+        if self._parser is None:
+            return text, None
+        with metrics.stage("parse"):
+            self._parser.close()
+            return text, self._parser.result().to_dict()
+
+    def joined(self):
+        # 실행을 마친 뒤: 다른 호출의 결과를 기다려 받았으면 합쳐진 것으로 기록
+        if not self.ran:
+            metrics.observe_stage("queue", time.perf_counter() - self.started)
+            metrics.record_cache(self.section, "coalesced")
+
+
+class OrderedMerge:
+    """
+    동시에 실행하는 job들의 조각을 job 순서대로 이어 붙임 (동기/비동기 _merge_ordered 공용)
+
+    앞 순서의 job이 끝나기 전까지 뒤 job의 조각은 모아두었다가, 차례가 오면 한꺼번에 on_delta로 내보냅니다.
+    그래서 on_delta에는 항상 최종 텍스트의 앞부분부터 순서대로 전달됩니다.
+    """
+
+    def __init__(self, count, on_delta=None):
+        self.on_delta = on_delta
+        self._outputs = [[] for _ in range(count)]
+        self._results = [None] * count
+        self._finished = [False] * count
+        self._cursor = 0
+        self._flushed = 0
+
+    @property
+    def done(self):
+        return self._cursor >= len(self._outputs)
+
+    def handle(self, index, kind, value):
+        """
+        job에서 받은 이벤트 하나를 반영하고 차례가 된 조각을 내보냄
+        kind: "delta"(조각), "done"(결과), "error"(예외 - 그대로 던짐)
+        """
+        if kind == "error":
+            raise value
+        if kind == "delta":
+            self._outputs[index].append(value)
+        else:
+            self._finished[index] = True
+            self._results[index] = value
+
+        # 현재 차례인 job의 새 조각을 내보내고, 끝났으면 다음 job으로 넘어감
+        while not self.done:
+            pending = self._outputs[self._cursor][self._flushed:]
+            if pending:
+                self._emit("".join(pending))
+                self._flushed = len(self._outputs[self._cursor])
+            if not self._finished[self._cursor]:
+                break
+            self._cursor += 1
+            self._flushed = 0
+            if not self.done:
+                self._emit("\n\n")
+
+    def _emit(self, text):
+        if self.on_delta:
+            self.on_delta(text)
+
+    def text(self):
+        return "\n\n".join(result.strip() for result in self._results)
@@ -1,4 +1,6 @@
 import os
+import tempfile
+from pathlib import Path
 from dotenv import load_dotenv
 
 # .env 파일 로드
@@ -6,11 +8,147 @@ load_dotenv()
 
 # API 설정
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# 로컬 테스트 서버 등 OpenAI 호환 엔드포인트를 쓸 때만 지정 (예: http://127.0.0.1:8765/v1)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+
+# OpenAI 연결 풀 설정 (프로세스 전체에서 클라이언트 하나를 공유)
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "120"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "120"))
+# h2 패키지가 설치되어 있을 때만 HTTP/2 사용
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "1") == "1"
+# 앱 시작 시 미리 OpenAI 연결을 맺어둘지 여부
+OPENAI_WARMUP = os.getenv("OPENAI_WARMUP", "0") == "1"
+
+# OpenAI 호출 지연/실패 대응 (resilience.py)
+# 요청 하나의 마감 시간(초), 최대 시도 횟수, 재시도 대기 시간(지수 백오프 + 지터)
+OPENAI_DEADLINE = float(os.getenv("OPENAI_DEADLINE", "180"))
+OPENAI_MAX_ATTEMPTS = int(os.getenv("OPENAI_MAX_ATTEMPTS", "4"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "20"))
+# 첫 토큰이 최근 지연의 N 백분위보다 늦으면 같은 요청을 하나 더 보냄 (비용이 늘 수 있어 기본은 끔)
+OPENAI_HEDGE = os.getenv("OPENAI_HEDGE", "0") == "1"
+OPENAI_HEDGE_PERCENTILE = float(os.getenv("OPENAI_HEDGE_PERCENTILE", "95"))
+
+# GPT 응답을 토큰 단위로 스트리밍해서 표시할지 여부
+STREAM_ANALYSIS = os.getenv("STREAM_ANALYSIS", "1") == "1"
+
+# 분석 결과 디스크 캐시 (여러 워커가 공유하려면 같은 볼륨의 경로를 지정)
+ANALYSIS_CACHE_PATH = os.getenv(
+    "ANALYSIS_CACHE_PATH",
+    str(Path(tempfile.gettempdir()) / "reels_benchmark" / "analysis_cache.sqlite3")
+)
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_MB", "256")) * 1024 * 1024
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+
+# reels_info CSV를 읽은 결과(Parquet)를 저장할 폴더
+ANALYTICS_CACHE_DIR = os.getenv(
+    "ANALYTICS_CACHE_DIR",
+    str(Path(tempfile.gettempdir()) / "reels_benchmark" / "analytics")
+)
+
+# 수집 시각별 reels_info 스냅샷을 합쳐 두는 시계열 저장소
+SNAPSHOT_DB_PATH = os.getenv(
+    "SNAPSHOT_DB_PATH",
+    str(Path(tempfile.gettempdir()) / "reels_benchmark" / "snapshots.sqlite3")
+)
+
+# 릴스 강의 정리에서 관련 구간을 찾아 프롬프트에 넣을지 여부와 넣을 구간 수
+LECTURE_CONTEXT = os.getenv("LECTURE_CONTEXT", "1") == "1"
+LECTURE_TOP_K = int(os.getenv("LECTURE_TOP_K", "3"))
+LECTURE_NOTES_PATH = os.getenv(
+    "LECTURE_NOTES_PATH",
+    str(Path(__file__).parent.parent / "릴스 강의_정리.csv")
+)
+LECTURE_INDEX_PATH = os.getenv(
+    "LECTURE_INDEX_PATH",
+    str(Path(tempfile.gettempdir()) / "reels_benchmark" / "lecture_index.bin")
+)
+
+# 끝난 분석의 입력/결과를 검색할 수 있게 남겨 두는 기록 저장소 (history_store.py)
+HISTORY_DB_PATH = os.getenv(
+    "HISTORY_DB_PATH",
+    str(Path(tempfile.gettempdir()) / "reels_benchmark" / "history.sqlite3")
+)
+
+# 조금만 고친 입력(띄어쓰기, 해시태그, 오타)의 이전 분석을 찾아 재사용할지 여부,
+# 재사용할 최소 유사도(스크립트+캡션 글자 3-gram Jaccard 추정값)와 서명 저장 파일
+NEAR_DUPLICATE = os.getenv("NEAR_DUPLICATE", "1") == "1"
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+NEAR_DUPLICATE_PATH = os.getenv(
+    "NEAR_DUPLICATE_PATH",
+    str(Path(tempfile.gettempdir()) / "reels_benchmark" / "near_duplicates.sqlite3")
+)
+
+# 스크립트가 이 토큰 수를 넘으면 구간별로 나눠 정리한 뒤 분석 (map-reduce)
+TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", "6000"))
+TRANSCRIPT_CHUNK_TOKENS = int(os.getenv("TRANSCRIPT_CHUNK_TOKENS", "1500"))
+# 구간 정리에 쓰는 모델 (요약/인용만 하므로 작은 모델로 비용을 줄임)
+TRANSCRIPT_CHUNK_MODEL = os.getenv("TRANSCRIPT_CHUNK_MODEL", "gpt-4o-mini")
+
+# 영상 처리 (ffmpeg 실행 파일, 동시에 처리할 영상 수, 음성 인식 방식: "stub" 또는 "openai")
+FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", str(min(8, os.cpu_count() or 2))))
+TRANSCRIBER_BACKEND = os.getenv("TRANSCRIBER_BACKEND", "stub")
+MEDIA_DIR = os.getenv(
+    "MEDIA_DIR",
+    str(Path(tempfile.gettempdir()) / "reels_benchmark" / "media")
+)
+
+# 내려받은 영상 원본 저장소 (내용 해시로 저장, 전체 크기가 한도를 넘으면 오래 안 쓴 영상부터 삭제)
+MEDIA_CACHE_DIR = os.getenv(
+    "MEDIA_CACHE_DIR",
+    str(Path(tempfile.gettempdir()) / "reels_benchmark" / "blobs")
+)
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+# 분석 구간별 지연/토큰 지표 (metrics.py): 분석마다 JSON 로그 한 줄을 stderr에 남길지 여부,
+# Streamlit 앱에서 /metrics를 응답할 포트 (0이면 열지 않음, API 서버는 GET /metrics로 제공)
+METRICS_JSON_LOG = os.getenv("METRICS_JSON_LOG", "1") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# 분석을 백그라운드 작업(job_queue.py)으로 실행할지 여부, 작업 저장소, 동시에 실행할 작업 수,
+# 사용자 한 명이 동시에 실행할 수 있는 작업 수(0이면 제한 없음),
+# 이 시간(초) 동안 진행 기록이 없는 실행 중 작업은 멈춘 것으로 보고 다시 실행
+BACKGROUND_JOBS = os.getenv("BACKGROUND_JOBS", "1") == "1"
+JOB_DB_PATH = os.getenv(
+    "JOB_DB_PATH",
+    str(Path(tempfile.gettempdir()) / "reels_benchmark" / "jobs.sqlite3")
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PER_OWNER = int(os.getenv("JOB_MAX_PER_OWNER", "2"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "120"))
+
+# API 서버(api_server.py) 호출자 키: "키:이름"을 쉼표로 구분 (예: "k1:crm,k2:batch")
+# 설정하면 분석/작업/기록 요청에 Authorization: Bearer <키> 헤더가 필요하고, 작업 공정성과 분석 기록의
+# 사용자는 키의 이름으로 정함. 비우면 접속한 주소(X-Forwarded-For가 아닌 연결 주소)로 구분
+API_KEYS = dict(
+    (key.strip(), name.strip())
+    for key, _, name in (item.partition(":") for item in os.getenv("API_KEYS", "").split(","))
+    if key.strip() and name.strip()
+)
+
+# 주제를 입력하는 동안 1~5번 릴스 분석을 미리 해 둘지 여부 (speculation.py, 기본은 꺼짐)
+# 켜면(SPECULATIVE_ANALYSIS=1) 사용자가 분석 버튼을 누르지 않아도 OpenAI를 호출하므로 취소되거나
+# 쓰이지 않은 미리 분석만큼 비용이 늘어남 (reels_speculations_total 지표의 결과별 횟수를 보고 켤지 정함)
+# 릴스 입력이 이 시간(초) 동안 바뀌지 않으면 시작하고, 세션당/전체 시간당 미리 분석 횟수는 한도까지만
+SPECULATIVE_ANALYSIS = os.getenv("SPECULATIVE_ANALYSIS", "0") == "1"
+SPECULATION_DELAY = float(os.getenv("SPECULATION_DELAY", "3"))
+SPECULATION_MAX_PER_SESSION = int(os.getenv("SPECULATION_MAX_PER_SESSION", "3"))
+SPECULATION_MAX_PER_HOUR = int(os.getenv("SPECULATION_MAX_PER_HOUR", "30"))
+
+# 분석 실행 방식: "single"(한 번에 요청) 또는 "fanout"(항목별로 나눠 동시에 요청)
+ANALYSIS_EXECUTION_MODE = os.getenv("ANALYSIS_EXECUTION_MODE", "single")
+
+# 같은 분석 요청 합치기 범위: "thread"(프로세스 내부) 또는 "file"(같은 호스트의 여러 프로세스)
+SINGLE_FLIGHT_MODE = os.getenv("SINGLE_FLIGHT_MODE", "thread")
 
 def get_api_config():
     if not OPENAI_API_KEY:
         raise ValueError("API 설정이 없습니다. .env 파일을 확인해주세요.")
     
     return {
-        "api_key": OPENAI_API_KEY
-    } 
\ No newline at end of file
+        "api_key": OPENAI_API_KEY,
+        "base_url": OPENAI_BASE_URL
+    }
@@ -0,0 +1,282 @@
+"""
+릴스 벤치마킹 분석 HTTP API (FastAPI)
+
+Streamlit 화면 없이 스크립트나 다른 서비스에서 분석을 요청할 때 사용합니다.
+입력 양식은 app.py의 get_cached_analysis와 같고, 분석 캐시도 함께 씁니다.
+
+    uvicorn api_server:app --app-dir deploy --port 8000
+
+- POST /analyze         분석 결과를 JSON으로 반환
+- POST /analyze/stream  분석 결과를 SSE(text/event-stream)로 스트리밍
+- POST /jobs            분석을 백그라운드 작업으로 넣고 작업 번호를 바로 반환
+- GET  /jobs/{job_id}   작업 상태 (대기 순서, 진행 중인 응답, 결과)
+- GET  /history         호출자의 지난 분석 기록 검색 (최신순, next_cursor로 다음 페이지)
+- GET  /history/{id}    호출자의 지난 분석 결과 다시 열기 (LLM 호출 없음)
+- GET  /cache/stats     분석 캐시 적중/미스 통계
+- GET  /pool/stats      OpenAI 연결 풀 상태 (연결 재사용 확인용)
+- GET  /metrics         구간별 지연/토큰/캐시 지표 (Prometheus 텍스트 형식)
+- GET  /reels/{shortcode}/growth  스냅샷 저장소의 릴스 성장 곡선 (시간당 조회수/좋아요 증가량)
+- GET  /healthz         상태 확인
+
+API_KEYS를 설정하면 분석/작업/기록 요청에 Authorization: Bearer <키> 헤더가 필요합니다.
+작업의 사용자별 공정성(JOB_MAX_PER_OWNER)과 분석 기록의 사용자는 요청 본문이 아니라 서버가 정하고 (caller_owner),
+분석 기록은 그 사용자의 것만 보여 줍니다. (앱 로그인 사용자의 user:<이메일> 기록은 API로 읽을 수 없음)
+"""
+import asyncio
+import hmac
+import json
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from analysis_cache import get_analysis_cache
+from api_config import API_KEYS, OPENAI_WARMUP, BACKGROUND_JOBS
+from async_analysis import analyze_async
+from history_store import PAGE_SIZE, get_history_store, record_analysis
+from job_queue import get_job_queue
+import metrics
+from openai_client import close_async_openai_client, pool_stats, warm_up_async_openai_client
+from reels_extraction import analysis_structure, extract_reels_info, find_similar_analysis
+from snapshot_store import get_snapshot_store
+
+
+class VideoAnalysis(BaseModel):
+    transcript: str = ""
+    caption: str = ""
+    intro_copy: str = ""
+    intro_structure: str = ""
+    narration: str = ""
+    music: str = ""
+    font: str = ""
+
+
+class ContentInfo(BaseModel):
+    topic: str = ""
+
+
+class AnalysisRequest(BaseModel):
+    video_analysis: VideoAnalysis
+    content_info: ContentInfo = ContentInfo()
+    mode: str | None = None
+    # 정확히 같은 입력의 분석이 없을 때 조금만 다른 입력의 이전 분석을 대신 돌려줘도 되는지
+    allow_approximate: bool = False
+
+
+class AnalysisResponse(BaseModel):
+    analysis: str
+    reels_info: dict
+    # 섹션별 ✅/❌ 판단과 인용 근거 (analysis_parser.ParsedAnalysis.to_dict())
+    structured: dict
+    # 이전 분석을 재사용한 근사 결과이면 그 입력과의 유사도 (새로 분석했으면 None)
+    approximate: float | None = None
+
+
+class JobRequest(AnalysisRequest):
+    # 여러 주제로 한 번에 기획할 때의 주제 목록 (비우면 content_info.topic 하나)
+    topics: list[str] = []
+    priority: int = 0
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if OPENAI_WARMUP:
+        await warm_up_async_openai_client()
+    if BACKGROUND_JOBS:
+        # 재시작 전에 남은 작업을 이어서 실행
+        await asyncio.to_thread(get_job_queue)
+    yield
+    await close_async_openai_client()
+
+
+app = FastAPI(title="릴스 벤치마킹 스튜디오 API", lifespan=lifespan)
+
+
+def caller_owner(request: Request):
+    """
+    작업 공정성과 분석 기록에 쓰는 호출자 (요청 본문이나 프록시 헤더처럼 호출자가 바꿀 수 있는 값은 쓰지 않음)
+    API_KEYS를 설정했으면 Bearer 키의 이름, 아니면 연결한 주소
+    """
+    if API_KEYS:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer":
+            for key, name in API_KEYS.items():
+                if hmac.compare_digest(token.strip().encode("utf-8"), key.encode("utf-8")):
+                    return f"api:{name}"
+        raise HTTPException(status_code=401, detail="API 키가 필요합니다.", headers={"WWW-Authenticate": "Bearer"})
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _input_data(request):
+    return {
+        "video_analysis": request.video_analysis.model_dump(),
+        "content_info": request.content_info.model_dump()
+    }
+
+
+async def _similar_response(request, input_data, reels_info):
+    # allow_approximate 요청에서 비슷한 이전 분석이 있으면 응답 dict, 없으면 None
+    if not request.allow_approximate:
+        return None
+    similar = await asyncio.to_thread(find_similar_analysis, reels_info, input_data, request.mode)
+    if similar is None:
+        return None
+    return {
+        "analysis": similar["analysis"],
+        "reels_info": reels_info,
+        "structured": similar["structured"].to_dict(),
+        "approximate": similar["similarity"]
+    }
+
+
+@app.post("/analyze", response_model=AnalysisResponse)
+async def analyze(request: AnalysisRequest, owner: str = Depends(caller_owner)):
+    with metrics.trace_analysis("api"):
+        input_data = _input_data(request)
+        reels_info = extract_reels_info(input_data)
+        similar = await _similar_response(request, input_data, reels_info)
+        if similar is not None:
+            return similar
+        try:
+            analysis = await analyze_async(reels_info, input_data, mode=request.mode)
+        except Exception as e:
+            metrics.record_error(e)
+            raise HTTPException(status_code=502, detail=f"분석 중 오류가 발생했습니다: {e}")
+        structured = await asyncio.to_thread(analysis_structure, reels_info, input_data, request.mode)
+        await asyncio.to_thread(record_analysis, input_data, analysis, structured, reels_info, owner)
+    return {"analysis": analysis, "reels_info": reels_info, "structured": structured.to_dict()}
+
+
+def _sse(data, event=None):
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(request: AnalysisRequest, owner: str = Depends(caller_owner)):
+    """
+    조각마다 data: {"delta": ...} 이벤트를 보내고,
+    끝나면 event: done 으로 완성된 결과를, 실패하면 event: error 를 보냅니다.
+    allow_approximate 요청에서 비슷한 이전 분석을 찾으면 조각 없이 done(approximate 포함)만 보냅니다.
+    """
+    input_data = _input_data(request)
+    reels_info = extract_reels_info(input_data)
+    # 보낼 SSE 이벤트 문자열 (None이면 끝)
+    deltas = asyncio.Queue()
+
+    async def run():
+        with metrics.trace_analysis("api_stream"):
+            await send_events()
+        deltas.put_nowait(None)
+
+    async def send_events():
+        try:
+            similar = await _similar_response(request, input_data, reels_info)
+            if similar is not None:
+                deltas.put_nowait(_sse(similar, event="done"))
+                return
+            analysis = await analyze_async(
+                reels_info, input_data,
+                on_delta=lambda delta: deltas.put_nowait(_sse({"delta": delta})),
+                mode=request.mode
+            )
+            structured = await asyncio.to_thread(analysis_structure, reels_info, input_data, request.mode)
+            await asyncio.to_thread(record_analysis, input_data, analysis, structured, reels_info, owner)
+            deltas.put_nowait(_sse({
+                "analysis": analysis,
+                "reels_info": reels_info,
+                "structured": structured.to_dict()
+            }, event="done"))
+        except Exception as e:
+            metrics.record_error(e)
+            deltas.put_nowait(_sse({"error": f"분석 중 오류가 발생했습니다: {e}"}, event="error"))
+
+    async def events():
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                item = await deltas.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest, owner: str = Depends(caller_owner)):
+    input_data = _input_data(request)
+    topics = request.topics or ([input_data["content_info"]["topic"]] if input_data["content_info"]["topic"] else [])
+    payload = {"input_data": input_data, "topics": topics, "mode": request.mode, "owner": owner}
+    job_id = await asyncio.to_thread(get_job_queue().submit, payload, owner, request.priority)
+    return {"job_id": job_id}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="없는 작업입니다.")
+    return job
+
+
+@app.get("/history")
+async def history(q: str = "", topic: str | None = None, since: float | None = None, until: float | None = None,
+                  cursor: int | None = None, limit: int = PAGE_SIZE, owner: str = Depends(caller_owner)):
+    """
+    q: 캡션/나레이션/주제 검색어, since/until: 기록 시각(유닉스 초) 범위, cursor: 이전 응답의 next_cursor
+    """
+    items, next_cursor = await asyncio.to_thread(
+        get_history_store().search, q, owner=owner, topic=topic, since=since, until=until,
+        cursor=cursor, limit=max(1, min(limit, 100))
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@app.get("/history/{row_id}")
+async def history_entry(row_id: int, owner: str = Depends(caller_owner)):
+    entry = await asyncio.to_thread(get_history_store().get, row_id)
+    # 다른 사용자의 기록은 있는지도 알리지 않음
+    if entry is None or entry["owner"] != owner:
+        raise HTTPException(status_code=404, detail="없는 분석 기록입니다.")
+    return entry
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return await asyncio.to_thread(get_analysis_cache().stats)
+
+
+@app.get("/pool/stats")
+async def openai_pool_stats():
+    return pool_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/reels/{shortcode}/growth")
+async def reel_growth(shortcode: str):
+    curve = await asyncio.to_thread(get_snapshot_store().growth, shortcode)
+    if not curve:
+        raise HTTPException(status_code=404, detail="저장된 스냅샷이 없는 릴스입니다.")
+    return {"shortcode": shortcode, "points": curve}
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000)
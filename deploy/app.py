@@ -1,17 +1,15 @@
 import streamlit as st
-import pandas as pd
-from pathlib import Path
-import json
-from datetime import datetime
 import os
 from dotenv import load_dotenv
-import openai
-from api_config import get_api_config
-from reels_extraction import analyze_with_gpt4
-import requests
-import re
+from api_config import STREAM_ANALYSIS, OPENAI_WARMUP, METRICS_PORT, BACKGROUND_JOBS, SPECULATIVE_ANALYSIS
+import metrics
+import hashlib
+from analysis_parser import AnalysisParser, ParsedAnalysis, PLANNING_NUMBER, parse_analysis
 import time
-from urllib.parse import urlparse
+import uuid
+
+# openai/tiktoken(reels_extraction), pandas(reels_analytics), 영상 처리(media_pipeline)는
+# 불러오는 데만 1초 넘게 걸리므로, 첫 화면은 바로 띄우고 해당 기능을 처음 쓸 때 함수 안에서 불러옵니다.
 
 # .env 파일 로드
 load_dotenv()
@@ -19,6 +17,26 @@ load_dotenv()
 # API 설정
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# 스트리밍 중 화면 갱신 최소 간격 (초)
+STREAM_RENDER_INTERVAL = 0.1
+
+# 백그라운드 작업의 진행 상황을 다시 읽는 간격 (초)
+JOB_POLL_INTERVAL = 1.0
+
+# 지난 분석 기록의 기간 필터 (최근 며칠, None이면 전체)
+HISTORY_PERIODS = {"전체": None, "최근 7일": 7, "최근 30일": 30, "최근 90일": 90}
+
+# 분석 결과 제목 앞에 붙일 아이콘
+SECTION_ICONS = {
+    "# 1. 주제:": "🎯",
+    "# 2. 초반 3초": "⚡",
+    "## 카피라이팅 :": "✍️",
+    "## 영상 구성 :": "🎬",
+    "# 3. 내용 구성:": "📋",
+    "# 4. 개선할 점:": "🔍",
+    "# 5. 적용할 점:": "✨"
+}
+
 # 페이지 기본 설정
 st.set_page_config(
     page_title="✨ 릴스 벤치마킹 스튜디오",
@@ -26,8 +44,8 @@ st.set_page_config(
     layout="centered"
 )
 
-# 스타일 설정
-st.markdown("""
+# 스타일 설정 (main()에서 화면을 처음부터 다시 그릴 때마다 한 번만 보냄)
+PAGE_STYLE = """
     <style>
     /* 전체 페이지 스타일 */
     .main {
@@ -211,125 +229,527 @@ st.markdown("""
     .step-container {
         margin-bottom: 20px;
     }
+
+    /* 전체 컨테이너 스타일 */
+    .main {
+        background-color: #FFFFFF;
+        border-radius: 20px;
+        padding: 2rem;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    }
+    
+    /* 메인 타이틀 스타일 수정 */
+    .main-title {
+        text-align: center;
+        font-size: 2.5rem;
+        font-weight: 700;
+        color: #1c1c1e;
+        margin: 2rem 0;
+        padding: 1rem 0;
+    }
+    
+    /* 분석 시작 버튼 (폼 제출 버튼) */
+    div.stButton > button, div.stFormSubmitButton > button {
+        width: 100%;
+        background: linear-gradient(45deg, #405DE6, #5851DB) !important;
+        color: white !important;
+        border: none !important;
+        border-radius: 12px !important;
+        padding: 0.5rem 2rem !important;
+        font-weight: 600 !important;
+        transition: all 0.3s ease !important;
+    }
+    
+    div.stButton > button:hover, div.stFormSubmitButton > button:hover {
+        transform: translateY(-2px) !important;
+        box-shadow: 0 4px 12px rgba(64,93,230,0.2) !important;
+    }
+    
+    /* 분석 결과 타이틀 */
+    .benchmark-analysis-title {
+        font-size: 2.2rem;
+        font-weight: 700;
+        color: #405DE6;
+        text-align: center;
+        margin: 2.5rem auto;
+        padding: 1rem 0;
+        border-bottom: 3px solid #405DE6;
+        width: 100%;
+        background: linear-gradient(to right, transparent, #F0F2FF, transparent);
+    }
     </style>
     
     <div class="brand-logo">HANSHIN GROUP</div>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource(show_spinner=False)
+def _warm_up_openai():
+    """
+    서버 프로세스당 한 번만 OpenAI 연결을 미리 맺어둠
+    """
+    from openai_client import warm_up_openai_client
+    return warm_up_openai_client()
+
+if OPENAI_WARMUP:
+    _warm_up_openai()
+
+@st.cache_resource(show_spinner=False)
+def _start_metrics_server():
+    """
+    서버 프로세스당 한 번만 /metrics 응답용 HTTP 서버를 띄움
+    """
+    return metrics.start_metrics_server(METRICS_PORT)
+
+if METRICS_PORT:
+    _start_metrics_server()
+
+@st.cache_resource(show_spinner=False)
+def _start_job_queue():
+    """
+    서버 프로세스당 한 번만 작업 스레드를 띄움 (재시작 전에 남은 작업도 이어서 실행)
+    """
+    from job_queue import get_job_queue
+    return get_job_queue()
+
+if BACKGROUND_JOBS:
+    _start_job_queue()
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_cached_analysis(input_data):
+def get_cached_analysis(input_data, on_delta=None):
     """
-    분석 결과를 캐싱하고 반환하는 함수
+    분석 결과를 반환하는 함수 (결과 캐시는 analyze_with_gpt4의 디스크 캐시가 담당)
+    on_delta를 넘기면 스트리밍으로 받으며, 토큰이 도착할 때마다 받은 조각으로 on_delta를 호출합니다.
+    반환값의 structured는 분석할 때 함께 캐시해 둔 구조화 결과(ParsedAnalysis)입니다.
     """
+    from reels_extraction import analyze_with_gpt4, analysis_structure, extract_reels_info
     try:
         # 릴스 정보 추출
-        reels_info = {
-            'refined_transcript': input_data['video_analysis']['transcript'],
-            'caption': input_data['video_analysis']['caption']
-        }
+        reels_info = extract_reels_info(input_data)
         
         # GPT-4를 사용한 분석
-        analysis = analyze_with_gpt4(reels_info, input_data)
+        analysis = analyze_with_gpt4(reels_info, input_data, on_delta=on_delta)
+        structured = analysis_structure(reels_info, input_data)
+        record_history(input_data, analysis, structured, reels_info)
         
         return {
             "analysis": analysis,
+            "structured": structured,
             "reels_info": reels_info
         }
     except Exception as e:
+        metrics.record_error(e)
         st.error(f"분석 중 오류가 발생했습니다: {str(e)}")
         return None
 
-def display_analysis_results(results, reels_info):
-    st.markdown("""
-        <style>
-        .benchmark-analysis-title {
-            font-size: 2.2rem;
-            font-weight: 700;
-            color: #405DE6;
-            text-align: center;
-            margin: 2.5rem auto;
-            padding: 1rem 0;
-            border-bottom: 3px solid #405DE6;
-            width: 100%;
-            background: linear-gradient(to right, transparent, #F0F2FF, transparent);
+def record_history(input_data, analysis, structured, reels_info):
+    """
+    끝난 분석을 지난 분석 기록에 남김 (history_store.py, 주제가 여러 개면 주제마다 하나씩)
+    """
+    from history_store import record_analysis
+    record_analysis(input_data, analysis, structured, reels_info, owner=_job_owner())
+
+def get_similar_analysis(input_data):
+    """
+    조금만 다른 입력(띄어쓰기, 해시태그, 오타 등)으로 분석해 둔 결과를 찾는 함수
+    정확히 같은 입력의 분석이 있거나 비슷한 분석이 없으면 None을 반환합니다.
+    """
+    from reels_extraction import extract_reels_info, find_similar_analysis
+    try:
+        reels_info = extract_reels_info(input_data)
+        similar = find_similar_analysis(reels_info, input_data)
+    except Exception as e:
+        # 유사 입력 조회가 실패해도 분석은 그대로 진행
+        metrics.record_error(e)
+        return None
+    if similar:
+        similar["reels_info"] = reels_info
+    return similar
+
+def _request_fresh_analysis():
+    # 다음 실행에서 비슷한 분석을 재사용하지 않고 같은 입력으로 새로 분석
+    st.session_state.analyze_fresh = True
+
+@metrics.timed("render")
+def display_similar_analysis(similar):
+    """
+    비슷한 입력의 이전 분석을 근사 결과로 표시하고, 새로 분석할 수 있는 버튼을 함께 보여줌
+    """
+    st.info(
+        f"🔁 입력이 {similar['similarity']:.0%} 비슷한 이전 분석 결과입니다 (근사 결과). "
+        "수정한 내용까지 반영하려면 새로 분석해주세요."
+    )
+    st.button("🔄 새로 분석하기", key="analyze_fresh_button", on_click=_request_fresh_analysis)
+    display_analysis_results(similar["structured"], similar["reels_info"])
+
+def get_cached_topic_analyses(input_data, topics):
+    """
+    한 릴스를 여러 주제로 벤치마킹한 결과를 반환하는 함수
+    릴스 분석(1~5번)은 한 번만 하고, 주제별 기획은 동시에 요청합니다.
+    """
+    from reels_extraction import analyze_topics, analysis_structure, extract_reels_info
+    try:
+        reels_info = extract_reels_info(input_data)
+        analyses = analyze_topics(reels_info, input_data, topics)
+        structured = []
+        for topic, analysis in analyses:
+            topic_input = {**input_data, "content_info": {"topic": topic}}
+            structured.append(analysis_structure(reels_info, topic_input))
+            record_history(topic_input, analysis, structured[-1], reels_info)
+        return {
+            "analyses": analyses,
+            "structured": structured,
+            "reels_info": reels_info
         }
-        </style>
-    """, unsafe_allow_html=True)
+    except Exception as e:
+        metrics.record_error(e)
+        st.error(f"분석 중 오류가 발생했습니다: {str(e)}")
+        return None
 
+def _section_heading(section):
+    # 제목 앞에 아이콘 추가 (예: "# 1. 주제:" -> "# 🎯 1. 주제:")
+    icon = SECTION_ICONS.get(section.heading)
+    if not icon:
+        return section.heading
+    marks, title = section.heading.split(" ", 1)
+    return f"{marks} {icon} {title}"
+
+def _section_markdown(section):
+    return section.to_markdown(_section_heading)
+
+def _render_analysis_title():
     # 분석 결과 타이틀
     st.markdown('<div class="benchmark-analysis-title">📊 분석 결과</div>', unsafe_allow_html=True)
-    
-    # GPT 분석 결과
-    analysis_parts = results.split("# 6. 벤치마킹 적용 기획:")
-    main_analysis = analysis_parts[0]
-    
-    # GPT 분석 결과를 마크다운으로 변환하여 이모티콘 추가
-    analysis_text = main_analysis.replace("# 1. 주제:", "# 🎯 1. 주제:")
-    analysis_text = analysis_text.replace("# 2. 초반 3초", "# ⚡ 2. 초반 3초")
-    analysis_text = analysis_text.replace("## 카피라이팅 :", "## ✍️ 카피라이팅 :")
-    analysis_text = analysis_text.replace("## 영상 구성 :", "## 🎬 영상 구성 :")
-    analysis_text = analysis_text.replace("# 3. 내용 구성:", "# 📋 3. 내용 구성:")
-    analysis_text = analysis_text.replace("# 4. 개선할 점:", "# 🔍 4. 개선할 점:")
-    analysis_text = analysis_text.replace("# 5. 적용할 점:", "# ✨ 5. 적용할 점:")
+
+def _render_planning_title():
+    st.markdown('<div class="benchmark-analysis-title">📝 벤치마킹 기획</div>', unsafe_allow_html=True)
+
+@metrics.timed("render")
+def display_analysis_results(structured, reels_info):
+    _render_analysis_title()
     
     # 메인 분석 결과 표시
-    st.markdown(analysis_text)
+    st.markdown("\n\n".join(_section_markdown(section) for section in structured.analysis_sections))
     
     # 벤치마킹 기획 섹션 표시 (있는 경우에만)
-    if len(analysis_parts) > 1:
-        st.markdown('<div class="benchmark-analysis-title">📝 벤치마킹 기획</div>', unsafe_allow_html=True)
-        planning_section = analysis_parts[1].strip()
-        st.markdown(planning_section)
+    if structured.planning is not None:
+        _render_planning_title()
+        st.markdown(structured.planning.body)
 
-def main():
-    st.markdown("""
-        <style>
-        /* 전체 컨테이너 스타일 */
-        .main {
-            background-color: #FFFFFF;
-            border-radius: 20px;
-            padding: 2rem;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }
-        
-        /* 메인 타이틀 스타일 수정 */
-        .main-title {
-            text-align: center;
-            font-size: 2.5rem;
-            font-weight: 700;
-            color: #1c1c1e;
-            margin: 2rem 0;
-            padding: 1rem 0;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+@metrics.timed("render")
+def display_topic_analyses(analyses, structured, reels_info):
+    """
+    여러 주제의 분석 결과 표시: 공통 릴스 분석은 한 번, 주제별 기획은 탭으로
+    """
+    _render_analysis_title()
+    
+    st.markdown("\n\n".join(_section_markdown(section) for section in structured[0].analysis_sections))
+    
+    _render_planning_title()
+    tabs = st.tabs([f"{i}. {topic[:20]}" for i, (topic, _) in enumerate(analyses, start=1)])
+    for tab, parsed in zip(tabs, structured):
+        with tab:
+            st.markdown(parsed.planning.body if parsed.planning else "")
 
-    # 타이틀을 중앙 정렬된 div로 감싸기
-    st.markdown('<div class="main-title">✨ 릴스 벤치마킹 스튜디오</div>', unsafe_allow_html=True)
+class StreamingAnalysisView:
+    """
+    스트리밍 중인 분석 결과를 섹션 단위로 그려주는 화면
 
-    if 'form_data' not in st.session_state:
-        st.session_state.form_data = {
-            'transcript': '',
-            'caption': '',
-            'video_intro_copy': '',
-            'video_intro_structure': '',
-            'narration': '',
-            'music': '',
-            'font': ''
-        }
+    받은 조각을 AnalysisParser에 바로 넘겨, 끝난 섹션은 완성되는 즉시 한 번만 그리고
+    토큰이 들어오는 중인 섹션만 STREAM_RENDER_INTERVAL 간격으로 다시 그립니다.
+    """
 
-    # 간격 추가
-    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
+    def __init__(self):
+        _render_analysis_title()
+        self._parser = AnalysisParser()
+        self._analysis_area = st.container()
+        self._analysis_slots = []
+        self._done = 0
+        self._planning_title = st.empty()
+        self._planning_slot = st.empty()
+        self._planning_started = False
+        self._last_render = 0.0
 
-    # 메인 분석 섹션
-    st.markdown('<div class="section-header" style="text-align: center;">📊 영상 분석</div>', unsafe_allow_html=True)
-    
+    @metrics.timed("render")
+    def feed(self, delta):
+        for section in self._parser.feed(delta):
+            self._render(section)
+        now = time.time()
+        if now - self._last_render >= STREAM_RENDER_INTERVAL:
+            self._last_render = now
+            current = self._parser.current()
+            if current is not None:
+                self._render(current, partial=True)
+
+    @metrics.timed("render")
+    def finish(self):
+        """
+        남은 섹션을 그리고 구조화된 결과(ParsedAnalysis)를 반환
+        """
+        for section in self._parser.close():
+            self._render(section)
+        return self._parser.result()
+
+    def _slot(self, index):
+        while len(self._analysis_slots) <= index:
+            with self._analysis_area:
+                self._analysis_slots.append(st.empty())
+        return self._analysis_slots[index]
+
+    def _render(self, section, partial=False):
+        if section.number == PLANNING_NUMBER:
+            if not self._planning_started:
+                with self._planning_title:
+                    _render_planning_title()
+                self._planning_started = True
+            self._planning_slot.markdown(section.body)
+            return
+        self._slot(self._done).markdown(_section_markdown(section))
+        if not partial:
+            self._done += 1
+
+def _logged_in_user():
+    # st.login으로 로그인한 사용자의 이메일 (인증을 설정하지 않았거나 로그인하지 않았으면 None)
+    if not st.user.get("is_logged_in"):
+        return None
+    return st.user.get("email")
+
+def _job_owner():
+    """
+    작업 대기열의 사용자별 공정성과 분석 기록의 "내 기록만"에 쓰는 사용자 구분
+    로그인했으면 사용자 이메일, 아니면 이 브라우저 세션의 번호 (요청 헤더는 위조할 수 있어 쓰지 않음)
+    """
+    user = _logged_in_user()
+    if user:
+        return f"user:{user}"
+    return f"session:{_session_id()}"
+
+def submit_analysis_job(input_data, topics):
+    """
+    분석을 백그라운드 작업으로 넣고 작업 번호를 주소(?job=)에 남김 (새로 고쳐도 결과를 다시 찾음)
+    """
+    owner = _job_owner()
+    job_id = _start_job_queue().submit({"input_data": input_data, "topics": topics, "owner": owner}, owner=owner)
+    st.query_params["job"] = job_id
+    return job_id
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def display_job_progress(job_id):
+    """
+    대기/실행 중인 작업의 진행 상황 (JOB_POLL_INTERVAL마다 이 부분만 다시 그림)
+    """
+    job = _start_job_queue().get(job_id)
+    if job is None or job["status"] not in ("queued", "running"):
+        # 끝나면 화면 전체를 다시 그려 결과를 표시 (이 조각도 더 이상 다시 그리지 않음)
+        st.rerun()
+    if job["status"] == "queued":
+        st.info(f"⏳ 분석 대기 중... (앞에 {job['position']}건)")
+        return
+    _render_analysis_title()
+    if not job["progress"]:
+        st.info("분석 중... (약 30초 소요)")
+        return
+    st.markdown("\n\n".join(_section_markdown(section) for section in parse_analysis(job["progress"]).sections))
+
+def display_job(job_id):
+    """
+    작업 번호로 진행 상황이나 결과를 표시 (분석은 작업 스레드가 하므로 API를 호출하지 않음)
+    """
+    job = _start_job_queue().get(job_id)
+    if job is None:
+        st.query_params.pop("job", None)
+        return
+    if job["status"] in ("queued", "running"):
+        display_job_progress(job_id)
+    elif job["status"] == "failed":
+        st.error(job["error"])
+    elif "analyses" in job["result"]:
+        result = job["result"]
+        display_topic_analyses(
+            [tuple(item) for item in result["analyses"]],
+            [ParsedAnalysis.from_dict(structured) for structured in result["structured"]],
+            result["reels_info"]
+        )
+    else:
+        display_analysis_results(ParsedAnalysis.from_dict(job["result"]["structured"]), job["result"]["reels_info"])
+
+def _history_page(step):
+    # 버튼 콜백: 다음 페이지는 마지막 항목의 cursor를 쌓고, 이전 페이지는 하나 꺼냄
+    cursors = st.session_state.history_cursors
+    if step > 0:
+        cursors.append(st.session_state.history_next)
+    elif len(cursors) > 1:
+        cursors.pop()
+
+@st.fragment
+def display_history():
+    """
+    지난 분석 기록 검색 (검색어를 바꾸거나 페이지를 넘기면 이 부분만 다시 실행)
+    기록을 열면 저장된 결과를 화면에 표시하며, LLM을 다시 호출하지 않습니다.
+    """
+    from history_store import get_history_store
+    with st.expander("🗂️ 지난 분석 기록"):
+        query = st.text_input("검색어 (캡션, 나레이션, 주제)", key="history_query")
+        topic_col, period_col, mine_col = st.columns([3, 2, 1], vertical_alignment="bottom")
+        topic = topic_col.text_input("주제 (정확히 같은 주제만)", key="history_topic").strip()
+        period = period_col.selectbox("기간", list(HISTORY_PERIODS), key="history_period")
+        # 로그인하지 않았으면 이 브라우저 세션의 기록만 "내 기록"이므로 기본은 전체 기록
+        mine = mine_col.checkbox(
+            "내 기록만", value=_logged_in_user() is not None, key="history_mine",
+            help="로그인했으면 내 계정으로 분석한 기록, 아니면 이 브라우저 세션에서 분석한 기록만 보여줍니다."
+        )
+
+        # 조건이 바뀌면 첫 페이지부터 (cursor 목록의 마지막이 지금 페이지)
+        filters = (query, topic, period, mine)
+        if st.session_state.get("history_filters") != filters:
+            st.session_state.history_filters = filters
+            st.session_state.history_cursors = [None]
+        days = HISTORY_PERIODS[period]
+        items, next_cursor = get_history_store().search(
+            query,
+            owner=_job_owner() if mine else None,
+            topic=topic or None,
+            since=time.time() - days * 86400 if days else None,
+            cursor=st.session_state.history_cursors[-1]
+        )
+        st.session_state.history_next = next_cursor
+        if not items:
+            st.caption("찾은 분석 기록이 없습니다.")
+            return
+
+        for item in items:
+            text_col, button_col = st.columns([6, 1], vertical_alignment="center")
+            created = time.strftime("%Y-%m-%d %H:%M", time.localtime(item["created_at"]))
+            text_col.markdown(
+                f"**{item['topic'] or '(주제 없음)'}** · {created} · ✅ {item['passed']} ❌ {item['failed']}  \n"
+                f"{item['caption'] or item['transcript']}"
+            )
+            if button_col.button("열기", key=f"history_open_{item['id']}"):
+                # 화면 전체를 다시 그려 아래 분석 결과 자리에 기록을 표시
+                st.query_params["history"] = str(item["id"])
+                st.query_params.pop("job", None)
+                st.rerun()
+
+        prev_col, next_col = st.columns(2)
+        prev_col.button("◀ 이전", key="history_prev", disabled=len(st.session_state.history_cursors) == 1,
+                        on_click=_history_page, args=(-1,))
+        next_col.button("다음 ▶", key="history_next_button", disabled=next_cursor is None,
+                        on_click=_history_page, args=(1,))
+
+def display_history_entry(row_id):
+    """
+    지난 분석 기록 하나를 저장된 결과로 표시 (주소의 ?history= 번호, LLM 호출 없음)
+    """
+    from history_store import get_history_store
+    entry = get_history_store().get(int(row_id)) if str(row_id).isdigit() else None
+    if entry is None:
+        st.query_params.pop("history", None)
+        return
+    created = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created_at"]))
+    st.info(f"🗂️ {created}에 분석한 기록입니다. 다시 분석하지 않고 저장된 결과를 보여드려요.")
+    display_analysis_results(ParsedAnalysis.from_dict(entry["structured"]), entry["reels_info"])
+
+def _save_upload(uploaded):
+    # 내용이 같은 파일은 같은 경로에 한 번만 저장 (수정 시각이 그대로라 Parquet 캐시/영상 처리 폴더를 재사용)
+    from reels_extraction import TEMP_DIR
+    data = uploaded.getvalue()
+    folder = TEMP_DIR / "uploads" / hashlib.sha256(data).hexdigest()[:16]
+    path = folder / os.path.basename(uploaded.name)
+    if not path.exists():
+        os.makedirs(folder, exist_ok=True)
+        path.write_bytes(data)
+    return path
+
+def _autofill_from_video():
+    # 버튼 콜백: 위젯을 그리기 전에 실행되므로 나레이션/영상 구성 입력 칸의 값을 바로 바꿀 수 있음
+    uploaded = st.session_state.get("media_file")
+    url = (st.session_state.get("media_url") or "").strip()
+    if uploaded is not None:
+        source = _save_upload(uploaded)
+    elif url:
+        source = url
+    else:
+        st.session_state.media_error = "영상 파일을 올리거나 URL을 입력해주세요."
+        return
+
+    from media_pipeline import process_media
+    result = process_media(source)
+    if result.error:
+        st.session_state.media_error = f"영상을 처리할 수 없습니다: {result.error}"
+        return
+    st.session_state.media_error = ""
+    st.session_state.media_result = result
+    for key in ("transcript", "intro_structure"):
+        value = getattr(result, key)
+        if value:
+            st.session_state[key] = value
+
+def display_media_autofill():
+    """
+    영상 파일이나 URL에서 나레이션(음성 인식)과 초반 3초 영상 구성(장면 전환)을 뽑아 입력 칸을 채움
+    """
+    with st.expander("🎬 영상에서 나레이션/초반 3초 구성 자동으로 채우기"):
+        # 파일/URL을 넣을 때마다 화면 전체가 다시 실행되지 않도록 폼으로 묶고, 버튼을 누를 때만 처리
+        with st.form("media_form", border=False, enter_to_submit=False):
+            st.file_uploader("릴스 영상", type=["mp4", "mov", "m4v", "webm"], key="media_file")
+            st.text_input("또는 영상 URL", key="media_url")
+            st.form_submit_button("영상 분석해서 채우기", key="media_button", on_click=_autofill_from_video)
+        if st.session_state.get("media_error"):
+            st.error(st.session_state.media_error)
+        result = st.session_state.get("media_result")
+        if result is not None and result.keyframes:
+            st.caption(result.intro_structure)
+            st.image(result.keyframes, width=120)
+
+@st.fragment
+def display_reels_ranking():
+    """
+    스크래퍼 결과(reels_info_*.csv)를 올리면 벤치마킹할 만한 릴스 순위를 표로 보여줌
+    파일을 올리면 이 부분만 다시 실행되어, 입력 폼과 분석 결과는 그대로 남습니다.
+    """
+    with st.expander("📈 스크래퍼 결과에서 벤치마킹할 릴스 찾기"):
+        uploaded = st.file_uploader(
+            "reels_info CSV",
+            type="csv",
+            help="조회수 대비 참여율, 초당 조회수, 같은 계정/음악 안에서의 순위로 벤치마킹할 릴스를 골라드립니다.",
+            key="reels_csv"
+        )
+        if uploaded is None:
+            return
+        from reels_analytics import compute_metrics, load_reels_exports, top_benchmark_reels
+        try:
+            frame = compute_metrics(load_reels_exports(_save_upload(uploaded)))
+        except (ValueError, KeyError) as e:
+            st.error(f"CSV를 읽을 수 없습니다: {str(e)}")
+            return
+        top = top_benchmark_reels(frame, n=20, min_views=0)
+        # 참여율은 % 단위로 표시
+        top = top.assign(engagement_rate=top["engagement_rate"] * 100)
+        st.dataframe(
+            top[["shortcode", "owner", "view_count", "engagement_rate", "views_per_second",
+                 "likes_per_comment", "owner_rank", "music_rank", "benchmark_score"]],
+            hide_index=True,
+            column_config={
+                "view_count": st.column_config.NumberColumn("조회수", format="%d"),
+                "engagement_rate": st.column_config.NumberColumn("참여율", format="%.2f%%"),
+                "views_per_second": st.column_config.NumberColumn("초당 조회수", format="%.0f"),
+                "likes_per_comment": st.column_config.NumberColumn("좋아요/댓글", format="%.1f"),
+                "owner_rank": st.column_config.NumberColumn("계정 내 순위", format="%.2f"),
+                "music_rank": st.column_config.NumberColumn("음악 내 순위", format="%.2f"),
+                "benchmark_score": st.column_config.NumberColumn("벤치마킹 점수", format="%.3f")
+            }
+        )
+        st.caption(f"릴스 {len(frame):,}개 중 상위 {len(top)}개")
+
+@st.fragment
+def display_reel_inputs():
+    """
+    릴스 입력 칸 (값을 바꾸면 화면 전체가 아니라 이 부분만 다시 실행)
+    입력이 멈추면 주제를 작성하는 동안 1~5번 릴스 분석을 미리 요청합니다. (speculation.py)
+    """
     # 캡션과 나레이션 섹션
     st.markdown('<div class="input-label" style="font-weight: bold;">📝 캡션과 나레이션</div>', unsafe_allow_html=True)
-    
+
     caption = st.text_area(
         label="캡션", 
-        value=st.session_state.form_data.get('caption', ''),
         height=100,
         help="1. 📝 게시물 하단에 작성된 설명글\n"
              "2. #️⃣ 해시태그 포함\n"
@@ -337,10 +757,9 @@ def main():
              "4. ✨ 예시: \n\n'직장인 부업으로 월 500 벌기 꿀팁 대방출 🔥\n\n이것만 알면 누구나 가능합니다.\n\n#부업 #투잡 #재테크'",
         key="caption"
     )
-    
+
     narration = st.text_area(
         label="나레이션",  
-        value=st.session_state.form_data.get('transcript', ''),
         height=100,
         help="1. 🎙️ 영상에서 말하는 내용을 그대로 작성\n"
              "2. 💬 나레이션, 자막 모두 포함\n"
@@ -348,14 +767,13 @@ def main():
              "4. ✨ 예시: \n\n'안녕하세요. 오늘은 직장인 부업으로 \n\n월 500만원 버는 방법을 알려드립니다.'",
         key="transcript"
     )
-    
+
     # 초반 3초 분석 섹션
     st.markdown('<div class="input-label" style="font-weight: bold;">⚡ 초반 3초 분석</div>', unsafe_allow_html=True)
-    
+
 
     intro_copy = st.text_area(
         "카피라이팅",
-        value=st.session_state.form_data['video_intro_copy'],
         height=68,
         help="1. 🎯 구체적 수치 ('월 500만원', '3일 만에' 등)\n"
              "2. 🧠 뇌 충격 ('망하는 과정', '실패한 이유' 등)\n"
@@ -364,10 +782,9 @@ def main():
              "5. ✨ 예시: '현직 인사팀장이 알려주는 연봉 3천 협상법'",
         key="intro_copy"
     )
-    
+
     intro_structure = st.text_area(
         "영상 구성",
-        value=st.session_state.form_data['video_intro_structure'],
         height=68,
         help="1. 💥 상식 파괴 (예상 밖의 장면)\n"
              "2. 🎬 결과 먼저 보여주기 (Before & After)\n"
@@ -379,89 +796,182 @@ def main():
 
     # 스타일 분석 섹션 (전체 너비 사용)
     st.markdown('<div class="input-label" style="font-weight: bold;">🎨 스타일 분석</div>', unsafe_allow_html=True)
-    
+
 
     narration_style = st.text_input(
         "나레이션 스타일",
-        value=st.session_state.form_data['narration'],
         help="1. 🎤 목소리 특징 (성별, 연령대, 톤)\n"
              "2. 💬 말하기 스타일 (전문적/친근한)\n"
              "3. 🎵 음질 상태 (노이즈 없는 깨끗한 음질)\n"
              "4. ✅️ 예시: '20대 여성의 친근한 톤, 깨끗한 마이크 음질'",
         key="narration"
     )
-    
+
     music = st.text_input(
         "배경음악",
-        value=st.session_state.form_data['music'],
         help="1. 🎵 트렌디한 정도 (최신 유행 BGM)\n"
              "2. 🎶 영상과의 조화 (리듬감, 분위기)\n"
              "3. 🎼 장르 및 템포\n"
              "4. 🎧 예시: '트렌디한 K-pop, 영상의 템포와 잘 맞는 리듬'",
         key="music"
     )
-    
+
     font = st.text_input(
         "사용 폰트",
-        value=st.session_state.form_data['font'],
         help="1. ✒️ 강조 요소 (굵기, 크기, 테두리)\n"
              "2. 👀 가독성 정도\n"
              "3. 💫 예시: '눈에 띄는 굵은 글씨, 흰색 테두리, 노란색 배경'",
         key="font"
     )
-    
+
+    if SPECULATIVE_ANALYSIS:
+        schedule_speculation({
+            "transcript": narration,
+            "caption": caption,
+            "intro_copy": intro_copy,
+            "intro_structure": intro_structure,
+            "narration": narration_style,
+            "music": music,
+            "font": font
+        })
+
+def _session_id():
+    # 브라우저 세션마다 새로 만드는 번호 (미리 분석 상태, 로그인하지 않은 사용자의 작업 구분)
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+def schedule_speculation(video_analysis):
+    from speculation import get_speculator
+    status = get_speculator().schedule(_session_id(), video_analysis)
+    if status in ("running", "done", "cached"):
+        st.caption("⚡ 릴스 분석을 미리 준비하고 있어요. 주제를 입력하고 분석을 시작하면 기획만 새로 작성합니다.")
+
+def main():
+    # 스타일은 화면 전체를 다시 그릴 때만 한 번 보냄 (릴스 입력과 순위 표는 조각 단위, 주제 입력은 폼이므로)
+    st.markdown(PAGE_STYLE, unsafe_allow_html=True)
+
+    # 타이틀을 중앙 정렬된 div로 감싸기
+    st.markdown('<div class="main-title">✨ 릴스 벤치마킹 스튜디오</div>', unsafe_allow_html=True)
+
+    display_reels_ranking()
+
+    display_history()
+
+    # 릴스 입력 칸의 처음 값 (입력 칸에 value를 주지 않고 세션 상태로만 관리해야
+    # 영상 자동 채우기(_autofill_from_video)가 바꾼 값이 경고 없이 그대로 반영됨)
+    for key in ('transcript', 'caption', 'intro_copy', 'intro_structure', 'narration', 'music', 'font'):
+        if key not in st.session_state:
+            st.session_state[key] = ''
+
     # 간격 추가
-    st.markdown("<div style='margin-top: 70px;'></div>", unsafe_allow_html=True)
+    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
 
-    # 내 콘텐츠 정보 입력 섹션
-    st.markdown('<div class="section-header" style="text-align: center;">✏️ 내 콘텐츠 정보</div>', unsafe_allow_html=True)
-    topic = st.text_area(
-        "제작할 콘텐츠 주제",
-        height=100,
-        help="벤치마킹하여 제작하고 싶은 콘텐츠의 주제나 내용을 자유롭게 입력해주세요",
-        key="topic"
-    )
+    # 메인 분석 섹션
+    st.markdown('<div class="section-header" style="text-align: center;">📊 영상 분석</div>', unsafe_allow_html=True)
     
-    # 분석 시작 버튼
-    st.markdown("""
-        <style>
-        div.stButton > button {
-            width: 100%;
-            background: linear-gradient(45deg, #405DE6, #5851DB) !important;
-            color: white !important;
-            border: none !important;
-            border-radius: 12px !important;
-            padding: 0.5rem 2rem !important;
-            font-weight: 600 !important;
-            transition: all 0.3s ease !important;
+    display_media_autofill()
+
+    display_reel_inputs()
+
+    # 주제 입력 칸은 폼으로 묶어, 글자를 입력할 때마다가 아니라 분석 버튼을 누를 때 한 번만 다시 실행
+    with st.form("analysis_form", border=False, enter_to_submit=False):
+        # 간격 추가
+        st.markdown("<div style='margin-top: 70px;'></div>", unsafe_allow_html=True)
+
+        # 내 콘텐츠 정보 입력 섹션
+        st.markdown('<div class="section-header" style="text-align: center;">✏️ 내 콘텐츠 정보</div>', unsafe_allow_html=True)
+        topic = st.text_area(
+            "제작할 콘텐츠 주제",
+            height=100,
+            help="벤치마킹하여 제작하고 싶은 콘텐츠의 주제나 내용을 자유롭게 입력해주세요",
+            key="topic"
+        )
+    
+        # 여러 주제로 한 번에 기획 (릴스 분석은 한 번만 하고 주제별 기획만 새로 작성)
+        with st.expander("➕ 여러 주제 한 번에 기획하기"):
+            extra_topics = st.text_area(
+                "추가 주제 (한 줄에 하나씩)",
+                height=100,
+                help="위 주제와 함께 기획할 주제를 한 줄에 하나씩 입력해주세요.\n"
+                     "릴스 분석(1~5번)은 한 번만 하고, 주제별 벤치마킹 기획만 동시에 작성합니다.",
+                key="extra_topics"
+            )
+
+        submitted = st.form_submit_button("✨ 벤치마킹 분석 시작", key="analyze_button")
+
+    # "새로 분석하기"를 누르면 마지막으로 제출한 입력으로 다시 분석
+    fresh = st.session_state.pop("analyze_fresh", False)
+    if submitted or fresh:
+        # 릴스 입력 칸은 폼 밖(display_reel_inputs)에 있으므로 세션 상태에서 읽음
+        input_data = {
+            "video_analysis": {
+                "transcript": st.session_state.transcript,
+                "caption": st.session_state.caption,
+                "intro_copy": st.session_state.intro_copy,
+                "intro_structure": st.session_state.intro_structure,
+                "narration": st.session_state.narration,
+                "music": st.session_state.music,
+                "font": st.session_state.font
+            },
+            "content_info": {
+                "topic": topic
+            }
         }
         
-        div.stButton > button:hover {
-            transform: translateY(-2px) !important;
-            box-shadow: 0 4px 12px rgba(64,93,230,0.2) !important;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-    
-    if st.button("✨ 벤치마킹 분석 시작", key="analyze_button"):
+        topics = [topic] if topic.strip() else []
+        for line in extra_topics.splitlines():
+            if line.strip() and line.strip() not in topics:
+                topics.append(line.strip())
+        if len(topics) == 1:
+            input_data["content_info"]["topic"] = topics[0]
+        
+        # 버튼을 누른 뒤 결과를 다 그릴 때까지를 분석 한 번으로 기록 (metrics.py)
+        with metrics.trace_analysis("app"):
+            run_analysis(input_data, topics, reuse_similar=not fresh)
+
+    # 백그라운드 작업으로 넣은 분석 (페이지를 새로 고쳐도 주소의 작업 번호로 이어서 표시)
+    job_id = st.query_params.get("job")
+    if BACKGROUND_JOBS and job_id:
+        display_job(job_id)
+
+    # 지난 분석 기록에서 연 결과 (새로 분석하면 run_analysis에서 지움)
+    history_id = st.query_params.get("history")
+    if history_id:
+        display_history_entry(history_id)
+
+def run_analysis(input_data, topics, reuse_similar=True):
+    st.query_params.pop("history", None)
+    if len(topics) <= 1 and reuse_similar:
+        similar = get_similar_analysis(input_data)
+        if similar:
+            st.query_params.pop("job", None)
+            display_similar_analysis(similar)
+            return
+
+    if BACKGROUND_JOBS:
+        # 분석은 작업 스레드가 하고, 화면은 아래 display_job이 진행 상황을 읽어 그림
+        submit_analysis_job(input_data, topics)
+        return
+
+    if len(topics) > 1:
+        with st.spinner(f"주제 {len(topics)}개 기획 중..."):
+            results = get_cached_topic_analyses(input_data, topics)
+        
+        if results:
+            display_topic_analyses(results["analyses"], results["structured"], results["reels_info"])
+    elif STREAM_ANALYSIS:
+        # 첫 토큰이 도착하는 즉시 섹션별로 결과를 표시
+        view = StreamingAnalysisView()
+        results = get_cached_analysis(input_data, on_delta=view.feed)
+        if results:
+            view.finish()
+    else:
         with st.spinner("분석 중... (약 30초 소요)"):
-            results = get_cached_analysis({
-                "video_analysis": {
-                    "transcript": narration,
-                    "caption": caption,
-                    "intro_copy": intro_copy,
-                    "intro_structure": intro_structure,
-                    "narration": narration_style,
-                    "music": music,
-                    "font": font
-                },
-                "content_info": {
-                    "topic": topic
-                }
-            })
+            results = get_cached_analysis(input_data)
             
             if results:
-                display_analysis_results(results["analysis"], results["reels_info"])
+                display_analysis_results(results["structured"], results["reels_info"])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+asyncio 기반 분석 실행 (API 서버용)
+
+reels_extraction.analyze_with_gpt4와 같은 프롬프트, 같은 캐시 키, 같은 디스크 캐시(analysis_pipeline)를 쓰므로
+Streamlit 앱과 API 서버가 서로의 결과를 재사용합니다. OpenAI 호출은 프로세스 전체에서
+하나의 AsyncOpenAI 클라이언트(openai_client의 연결 풀)를 공유해 한 프로세스가 많은 요청을 동시에 처리합니다.
+"""
+import asyncio
+
+import metrics
+from api_config import ANALYSIS_EXECUTION_MODE, TRANSCRIPT_CHUNK_MODEL
+from analysis_cache import get_analysis_cache
+from analysis_pipeline import (
+    ANALYSIS_MODEL,
+    NO_TOPIC_PLANNING,
+    REEL_PARTS,
+    CachedJob,
+    OrderedMerge,
+    build_analysis_request,
+    chunk_cache_key,
+    completion_delta,
+    completion_params,
+    new_async_single_flight,
+    planning_cache_key,
+    planning_checklist,
+    reel_cache_key,
+)
+from reels_extraction import remember_analysis
+from prompts import build_chunk_messages, count_message_tokens
+from transcript import needs_reduction, reduce_transcript_async
+from openai_client import get_async_openai_client
+from resilience import async_resilient_stream
+
+# SINGLE_FLIGHT_MODE=file이면 Streamlit 앱 워커와 같은 잠금 파일로 합침
+_inflight = new_async_single_flight()
+# 설정하면 OpenAI 호출 전마다 RPM/TPM 한도를 확인 (배치 분석 등)
+_rate_limiter = None
+
+
+def set_rate_limiter(limiter):
+    """
+    이 프로세스의 모든 비동기 OpenAI 호출에 적용할 RateLimiter 지정 (None이면 해제)
+    """
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+async def analyze_async(info, input_data, on_delta=None, mode=None):
+    """
+    analyze_with_gpt4의 비동기 버전
+    on_delta를 넘기면 최종 텍스트의 앞부분부터 순서대로 조각마다 on_delta(조각)을 호출합니다.
+    """
+    mode = mode or ANALYSIS_EXECUTION_MODE
+    analysis = await _merge_ordered([
+        lambda emit: _reel_sections(info, input_data, mode, emit),
+        lambda emit: _planning(info, input_data, mode, emit)
+    ], on_delta)
+    await asyncio.to_thread(remember_analysis, info, input_data, mode)
+    return analysis
+
+
+async def _reel_sections(info, input_data, mode, emit):
+    async def compute(forward):
+        if mode == "fanout":
+            return await _merge_ordered([
+                _parts_job((part,), info, input_data)
+                for part in REEL_PARTS
+            ], forward)
+        return await _stream_parts(REEL_PARTS, info, input_data, forward)
+
+    return await _cached_job("reel", reel_cache_key(info, input_data, mode), compute, emit)
+
+
+async def _planning(info, input_data, mode, emit):
+    if not input_data["content_info"]["topic"]:
+        emit(NO_TOPIC_PLANNING)
+        return NO_TOPIC_PLANNING
+
+    async def compute(forward):
+        # 기획 프롬프트에 넣을 1~5번 분석의 ✅ 항목 (진행 중인 릴스 분석을 기다려 받음)
+        reel_text = await _reel_sections(info, input_data, mode, lambda delta: None)
+        structured = await asyncio.to_thread(
+            get_analysis_cache().get_structured, reel_cache_key(info, input_data, mode)
+        )
+        checked = planning_checklist(reel_text, structured)
+        return await _stream_parts(("planning",), info, input_data, forward, checked)
+
+    return await _cached_job("planning", planning_cache_key(info, input_data), compute, emit)
+
+
+def _parts_job(parts, info, input_data):
+    return lambda emit: _stream_parts(parts, info, input_data, emit)
+
+
+async def _cached_job(section, key, compute, emit):
+    job = CachedJob(section)
+
+    async def compute_once():
+        job.begin()
+        # SQLite 조회는 이벤트 루프를 막지 않도록 스레드에서 실행
+        cache = get_analysis_cache()
+        cached = await asyncio.to_thread(cache.get, key)
+        if job.lookup(cached):
+            return cached
+
+        def forward(delta):
+            job.feed(delta)
+            emit(delta)
+
+        text, structured = job.finish(await compute(forward))
+        await asyncio.to_thread(cache.set, key, text, structured)
+        return text
+
+    text = await _inflight.do(key, compute_once)
+    job.joined()
+    if not job.streamed:
+        emit(text)
+    return text
+
+
+async def _stream_parts(parts, info, input_data, emit, checked_items=()):
+    info = await _reduce_long_transcript(info)
+    with metrics.stage("prompt_build"):
+        messages, max_tokens, input_tokens = build_analysis_request(info, input_data, parts, checked_items)
+    chunks = []
+    async for delta in _stream_completion(messages, max_tokens, input_tokens):
+        chunks.append(delta)
+        emit(delta)
+    return "".join(chunks)
+
+
+def _stream_completion(messages, max_tokens, input_tokens, model=ANALYSIS_MODEL):
+    async def open_stream(timeout):
+        # 재시도/헤지로 요청을 다시 보낼 때마다 한도를 다시 확인
+        if _rate_limiter is not None:
+            with metrics.stage("queue"):
+                await _rate_limiter.acquire(input_tokens + max_tokens)
+        call = metrics.UpstreamCall(model)
+        try:
+            stream = await get_async_openai_client().chat.completions.create(
+                **completion_params(messages, max_tokens, model, timeout)
+            )
+            async with stream:
+                async for chunk in stream:
+                    delta = completion_delta(chunk, call)
+                    if delta:
+                        yield delta
+        except Exception as e:
+            call.fail(e)
+            raise
+        call.finish()
+
+    return async_resilient_stream(open_stream)
+
+
+async def _reduce_long_transcript(info):
+    # reels_extraction.reduce_long_transcript의 비동기 버전 (구간 정리 캐시를 함께 씀)
+    if not needs_reduction(info["refined_transcript"]):
+        return info
+    return {**info, "refined_transcript": await reduce_transcript_async(info["refined_transcript"], _summarize_chunk)}
+
+
+async def _summarize_chunk(chunk, index, total, max_tokens):
+    key = chunk_cache_key(chunk, index, total, max_tokens)
+
+    async def compute_once():
+        job = CachedJob("chunk", parse=False)
+        cache = get_analysis_cache()
+        cached = await asyncio.to_thread(cache.get, key)
+        if job.lookup(cached):
+            return cached
+        with metrics.stage("prompt_build"):
+            messages = build_chunk_messages(chunk, index, total)
+        async for delta in _stream_completion(
+            messages, max_tokens, count_message_tokens(messages), model=TRANSCRIPT_CHUNK_MODEL
+        ):
+            job.feed(delta)
+        text, _ = job.finish()
+        await asyncio.to_thread(cache.set, key, text)
+        return text
+
+    return await _inflight.do(key, compute_once)
+
+
+async def _merge_ordered(jobs, on_delta=None):
+    """
+    reels_extraction._merge_ordered의 asyncio 버전 (job은 emit을 받는 코루틴 함수)
+    끝나거나 예외로 나가면 남은 job을 취소합니다.
+    """
+    events = asyncio.Queue()
+    merge = OrderedMerge(len(jobs), on_delta)
+
+    async def run(index, job):
+        try:
+            result = await job(lambda delta: events.put_nowait((index, "delta", delta)))
+            events.put_nowait((index, "done", result))
+        except Exception as e:
+            events.put_nowait((index, "error", e))
+
+    tasks = [asyncio.create_task(run(index, job)) for index, job in enumerate(jobs)]
+    try:
+        while not merge.done:
+            merge.handle(*await events.get())
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return merge.text()
@@ -0,0 +1,182 @@
+"""
+스크래퍼 결과(reels_info_*.csv)를 한 번에 분석하는 배치 명령
+
+CSV를 한 줄씩 읽어 행마다 분석을 요청하고, 끝난 행부터 JSONL 파일에 바로 기록합니다.
+결과 파일이 체크포인트 역할을 하므로 중간에 멈춰도 같은 명령을 다시 실행하면
+이미 성공한 행은 건너뛰고 나머지만 분석합니다. 체크포인트는 (행 id, 주제)로 구분하므로
+같은 결과 파일에 다른 --topic으로 실행하면 모든 행을 그 주제로 새로 분석합니다.
+
+    python batch_analysis.py ../reels_info_20250130_144309.csv --out results.jsonl \\
+        --concurrency 8 --rpm 500 --tpm 30000 --topic "직장인 보고서 꿀팁"
+
+OPENAI_BASE_URL로 fake_openai_server.py를 지정하면 API 비용 없이 실행해볼 수 있습니다.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+
+from async_analysis import analyze_async, set_rate_limiter
+import metrics
+from openai_client import close_async_openai_client
+from rate_limit import RateLimiter
+from reels_extraction import extract_reels_info
+
+# 나레이션이 긴 행도 읽을 수 있도록 CSV 필드 크기 제한을 늘림
+csv.field_size_limit(sys.maxsize)
+
+
+def iter_reels_rows(csv_path):
+    """
+    CSV를 통째로 메모리에 올리지 않고 한 행씩 읽음 (엑셀 저장 시 붙는 BOM 제거)
+    """
+    with open(csv_path, encoding="utf-8-sig", newline="") as f:
+        for index, row in enumerate(csv.DictReader(f)):
+            row["_row_id"] = row.get("shortcode") or f"row-{index}"
+            yield row
+
+
+def row_to_input_data(row, topic=""):
+    """
+    CSV 한 행을 get_cached_analysis와 같은 입력 양식으로 변환
+    """
+    return {
+        "video_analysis": {
+            "transcript": (row.get("transcript") or "").strip(),
+            "caption": (row.get("caption") or "").strip(),
+            "intro_copy": "",
+            "intro_structure": "",
+            "narration": "",
+            "music": " - ".join(filter(None, [row.get("music_title"), row.get("music_artist")])),
+            "font": ""
+        },
+        "content_info": {
+            "topic": topic
+        }
+    }
+
+
+def load_checkpoint(out_path):
+    """
+    이미 성공적으로 기록된 (행 id, 주제) 목록 (실패한 행은 다시 시도)
+    기획(6번)은 주제에 따라 달라지므로 다른 주제로 분석한 행은 건너뛰지 않습니다.
+    """
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 중단되면서 반쯤 써진 마지막 줄
+                continue
+            if record.get("status") == "ok":
+                done.add((record["row_id"], record.get("topic") or ""))
+    return done
+
+
+async def run_batch(csv_path, out_path, topic="", concurrency=8, rpm=None, tpm=None, mode=None):
+    """
+    CSV의 각 행을 최대 concurrency개씩 동시에 분석하고 결과를 out_path(JSONL)에 이어 씀
+    반환: {"ok": 성공 수, "error": 실패 수, "skipped": 체크포인트로 건너뛴 수}
+    """
+    set_rate_limiter(RateLimiter(rpm=rpm, tpm=tpm) if (rpm or tpm) else None)
+    done = load_checkpoint(out_path)
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    rows = asyncio.Queue(maxsize=concurrency * 2)
+
+    with open(out_path, "a", encoding="utf-8") as out:
+        def write(record):
+            # 이벤트 루프 하나에서만 쓰므로 줄 단위로 섞이지 않음
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+        async def produce():
+            for row in iter_reels_rows(csv_path):
+                if (row["_row_id"], topic) in done:
+                    counts["skipped"] += 1
+                    continue
+                await rows.put(row)
+            for _ in range(concurrency):
+                await rows.put(None)
+
+        async def work():
+            while True:
+                row = await rows.get()
+                if row is None:
+                    return
+                input_data = row_to_input_data(row, topic)
+                record = {
+                    "row_id": row["_row_id"],
+                    "shortcode": row.get("shortcode"),
+                    "owner": row.get("owner"),
+                    "topic": topic
+                }
+                started = time.perf_counter()
+                try:
+                    with metrics.trace_analysis("batch"):
+                        record["analysis"] = await analyze_async(
+                            extract_reels_info(input_data), input_data, mode=mode
+                        )
+                    record["status"] = "ok"
+                except Exception as e:
+                    record["status"] = "error"
+                    record["error"] = f"{type(e).__name__}: {e}"
+                record["elapsed"] = round(time.perf_counter() - started, 3)
+                counts[record["status"]] += 1
+                write(record)
+
+        try:
+            await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+        finally:
+            set_rate_limiter(None)
+            await close_async_openai_client()
+
+    return counts
+
+
+def export_parquet(jsonl_path, parquet_path):
+    """
+    JSONL 결과를 Parquet으로 변환 (같은 행/주제가 여러 번 기록되었으면 마지막 결과만 남김)
+    """
+    import pandas as pd
+
+    frame = pd.read_json(jsonl_path, lines=True)
+    frame = frame.drop_duplicates(["row_id", "topic"], keep="last")
+    frame.to_parquet(parquet_path, index=False)
+    return len(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="reels_info CSV 배치 분석")
+    parser.add_argument("csv_path", help="스크래퍼가 만든 reels_info_*.csv")
+    parser.add_argument("--out", default="batch_results.jsonl", help="결과 JSONL 경로 (체크포인트 겸용)")
+    parser.add_argument("--topic", default="", help="벤치마킹할 내 콘텐츠 주제 (없으면 1~5번 분석만)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시에 분석할 행 수")
+    parser.add_argument("--rpm", type=int, help="분당 최대 요청 수")
+    parser.add_argument("--tpm", type=int, help="분당 최대 토큰 수")
+    parser.add_argument("--mode", choices=["single", "fanout"], help="분석 실행 방식")
+    parser.add_argument("--parquet", help="끝난 뒤 결과를 Parquet으로도 저장할 경로")
+    args = parser.parse_args()
+
+    counts = asyncio.run(run_batch(
+        args.csv_path, args.out,
+        topic=args.topic,
+        concurrency=args.concurrency,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        mode=args.mode
+    ))
+    print(f"완료: 성공 {counts['ok']}건, 실패 {counts['error']}건, 건너뜀 {counts['skipped']}건")
+
+    if args.parquet:
+        rows = export_parquet(args.out, args.parquet)
+        print(f"Parquet 저장: {args.parquet} ({rows}행)")
+
+
+if __name__ == "__main__":
+    main()
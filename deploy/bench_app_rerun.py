@@ -0,0 +1,124 @@
+"""
+Streamlit 화면의 첫 실행(모듈 불러오기 포함)과 다시 실행(rerun) 시간 비교
+
+Streamlit은 위젯을 건드릴 때마다 app.py를 처음부터 다시 실행하므로, 첫 화면이 뜨는 시간과
+다시 실행 한 번의 시간, 입력하는 동안 다시 실행되는 횟수가 체감 속도를 정합니다.
+버전마다 새 프로세스에서 AppTest로 app.py를 실행해 재므로 모듈 불러오기 시간도 매번 처음부터 잽니다.
+분석 버튼은 누르지 않으므로 API 키나 비용이 들지 않습니다.
+
+    python bench_app_rerun.py --before HEAD~1 --reruns 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_PATH = Path(__file__).parent / "app.py"
+# 첫 화면에는 필요 없는데 불러오면 시간이 오래 걸리는 모듈
+HEAVY_MODULES = ("pandas", "openai", "tiktoken", "requests", "numpy")
+# 입력 칸 값을 바꿔 가며 다시 실행할 위젯
+INPUT_KEYS = ("caption", "transcript", "intro_copy", "intro_structure", "topic")
+
+
+def measure(app_path, reruns):
+    """
+    현재 프로세스에서 app_path를 한 번 실행하고 reruns번 다시 실행한 결과 (새 프로세스에서 불러야 함)
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "test")
+    sys.path.insert(0, str(APP_PATH.parent))
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_streamlit = time.perf_counter() - started
+
+    at = AppTest.from_file(str(app_path), default_timeout=120)
+    started = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - started
+
+    times = []
+    for i in range(reruns):
+        at.text_area(key=INPUT_KEYS[i % len(INPUT_KEYS)]).input(f"벤치마크 입력 {i}")
+        started = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - started)
+
+    # 폼 밖의 입력 칸은 글자를 바꿀 때마다 화면 전체를 다시 실행함
+    inputs = list(at.text_area) + list(at.text_input)
+    return {
+        "import_streamlit": import_streamlit,
+        "cold": cold,
+        "rerun_p50": statistics.median(times),
+        "rerun_mean": statistics.fmean(times),
+        "rerun_inputs": sum(1 for widget in inputs if not widget.proto.form_id),
+        "inputs": len(inputs),
+        "style_blocks": sum(1 for element in at.markdown if "<style" in element.value),
+        "style_bytes": sum(len(element.value) for element in at.markdown if "<style" in element.value),
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+        "exception": [str(element.value) for element in at.exception]
+    }
+
+
+def run_measure(app_path, reruns):
+    output = subprocess.run(
+        [sys.executable, __file__, "--measure", str(app_path), "--reruns", str(reruns)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_version(revision):
+    """
+    git 리비전의 app.py를 임시 파일로 꺼냄 (다른 모듈은 현재 폴더의 것을 씀)
+    """
+    source = subprocess.run(
+        ["git", "show", f"{revision}:./app.py"],
+        cwd=APP_PATH.parent, capture_output=True, text=True, check=True
+    ).stdout
+    handle, path = tempfile.mkstemp(prefix="app_", suffix=".py")
+    with os.fdopen(handle, "w", encoding="utf-8") as f:
+        f.write(source)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 첫 실행/다시 실행 시간 비교")
+    parser.add_argument("--before", help="비교할 이전 app.py의 git 리비전 (예: HEAD~1)")
+    parser.add_argument("--reruns", type=int, default=20, help="다시 실행 횟수")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.reruns)))
+        return
+
+    versions = []
+    if args.before:
+        versions.append((args.before, git_version(args.before)))
+    versions.append(("현재", str(APP_PATH)))
+
+    print(f"다시 실행 {args.reruns}회, 시간은 ms")
+    print(f"{'버전':<10}{'첫 실행':>10}{'재실행 p50':>12}{'재실행 평균':>12}{'입력 중 재실행':>14}"
+          f"{'스타일 블록(바이트)':>18}  첫 화면에서 불러온 모듈")
+    try:
+        for name, path in versions:
+            result = run_measure(path, args.reruns)
+            if result["exception"]:
+                print(f"{name}: 실행 중 오류 {result['exception']}")
+            print(f"{name:<10}{result['cold'] * 1000:>10.0f}{result['rerun_p50'] * 1000:>12.1f}"
+                  f"{result['rerun_mean'] * 1000:>12.1f}"
+                  f"{result['rerun_inputs']:>8}/{result['inputs']:<5}"
+                  f"{result['style_blocks']:>10} ({result['style_bytes']:,})"
+                  f"  {', '.join(result['heavy_modules']) or '-'}")
+    finally:
+        for name, path in versions:
+            if path != str(APP_PATH):
+                os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+"""
+벤치마킹 예시.md의 실제 사례로 분석 품질/지연/토큰을 비교하는 골든셋 벤치마크
+
+벤치마킹 예시.md에는 사례마다 나레이션과 주제/초반 3초/내용 구성 항목별 기대 판단(O/X)이 있습니다.
+사례마다 analyze_with_gpt4를 실행해 분석 결과의 ✅/❌가 기대 판단과 얼마나 맞는지,
+걸린 시간과 입력/출력 토큰 수를 보여주므로 토큰이나 지연을 줄이려고 프롬프트를 바꿨을 때
+분석 품질이 조용히 나빠지지 않았는지 확인할 수 있습니다.
+
+OpenAI 호출은 녹화한 응답을 재생하는 로컬 서버로 보내므로 API 키 없이 오프라인으로 돌아갑니다.
+녹화는 (모델, 메시지, max_tokens) 기준이라 프롬프트나 모델을 바꾸면 한 번 다시 녹화합니다.
+녹화할 때의 프롬프트 버전과 녹화 방식을 manifest.json에 남겨 두고, 재생할 때 버전이 다르거나 녹화가 없는
+요청이 나오면 바로 멈추고 다시 녹화하라고 안내합니다.
+
+저장소의 golden_recordings/는 --backend reference로 만든 녹화입니다. 예시 파일에 함께 적힌 AI 분석
+(주제 분석 (AI) 등)을 지금 응답 형식으로 옮긴 것이라 API 키 없이 만들 수 있고, 프롬프트를 바꾼 뒤
+토큰 수와 파싱/일치율 계산이 그대로인지 바로 확인할 수 있습니다. 응답 시간은 녹화되지 않으므로(0초)
+실제 모델의 품질과 지연은 --backend record로 다시 녹화해서 비교합니다. (reference 녹화는 single 방식만)
+
+    python bench_golden.py --backend reference         # 프롬프트를 바꾼 뒤 저장소의 녹화 갱신 (오프라인)
+    python bench_golden.py --backend record            # 실제 API 응답으로 녹화 (OPENAI_API_KEY 필요)
+    python bench_golden.py --save golden_baseline.json  # 녹화 재생 (오프라인)
+    python bench_golden.py --compare golden_baseline.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+# 캐시된 결과나 비슷한 이전 분석을 쓰지 않고, 실제 기록/작업 저장소도 건드리지 않도록
+# 실행마다 빈 임시 폴더에 저장소를 만듦
+_STORE_DIR = Path(tempfile.mkdtemp(prefix="golden_"))
+for _name, _file in (
+    ("ANALYSIS_CACHE_PATH", "analysis_cache.sqlite3"),
+    ("NEAR_DUPLICATE_PATH", "near_duplicates.sqlite3"),
+    ("HISTORY_DB_PATH", "history.sqlite3"),
+    ("JOB_DB_PATH", "jobs.sqlite3"),
+):
+    os.environ[_name] = str(_STORE_DIR / _file)
+
+from fake_openai_server import FakeOpenAIServer  # noqa: E402
+from prompts import ANALYSIS_PROMPT, CHUNK_PROMPT_VERSION  # noqa: E402
+
+GOLDEN_PATH = Path(__file__).parent.parent / "벤치마킹 예시.md"
+RECORDINGS_DIR = Path(__file__).parent / "golden_recordings"
+MANIFEST_NAME = "manifest.json"
+
+NARRATION_FIELD = "영상 내용 (나레이션 작성)"
+# 예시 파일의 항목 이름 -> 비교할 체크리스트 묶음
+EXPECTED_FIELDS = {
+    "주제 분석 (AI)": "주제",
+    "초반 3초 (카피라이팅) 분석 (AI)": "카피라이팅",
+    "초반 3초 (영상 구성) 분석 (AI)": "영상 구성",
+    "내용 구성 (AI)": "내용 구성",
+}
+
+_CASE = re.compile(r"^# (.+?)\s*$")
+_FIELD = re.compile(r"^([^\s\-\d][^:]*?)\s*:\s(.*)$")
+_EXPECTED_ITEM = re.compile(r"^\s*-\s*(.+?)\s*:\s*([OX])\b")
+
+
+@dataclass
+class GoldenCase:
+    name: str
+    narration: str
+    # {묶음: {항목: 기대 판단(True=O)}}
+    expected: dict = field(default_factory=dict)
+    # 예시 파일의 AI 분석을 1~5번 응답 형식으로 옮긴 텍스트 (--backend reference의 응답)
+    reference: str = ""
+
+    def input_data(self):
+        return {
+            "video_analysis": {
+                "transcript": self.narration,
+                "caption": "",
+                "intro_copy": "",
+                "intro_structure": "",
+                "narration": "",
+                "music": "",
+                "font": ""
+            },
+            # 주제가 없으면 기획(6번) 요청은 보내지 않음
+            "content_info": {"topic": ""}
+        }
+
+
+def load_golden_cases(path=GOLDEN_PATH):
+    """
+    벤치마킹 예시.md에서 "# 이름"으로 시작하는 사례마다 나레이션과 기대 판단을 읽음
+    """
+    cases = []
+    fields = None
+
+    def finish():
+        if fields is None:
+            return
+        expected = {}
+        for name, group in EXPECTED_FIELDS.items():
+            items = {}
+            for line in fields.get(name, "").splitlines():
+                match = _EXPECTED_ITEM.match(line)
+                if match:
+                    items[match.group(1)] = match.group(2) == "O"
+            if items:
+                expected[group] = items
+        narration = fields.get(NARRATION_FIELD, "").strip()
+        if narration and expected:
+            cases.append(GoldenCase(fields["#"], narration, expected, reference_analysis(fields)))
+
+    key = None
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        case = _CASE.match(line)
+        if case:
+            finish()
+            fields, key = {"#": case.group(1)}, None
+            continue
+        if fields is None:
+            continue
+        match = _FIELD.match(line)
+        if match:
+            key = match.group(1)
+            fields[key] = match.group(2)
+        elif key is not None:
+            fields[key] += "\n" + line
+    finish()
+    return cases
+
+
+def _reference_items(text, default_mark):
+    # "- 항목: O (이유)" / "1. 항목: 설명" 줄을 응답 형식의 "- ✅ **항목**: 설명" 줄로
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"^\s*(?:-|\d+\.)\s*", "", line).strip()
+        if not line:
+            continue
+        label, _, rest = line.partition(":")
+        match = re.match(r"\s*([OX])\b\s*(?:\((.*)\))?", rest)
+        mark = default_mark
+        if match:
+            mark = "✅" if match.group(1) == "O" else "❌"
+            rest = match.group(2) or ""
+        rest = rest.strip()
+        lines.append(f"- {mark} **{label.strip()}**: {rest}" if rest else f"- {mark} **{label.strip()}**")
+    return "\n".join(lines)
+
+
+def reference_analysis(fields):
+    """
+    예시 파일에 적힌 AI 분석 항목을 1~5번 분석 응답 형식(prompts.ANALYSIS_PROMPT)으로 옮긴 텍스트
+    """
+    def section(title, name, default_mark="✅", description=None):
+        body = _reference_items(fields.get(name, ""), default_mark)
+        if description:
+            body = f"- **설명: {description.strip()}**\n{body}"
+        return f"{title}\n{body}"
+
+    return "\n\n".join([
+        section("# 1. 주제:", "주제 분석 (AI)", description=fields.get("주제 (AI)")),
+        "# 2. 초반 3초\n" + section("## 카피라이팅 :", "초반 3초 (카피라이팅) 분석 (AI)"),
+        section("## 영상 구성 :", "초반 3초 (영상 구성) 분석 (AI)"),
+        section("# 3. 내용 구성:", "내용 구성 (AI)"),
+        section("# 4. 개선할 점:", "개선할 점 (AI)", default_mark="❌"),
+        section("# 5. 적용할 점:", "내 영상에 적용할 점 (AI)"),
+    ])
+
+
+def _label_key(label):
+    return re.sub(r"[^\w]", "", label)
+
+
+def judgements(parsed):
+    """
+    분석 결과(ParsedAnalysis)의 ✅/❌ 판단을 예시 파일과 같은 묶음으로: {묶음: {항목: 판단}}
+    """
+    groups = {}
+    for section in parsed.analysis_sections:
+        if section.number == 1:
+            groups["주제"] = section.items
+        elif section.number == 2:
+            for sub in section.subsections:
+                groups[sub.title.rstrip(" :")] = sub.items
+        elif section.number == 3:
+            groups["내용 구성"] = section.items
+    return {group: {item.label: item.passed for item in items} for group, items in groups.items()}
+
+
+def agreement(expected, actual):
+    """
+    기대 판단과 분석 결과 비교: (맞은 수, 기대 항목 수, [(묶음, 항목, 기대, 결과 또는 None)] 틀린 항목)
+    항목 이름은 띄어쓰기/문장부호를 빼고 비교하고, 결과에 없는 항목은 틀린 것으로 셉니다.
+    """
+    agreed, total, misses = 0, 0, []
+    for group, items in expected.items():
+        found = {_label_key(label): passed for label, passed in actual.get(group, {}).items()}
+        for label, passed in items.items():
+            total += 1
+            key = _label_key(label)
+            result = found.get(key)
+            if result is None:
+                result = next((value for other, value in found.items() if key in other or other in key), None)
+            if result == passed:
+                agreed += 1
+            else:
+                misses.append((group, label, passed, result))
+    return agreed, total, misses
+
+
+def recording_key(body):
+    request = {name: body.get(name) for name in ("model", "messages", "max_tokens", "temperature")}
+    return hashlib.sha256(json.dumps(request, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ReplayOpenAIServer(FakeOpenAIServer):
+    """
+    녹화한 응답을 (모델, 메시지, max_tokens)로 찾아 돌려주는 OpenAI 호환 서버
+
+    upstream(OpenAI 클라이언트)을 주면 녹화가 없는 요청은 실제 API로 보내 응답과 첫 토큰 지연,
+    전체 시간, usage를 녹화합니다. upstream 대신 reference(지금 분석하는 사례의 GoldenCase.reference)를
+    정해 두면 그 텍스트를 응답으로 녹화합니다. 재생할 때는 녹화된 지연을 speed배 빠르게 흉내 냅니다(0이면 바로 보냄).
+    """
+
+    def __init__(self, directory=RECORDINGS_DIR, upstream=None, speed=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = Path(directory)
+        self.upstream = upstream
+        self.reference = None
+        self.speed = speed
+        self.misses = 0
+        self.recorded = 0
+
+    def respond(self, body):
+        path = self.directory / f"{recording_key(body)}.json"
+        if path.exists():
+            recording = json.loads(path.read_text(encoding="utf-8"))
+        elif self.upstream is not None:
+            recording = self._record_upstream(body, path)
+        elif self.reference:
+            recording = self._record_reference(body, path)
+        else:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if not self.speed:
+            return recording["text"], recording["usage"], 0.0, 0.0
+        pieces = max(1, -(-len(recording["text"]) // self.chunk_size))
+        streaming = max(0.0, recording["seconds"] - recording["first_token"])
+        return (recording["text"], recording["usage"],
+                recording["first_token"] / self.speed, streaming / pieces / self.speed)
+
+    def _record_upstream(self, body, path):
+        started = time.perf_counter()
+        first_token = None
+        parts, usage = [], None
+        stream = self.upstream.chat.completions.create(
+            model=body["model"],
+            messages=body["messages"],
+            temperature=body.get("temperature"),
+            max_tokens=body.get("max_tokens"),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        with stream:
+            for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage.model_dump()
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    parts.append(chunk.choices[0].delta.content)
+        return self._save(body, path, "".join(parts), usage, first_token or 0.0, time.perf_counter() - started)
+
+    def _record_reference(self, body, path):
+        # 응답 시간은 알 수 없으므로 0, 토큰 수는 tiktoken으로 계산
+        from prompts import count_message_tokens, count_tokens
+
+        prompt_tokens = count_message_tokens(body["messages"])
+        completion_tokens = count_tokens(self.reference)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        return self._save(body, path, self.reference, usage, 0.0, 0.0)
+
+    def _save(self, body, path, text, usage, first_token, seconds):
+        recording = {
+            "model": body["model"],
+            "max_tokens": body.get("max_tokens"),
+            "messages": body["messages"],
+            "text": text,
+            "usage": usage,
+            "first_token": first_token,
+            "seconds": seconds,
+            "recorded_at": datetime.now().isoformat(timespec="seconds")
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(recording, ensure_ascii=False, indent=1), encoding="utf-8")
+        with self._lock:
+            self.recorded += 1
+        return recording
+
+
+def prompt_versions():
+    # 녹화한 요청 메시지를 정하는 프롬프트 버전 (바뀌면 녹화가 맞지 않음)
+    return {"analysis": ANALYSIS_PROMPT.version, "chunk": CHUNK_PROMPT_VERSION}
+
+
+def write_manifest(directory, source):
+    # source: "openai"(실제 API 응답) 또는 "reference"(예시 파일의 AI 분석)
+    path = Path(directory) / MANIFEST_NAME
+    path.write_text(json.dumps({
+        "prompt_versions": prompt_versions(),
+        "source": source,
+        "recorded_at": datetime.now().isoformat(timespec="seconds")
+    }, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+def check_recordings(directory):
+    """
+    재생하기 전에 녹화를 확인하고, 쓸 수 없으면 다시 녹화하라는 안내와 함께 종료
+    반환: manifest의 녹화 방식 ("openai", "reference", 알 수 없으면 None)
+    """
+    directory = Path(directory)
+    if not any(path.name != MANIFEST_NAME for path in directory.glob("*.json")):
+        sys.exit(f"녹화 폴더 {directory}에 녹화가 없습니다. --backend reference(오프라인) 또는 "
+                 "--backend record(OPENAI_API_KEY 필요)로 먼저 녹화하세요.")
+    manifest = directory / MANIFEST_NAME
+    if not manifest.exists():
+        print(f"{manifest}가 없어 녹화할 때의 프롬프트 버전을 확인하지 못했습니다. (녹화가 없는 요청이 나오면 멈춤)")
+        return None
+    manifest = json.loads(manifest.read_text(encoding="utf-8"))
+    recorded = manifest.get("prompt_versions", {})
+    current = prompt_versions()
+    if recorded != current:
+        sys.exit(f"녹화할 때의 프롬프트 버전({recorded})과 지금 버전({current})이 다릅니다. "
+                 "--backend reference 또는 --backend record로 다시 녹화하세요.")
+    return manifest.get("source")
+
+
+def run_case(case, mode=None):
+    """
+    사례 하나를 analyze_with_gpt4로 분석하고 지연/토큰/일치 결과를 반환
+    """
+    import metrics
+    from analysis_parser import parse_analysis
+    from reels_extraction import analyze_with_gpt4, extract_reels_info
+
+    input_data = case.input_data()
+    result = {"case": case.name}
+    with metrics.trace_analysis("golden") as trace:
+        try:
+            text = analyze_with_gpt4(extract_reels_info(input_data), input_data, mode=mode)
+        except Exception as e:
+            metrics.record_error(e)
+            text = None
+            result["error"] = f"{type(e).__name__}: {e}"
+    agreed, total, misses = agreement(case.expected, judgements(parse_analysis(text or "")))
+    result.update({
+        "seconds": time.perf_counter() - trace.started,
+        "first_token": trace.stages.get("first_token"),
+        "input_tokens": trace.tokens["prompt"],
+        "output_tokens": trace.tokens["completion"],
+        "agreed": agreed,
+        "total": total,
+        "misses": misses
+    })
+    return result
+
+
+def summarize(results):
+    agreed = sum(r["agreed"] for r in results)
+    total = sum(r["total"] for r in results)
+    return {
+        "cases": len(results),
+        "errors": sum(1 for r in results if "error" in r),
+        "agreement": agreed / total if total else 0.0,
+        "seconds": sum(r["seconds"] for r in results),
+        "input_tokens": sum(r["input_tokens"] for r in results),
+        "output_tokens": sum(r["output_tokens"] for r in results)
+    }
+
+
+def print_report(results, summary, baseline=None):
+    print(f"{'사례':<12}{'시간(초)':>9}{'첫 토큰':>9}{'입력 토큰':>10}{'출력 토큰':>10}{'일치':>9}")
+    for r in results:
+        first_token = f"{r['first_token']:.2f}" if r["first_token"] is not None else "-"
+        print(f"{r['case']:<12}{r['seconds']:>9.2f}{first_token:>9}{r['input_tokens']:>10,}"
+              f"{r['output_tokens']:>10,}{r['agreed']:>5}/{r['total']:<3}")
+        if "error" in r:
+            print(f"    오류: {r['error']}")
+            continue
+        for group, label, expected, actual in r["misses"]:
+            actual = "없음" if actual is None else ("O" if actual else "X")
+            print(f"    {group} / {label}: 기대 {'O' if expected else 'X'}, 결과 {actual}")
+
+    print(f"\n일치율 {summary['agreement']:.1%}, 오류 {summary['errors']}건, 시간 {summary['seconds']:.2f}초, "
+          f"입력 토큰 {summary['input_tokens']:,}, 출력 토큰 {summary['output_tokens']:,}")
+    if baseline:
+        print(f"기준 대비: 일치율 {summary['agreement'] - baseline['agreement']:+.1%}, "
+              f"시간 {summary['seconds'] - baseline['seconds']:+.2f}초, "
+              f"입력 토큰 {summary['input_tokens'] - baseline['input_tokens']:+,}, "
+              f"출력 토큰 {summary['output_tokens'] - baseline['output_tokens']:+,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마킹 예시.md 골든셋으로 분석 품질/지연/토큰 비교")
+    parser.add_argument("--golden", default=str(GOLDEN_PATH), help="사례 파일 (기본: 벤치마킹 예시.md)")
+    parser.add_argument("--backend", choices=["replay", "record", "reference", "fake"], default="replay",
+                        help="replay: 녹화 재생(오프라인), record: 녹화가 없으면 실제 API로 녹화, "
+                             "reference: 녹화가 없으면 예시 파일의 AI 분석으로 녹화(오프라인), "
+                             "fake: 테스트 서버의 고정 응답 (벤치마크 자체 확인용)")
+    parser.add_argument("--recordings", default=str(RECORDINGS_DIR), help="녹화 폴더")
+    parser.add_argument("--speed", type=float, default=1.0, help="녹화된 지연을 몇 배 빠르게 재생할지 (0: 기다리지 않음)")
+    parser.add_argument("--mode", choices=["single", "fanout"], help="분석 실행 방식 (기본: ANALYSIS_EXECUTION_MODE)")
+    parser.add_argument("--save", help="결과를 JSON으로 저장 (다음 실행의 --compare 기준)")
+    parser.add_argument("--compare", help="이전에 --save로 저장한 결과와 비교")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="기준보다 일치율이 이만큼 넘게 떨어지면 종료 코드 1")
+    args = parser.parse_args()
+
+    cases = load_golden_cases(args.golden)
+    if not cases:
+        sys.exit(f"{args.golden}에서 사례를 찾지 못했습니다.")
+    if args.backend == "reference":
+        if args.mode == "fanout":
+            sys.exit("--backend reference는 1~5번을 한 번에 요청하는 single 방식만 녹화할 수 있습니다.")
+        args.mode = "single"
+
+    if args.backend == "fake":
+        server = FakeOpenAIServer()
+    else:
+        upstream = None
+        if args.backend == "record":
+            # 녹화는 실제 OpenAI(또는 .env의 OPENAI_BASE_URL)로 보냄
+            from dotenv import load_dotenv
+            from openai import OpenAI
+            load_dotenv()
+            upstream = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL"))
+        elif args.backend == "replay" and check_recordings(args.recordings) == "reference":
+            print("예시 파일의 AI 분석으로 만든 녹화입니다. 응답 시간(0초)은 실제 지연이 아닙니다.")
+        server = ReplayOpenAIServer(args.recordings, upstream=upstream, speed=args.speed)
+    server.start()
+    # 환경 변수를 정한 뒤에 api_config를 불러와야 분석 요청이 재생 서버로 감
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "test")
+
+    replay = args.backend == "replay"
+    results = []
+    try:
+        for case in cases:
+            if args.backend == "reference":
+                server.reference = case.reference
+            results.append(run_case(case, args.mode))
+            if replay and server.misses:
+                # 녹화가 없는 요청은 404로 실패하므로 나머지 사례를 돌려도 의미 있는 결과가 나오지 않음
+                break
+    finally:
+        server.stop()
+
+    if replay and server.misses:
+        sys.exit(f"{results[-1]['case']} 사례에서 녹화가 없는 요청이 나왔습니다. 프롬프트(또는 버전을 올리지 않은 "
+                 "프롬프트 수정)나 모델이 녹화 후 바뀌었으니 --backend reference 또는 --backend record로 "
+                 "다시 녹화하세요.")
+    if args.backend in ("record", "reference"):
+        write_manifest(args.recordings, "openai" if args.backend == "record" else "reference")
+
+    summary = summarize(results)
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["summary"]
+    print(f"사례 {len(cases)}개, backend={args.backend}")
+    print_report(results, summary, baseline)
+
+    if args.save:
+        Path(args.save).write_text(
+            json.dumps({"summary": summary, "cases": results}, ensure_ascii=False, indent=1), encoding="utf-8"
+        )
+    if baseline and summary["agreement"] < baseline["agreement"] - args.tolerance:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+분석 기록 저장소(history_store.py)의 검색/페이지 넘기기 지연 측정
+
+릴스 강의 정리의 단어를 섞어 만든 가짜 분석 기록 --entries개(사용자/주제/날짜를 나눠 가짐)를 넣고,
+첫 페이지, 뒤쪽 페이지(cursor), 사용자/주제 필터, 흔한/드문/두 글자 검색어, 기록 열기의 지연을 잽니다.
+
+    python bench_history.py --entries 100000 --queries 200
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from analysis_parser import parse_analysis
+from api_config import LECTURE_NOTES_PATH
+from fake_openai_server import DEFAULT_RESPONSE
+from history_store import HistoryStore
+
+OWNERS = 50
+TOPICS = ("부업", "재테크", "다이어트", "육아", "자기계발", "요리", "여행", "업무 꿀팁", "공부법", "인테리어")
+# 기록 시각을 고르게 나눌 기간 (초)
+SPAN = 365 * 24 * 3600
+BATCH = 5000
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def load_words(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return [word for row in csv.DictReader(f) for word in row["text"].split()]
+
+
+def make_entry(words, rng, created_at):
+    topic = rng.choice(TOPICS)
+    input_data = {
+        "video_analysis": {
+            "caption": " ".join(rng.choice(words) for _ in range(rng.randint(5, 10))),
+            "transcript": " ".join(rng.choice(words) for _ in range(rng.randint(40, 80)))
+        },
+        "content_info": {"topic": topic}
+    }
+    return {
+        "input_data": input_data,
+        "analysis": DEFAULT_RESPONSE,
+        "structured": None,
+        "reels_info": {},
+        "owner": f"user-{rng.randrange(OWNERS)}",
+        "created_at": created_at
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분석 기록 검색 벤치마크")
+    parser.add_argument("--entries", type=int, default=100000, help="넣을 분석 기록 수")
+    parser.add_argument("--queries", type=int, default=200, help="조회 종류별 횟수")
+    parser.add_argument("--notes", default=LECTURE_NOTES_PATH)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = load_words(args.notes)
+    structured = parse_analysis(DEFAULT_RESPONSE)
+    now = time.time()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.sqlite3")
+        store = HistoryStore(path)
+        # 실제처럼 기록 시각이 SPAN 동안 고르게 늘어나는 순서로 기록
+        times = sorted(now - rng.random() * SPAN for _ in range(args.entries))
+        started = time.perf_counter()
+        for start in range(0, args.entries, BATCH):
+            entries = [make_entry(words, rng, created_at) for created_at in times[start:start + BATCH]]
+            for entry in entries:
+                entry["structured"] = structured
+            store.record_many(entries)
+        build = time.perf_counter() - started
+
+        # 뒤쪽 페이지: 첫 페이지부터 cursor로 절반쯤 내려간 위치
+        deep_cursor = None
+        for _ in range(args.entries // 2 // 100):
+            _, deep_cursor = store.search(cursor=deep_cursor, limit=100)
+        common = max({word for word in words if len(word) > 1}, key=words.count)
+        rare = min((word for word in set(words) if 2 < len(word) < 10), key=words.count)
+        two_syllable = next(word for word in TOPICS if len(word) == 2)
+        ids = [item["id"] for item in store.search(limit=1000)[0]]
+
+        cases = (
+            ("첫 페이지", lambda: store.search()),
+            ("뒤쪽 페이지(cursor)", lambda: store.search(cursor=deep_cursor)),
+            ("사용자", lambda: store.search(owner=f"user-{rng.randrange(OWNERS)}")),
+            ("주제", lambda: store.search(topic=rng.choice(TOPICS))),
+            ("기간", lambda: store.search(since=now - SPAN / 2, until=now - SPAN / 4)),
+            (f"흔한 단어({common})", lambda: store.search(common)),
+            (f"드문 단어({rare})", lambda: store.search(rare)),
+            (f"두 글자({two_syllable})", lambda: store.search(two_syllable)),
+            ("검색어+사용자", lambda: store.search(common, owner=f"user-{rng.randrange(OWNERS)}")),
+            ("검색어+뒤쪽 페이지", lambda: store.search(common, cursor=deep_cursor)),
+            ("한 글자(접두어)", lambda: store.search(common[0])),
+            ("기록 열기", lambda: store.get(rng.choice(ids))),
+        )
+        results = []
+        for label, run in cases:
+            latencies = []
+            for _ in range(args.queries):
+                started = time.perf_counter()
+                run()
+                latencies.append(time.perf_counter() - started)
+            results.append((label, latencies))
+
+        size = os.path.getsize(path) + sum(
+            os.path.getsize(path + suffix) for suffix in ("-wal", "-shm") if os.path.exists(path + suffix)
+        )
+
+    print(f"분석 기록 {args.entries:,}개, 저장 {build:.1f}초, 파일 {size / 1024 / 1024:.0f} MB")
+    print(f"{'조회':<20}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for label, latencies in results:
+        print(f"{label:<20}{_percentile(latencies, 50) * 1000:>10.2f}{_percentile(latencies, 95) * 1000:>10.2f}"
+              f"{_percentile(latencies, 99) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
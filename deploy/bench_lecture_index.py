@@ -0,0 +1,65 @@
+"""
+릴스 강의 인덱스의 생성 시간, 콜드 로드 시간, 검색 지연(p50/p95/p99) 측정
+
+    python bench_lecture_index.py --queries 500
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from lecture_index import LectureIndex, build_index, load_lecture_passages, _file_sha256
+from api_config import LECTURE_NOTES_PATH
+from prompts import PART_QUERY_HINTS
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="강의 인덱스 벤치마크")
+    parser.add_argument("--notes", default=LECTURE_NOTES_PATH)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    passages = load_lecture_passages(args.notes)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lecture_index.bin")
+
+        started = time.perf_counter()
+        build_index(passages, path, _file_sha256(args.notes))
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index = LectureIndex(path)
+        load_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        index.search(passages[0], args.k)
+        first_query_seconds = time.perf_counter() - started
+
+        # 실제 분석과 비슷하게 강의 구간 하나(릴스 스크립트 대신) + 항목별 기준 용어로 검색
+        hints = list(PART_QUERY_HINTS.values())
+        latencies = []
+        for i in range(args.queries):
+            query = passages[(i * 7) % len(passages)] + " " + hints[i % len(hints)]
+            started = time.perf_counter()
+            index.search(query, args.k)
+            latencies.append(time.perf_counter() - started)
+
+        size_kb = os.path.getsize(path) / 1024
+
+    print(f"구간 {len(passages)}개, 인덱스 파일 {size_kb:.0f} KB")
+    print(f"생성 {build_seconds * 1000:.1f} ms")
+    print(f"콜드 로드(mmap 열기) {load_seconds * 1000:.2f} ms, 첫 검색 {first_query_seconds * 1000:.2f} ms")
+    print(f"검색 {args.queries}회: 평균 {statistics.mean(latencies) * 1000:.3f} ms, "
+          f"p50 {_percentile(latencies, 50) * 1000:.3f} ms, "
+          f"p95 {_percentile(latencies, 95) * 1000:.3f} ms, "
+          f"p99 {_percentile(latencies, 99) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
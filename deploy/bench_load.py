@@ -0,0 +1,244 @@
+"""
+동시 사용자 부하 테스트 (배포 하나가 몇 명까지 버티는지)
+
+Streamlit은 세션마다 스레드 하나로 app.py를 실행하므로, 한 프로세스 안에서 세션 수만큼 스레드를 띄워
+get_cached_analysis와 같은 입력으로 analyze_with_gpt4(스트리밍) + analysis_structure를 반복 호출합니다.
+OpenAI 대신 지연/토큰 속도/오류율을 정할 수 있는 fake_openai_server를 쓰므로 API 키나 비용이 들지 않습니다.
+
+시나리오마다 빈 분석 캐시를 쓰는 새 프로세스에서 실행해 최대 메모리도 따로 잽니다.
+- cold: 모든 요청이 서로 다른 입력 (캐시 미스만)
+- hot:  미리 분석해 둔 입력만 요청 (캐시 적중만)
+- mix:  --identical-ratio 비율은 인기 입력 --popular개 중 하나, 나머지는 새 입력
+
+    python bench_load.py --sessions 20 --requests 3 --first-token-delay 0.5 --tokens-per-second 100
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from fake_openai_server import FakeOpenAIServer
+
+SCENARIOS = ("cold", "hot", "mix")
+# get_cached_analysis 입력 양식 (벤치마킹 예시.md의 사례)
+SAMPLE_INPUT = {
+    "video_analysis": {
+        "transcript": "요즘은 이렇게 하면 PPT 발표 3초만에 만들어요\n"
+                      "감마 사이트 들어가서 새로 만들기 하고 ~생성 / 내가 원하는 주제에 PPT 입력하면 끝납니다. / "
+                      "원하는 템플릿 사용하고 그 다음에 생성 누르면 AI가 알아서 써줍니다 / "
+                      "완벽한 PPT 발표를 그 다음에 그냥 발표하면 끝. 소중한 친구에게 공유해주세요",
+        "caption": "PPT 3초 완성 저장해두고 써보세요 #업무꿀팁",
+        "intro_copy": "요즘은 이렇게 하면 PPT 발표 3초만에 만들어요",
+        "intro_structure": "완성된 PPT 화면을 먼저 보여줌",
+        "narration": "20대 남성의 친근한 톤",
+        "music": "",
+        "font": ""
+    },
+    "content_info": {
+        "topic": "직장인 보고서 자동화"
+    }
+}
+
+
+def _percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def make_input(index):
+    # 캡션이 다르면 릴스 분석/기획 캐시 키가 모두 달라짐
+    video_analysis = {**SAMPLE_INPUT["video_analysis"]}
+    video_analysis["caption"] += f" #{index}"
+    return {"video_analysis": video_analysis, "content_info": dict(SAMPLE_INPUT["content_info"])}
+
+
+def scenario_inputs(scenario, total, popular, identical_ratio, seed):
+    """
+    시나리오의 요청 순서대로 입력 목록과 미리 분석해 둘 입력 목록을 반환
+    """
+    rng = random.Random(seed)
+    if scenario == "cold":
+        return [make_input(i) for i in range(total)], []
+    pool = [make_input(f"popular-{i}") for i in range(popular)]
+    if scenario == "hot":
+        return [rng.choice(pool) for _ in range(total)], pool
+    return [
+        rng.choice(pool) if rng.random() < identical_ratio else make_input(i)
+        for i in range(total)
+    ], []
+
+
+def _counters():
+    import metrics
+    from reels_extraction import ANALYSIS_MODEL
+    counts = {
+        result: sum(metrics.CACHE_REQUESTS.value(section=section, result=result) for section in ("reel", "planning"))
+        for result in ("hit", "miss", "coalesced")
+    }
+    counts["upstream"] = metrics.UPSTREAM_REQUESTS.value(model=ANALYSIS_MODEL, outcome="ok")
+    return counts
+
+
+def run_worker(args):
+    """
+    (새 프로세스에서) 세션 스레드를 띄워 시나리오를 실행하고 결과를 dict로 반환
+    """
+    from reels_extraction import analysis_structure, analyze_with_gpt4, extract_reels_info
+
+    def analyze(input_data, on_delta=None):
+        info = extract_reels_info(input_data)
+        analyze_with_gpt4(info, input_data, on_delta=on_delta)
+        return analysis_structure(info, input_data)
+
+    inputs, warm = scenario_inputs(
+        args.worker, args.sessions * args.requests, args.popular, args.identical_ratio, args.seed
+    )
+    for input_data in warm:
+        analyze(input_data)
+
+    before = _counters()
+    latencies, first_tokens, errors = [], [], []
+    lock = threading.Lock()
+    cursor = iter(inputs)
+    start_barrier = threading.Barrier(args.sessions)
+
+    def session():
+        start_barrier.wait()
+        while True:
+            with lock:
+                input_data = next(cursor, None)
+            if input_data is None:
+                return
+            started = time.perf_counter()
+            first = []
+
+            def on_delta(delta):
+                if not first:
+                    first.append(time.perf_counter() - started)
+
+            try:
+                analyze(input_data, on_delta)
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                first_tokens.extend(first)
+
+    threads = [threading.Thread(target=session) for _ in range(args.sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    after = _counters()
+    counts = {name: after[name] - before[name] for name in after}
+    return {
+        "requests": len(inputs),
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_types": sorted(set(errors)),
+        "elapsed": elapsed,
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "first_token_p50": _percentile(first_tokens, 50),
+        "first_token_p95": _percentile(first_tokens, 95),
+        "lookups": {result: counts[result] for result in ("hit", "miss", "coalesced")},
+        "upstream": counts["upstream"],
+        # 리눅스는 KB, macOS는 바이트 단위
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    }
+
+
+# 시나리오마다 비워서 시작하는 저장소 (환경 변수, 임시 폴더 안의 이름)
+# 강의 색인(LECTURE_INDEX_PATH)은 입력과 무관하게 강의 정리 파일에서 만드는 파일이라 함께 씀
+SCENARIO_STORES = (
+    ("ANALYSIS_CACHE_PATH", "analysis_cache.sqlite3"),
+    ("NEAR_DUPLICATE_PATH", "near_duplicates.sqlite3"),
+    ("HISTORY_DB_PATH", "history.sqlite3"),
+    ("JOB_DB_PATH", "jobs.sqlite3"),
+    ("SNAPSHOT_DB_PATH", "snapshots.sqlite3"),
+    ("ANALYTICS_CACHE_DIR", "analytics"),
+    ("MEDIA_DIR", "media"),
+    ("MEDIA_CACHE_DIR", "blobs"),
+)
+
+
+def run_scenario(scenario, args, base_url):
+    # 시나리오마다 모든 저장소를 새 임시 폴더에 만들어 앞 시나리오의 결과를 재사용하지 않게 함
+    store_dir = Path(tempfile.mkdtemp(prefix="load_"))
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "test"),
+        "METRICS_JSON_LOG": "0",
+        **{name: str(store_dir / file_name) for name, file_name in SCENARIO_STORES},
+    }
+    command = [
+        sys.executable, __file__, "--worker", scenario,
+        "--sessions", str(args.sessions), "--requests", str(args.requests),
+        "--popular", str(args.popular), "--identical-ratio", str(args.identical_ratio), "--seed", str(args.seed)
+    ]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 세션 부하 테스트 (fake OpenAI 서버 사용)")
+    parser.add_argument("--sessions", type=int, default=20, help="동시 사용자(세션) 수")
+    parser.add_argument("--requests", type=int, default=3, help="세션마다 연달아 보내는 분석 요청 수")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--popular", type=int, default=3, help="hot/mix 시나리오의 인기 입력 수")
+    parser.add_argument("--identical-ratio", type=float, default=0.5, help="mix 시나리오에서 인기 입력을 고르는 비율")
+    parser.add_argument("--first-token-delay", type=float, default=0.5, help="OpenAI 첫 토큰 지연(초)")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0,
+                        help="응답 속도 (SSE 조각 하나를 토큰 하나로 침)")
+    parser.add_argument("--chunk-size", type=int, default=4, help="SSE 조각 하나의 글자 수")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/500 오류를 돌려줄 요청 비율")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    server = FakeOpenAIServer(
+        chunk_size=args.chunk_size, chunk_delay=1 / args.tokens_per_second,
+        first_token_delay=args.first_token_delay, error_rate=args.error_rate,
+        retry_after=0.1, seed=args.seed
+    ).start()
+    print(f"세션 {args.sessions}개 x 요청 {args.requests}건, 첫 토큰 {args.first_token_delay}초, "
+          f"{args.tokens_per_second:.0f} 토큰/초, 오류 {args.error_rate:.0%}")
+    print(f"{'시나리오':<8}{'처리량(건/초)':>12}{'p50':>8}{'p95':>8}{'p99':>8}{'첫 토큰 p50':>12}"
+          f"{'캐시 적중':>10}{'합쳐짐':>8}{'OpenAI 요청':>12}{'오류':>6}{'최대 메모리(MB)':>16}")
+    try:
+        for scenario in args.scenarios:
+            result = run_scenario(scenario, args, server.base_url)
+            lookups = result["lookups"]
+            total = sum(lookups.values()) or 1
+            print(f"{scenario:<8}{result['ok'] / result['elapsed']:>12.2f}{result['p50']:>8.2f}"
+                  f"{result['p95']:>8.2f}{result['p99']:>8.2f}{result['first_token_p50']:>12.2f}"
+                  f"{lookups['hit'] / total:>10.0%}{lookups['coalesced'] / total:>8.0%}{result['upstream']:>12}"
+                  f"{result['errors']:>6}{result['peak_rss_mb']:>16.0f}")
+            if result["error_types"]:
+                print(f"    오류 종류: {', '.join(result['error_types'])}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
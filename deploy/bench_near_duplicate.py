@@ -0,0 +1,117 @@
+"""
+유사 입력 인덱스(near_duplicate.py)의 조회 지연과 재현율 측정
+
+릴스 강의 정리의 단어를 섞어 만든 가짜 릴스 입력 --entries개를 인덱스에 넣고,
+그중 일부를 띄어쓰기/해시태그/오타 수준으로 고친 입력(찾아야 함)과 새 입력(찾으면 안 됨)으로 조회합니다.
+조회 지연은 서명 계산을 뺀 LSH 조회만 재고, 서명 계산 시간은 따로 표시합니다.
+
+    python bench_near_duplicate.py --entries 50000 --queries 1000
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from api_config import LECTURE_NOTES_PATH, NEAR_DUPLICATE_THRESHOLD
+from near_duplicate import NearDuplicateIndex, signature
+
+HASHTAGS = ("#릴스", "#꿀팁", "#업무꿀팁", "#직장인", "#자기계발", "#브이로그", "#일상", "#정보")
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def load_words(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return [word for row in csv.DictReader(f) for word in row["text"].split()]
+
+
+def make_reel(words, rng):
+    transcript = " ".join(rng.choice(words) for _ in range(rng.randint(40, 80)))
+    caption = " ".join(rng.choice(words) for _ in range(rng.randint(5, 10)))
+    return f"{transcript}\n{caption} {' '.join(rng.sample(HASHTAGS, 2))}"
+
+
+def light_edit(text, rng):
+    """
+    사용자가 다시 제출할 때 흔한 수정 하나 (띄어쓰기 / 해시태그 바꾸기 / 오타 한 글자 고치기)
+    """
+    kind = rng.choice(("space", "hashtag", "typo"))
+    if kind == "space":
+        i = rng.randrange(len(text))
+        return text[:i] + " " + text[i:]
+    if kind == "hashtag":
+        return text + " " + rng.choice(HASHTAGS)
+    i = rng.randrange(len(text))
+    return text[:i] + "팁" + text[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="유사 입력 인덱스 벤치마크")
+    parser.add_argument("--entries", type=int, default=50000, help="인덱스에 넣을 이전 분석 수")
+    parser.add_argument("--queries", type=int, default=1000, help="조회 종류별 횟수")
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD)
+    parser.add_argument("--notes", default=LECTURE_NOTES_PATH)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = load_words(args.notes)
+    texts = [make_reel(words, rng) for _ in range(args.entries)]
+
+    started = time.perf_counter()
+    signatures = [signature(text) for text in texts]
+    sign_ms = (time.perf_counter() - started) / len(texts) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "near_duplicates.sqlite3")
+        started = time.perf_counter()
+        NearDuplicateIndex(path).add_many(
+            (sig, "scope", f"reel-{i}", None) for i, sig in enumerate(signatures)
+        )
+        build = time.perf_counter() - started
+
+        # 다른 프로세스가 만든 파일을 처음 여는 것과 같은 상태 (첫 조회 때 전체를 읽음)
+        index = NearDuplicateIndex(path)
+        started = time.perf_counter()
+        loaded = len(index)
+        load = time.perf_counter() - started
+
+        results = {}
+        for name in ("edited", "new"):
+            latencies, found = [], 0
+            for _ in range(args.queries):
+                if name == "edited":
+                    target = rng.randrange(len(texts))
+                    sig = signature(light_edit(texts[target], rng))
+                else:
+                    target = None
+                    sig = signature(make_reel(words, rng))
+                started = time.perf_counter()
+                matches = index.query(sig, "scope", args.threshold)
+                latencies.append(time.perf_counter() - started)
+                if name == "edited":
+                    found += any(reel_key == f"reel-{target}" for _, reel_key, _ in matches)
+                else:
+                    found += bool(matches)
+            results[name] = (latencies, found)
+
+        size = os.path.getsize(path) + sum(
+            os.path.getsize(path + suffix) for suffix in ("-wal", "-shm") if os.path.exists(path + suffix)
+        )
+
+    print(f"이전 분석 {loaded:,}개, 기준 유사도 {args.threshold}, 서명 계산 {sign_ms:.2f} ms/건")
+    print(f"저장 {build:.2f}초, 파일 {size / 1024 / 1024:.1f} MB, 첫 조회 시 불러오기 {load:.2f}초")
+    print(f"{'조회':<10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'찾은 비율':>12}")
+    for name, label in (("edited", "조금 고침"), ("new", "새 입력")):
+        latencies, found = results[name]
+        print(f"{label:<10}{_percentile(latencies, 50) * 1000:>10.3f}{_percentile(latencies, 95) * 1000:>10.3f}"
+              f"{_percentile(latencies, 99) * 1000:>10.3f}{found / args.queries:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
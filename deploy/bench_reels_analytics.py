@@ -0,0 +1,68 @@
+"""
+reels_analytics의 대용량 처리 시간 측정 (가짜 reels_info CSV 생성)
+
+CSV 첫 로드(파싱 + Parquet 저장), Parquet 재로드, 지표 계산, 상위 릴스 선택 시간을 비교합니다.
+
+    python bench_reels_analytics.py --rows 300000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def make_export(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    owners = np.array([f"user_{i}" for i in range(max(1, rows // 50))])
+    music = np.array([f"track_{i}" for i in range(max(1, rows // 200))])
+    views = rng.lognormal(10, 2, rows).astype("int64")
+    frame = pd.DataFrame({
+        "shortcode": [f"C{i:010d}" for i in range(rows)],
+        "date": pd.Timestamp("2024-09-01") + pd.to_timedelta(rng.integers(0, 150 * 86400, rows), unit="s"),
+        "transcript": "너무 웃긴다 이렇게 입으면 안 돼요",
+        "caption": "체형보완 몰랐을 땐 진짜 이러고 다님 #패션",
+        "view_count": views,
+        "video_duration": rng.uniform(5, 90, rows).round(3),
+        "likes": (views * rng.uniform(0.001, 0.08, rows)).astype("int64"),
+        "comments": (views * rng.uniform(0, 0.003, rows)).astype("int64"),
+        "music_title": np.where(rng.random(rows) < 0.3, None, rng.choice(music, rows)),
+        "music_artist": None,
+        "owner": rng.choice(owners, rows),
+        "video_url": "https://example.com/video.mp4"
+    })
+    frame.to_csv(path, index=False)
+
+
+def _timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<24}{(time.perf_counter() - started) * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="릴스 성과 분석 벤치마크")
+    parser.add_argument("--rows", type=int, default=300000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 이 실행에서 만든 Parquet 캐시만 쓰도록 캐시 폴더를 임시 폴더로 지정
+        os.environ["ANALYTICS_CACHE_DIR"] = os.path.join(tmp, "cache")
+        from reels_analytics import compute_metrics, load_reels_exports, top_benchmark_reels
+
+        path = os.path.join(tmp, "reels_info_20250130_144309.csv")
+        make_export(path, args.rows)
+        print(f"행 {args.rows:,}개, CSV {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        _timed("CSV 로드 + Parquet 저장", lambda: load_reels_exports(path))
+        frame = _timed("Parquet 재로드", lambda: load_reels_exports(path))
+        metrics = _timed("지표 계산", lambda: compute_metrics(frame))
+        top = _timed("상위 20개 선택", lambda: top_benchmark_reels(metrics, n=20))
+        print(top[["shortcode", "owner", "view_count", "engagement_rate", "benchmark_score"]].head(5).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
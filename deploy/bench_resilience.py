@@ -0,0 +1,107 @@
+"""
+재시도/헤지 설정별 응답 시간(p50/p95/p99)과 실패율 비교
+
+장애를 주입한 fake_openai_server를 띄워 같은 요청을 여러 번 보내고,
+설정마다 resilient_stream으로 끝까지 받은 시간을 비교합니다. API 키나 비용이 들지 않습니다.
+
+    python bench_resilience.py --requests 200 --error-rate 0.05 --slow-rate 0.05 --slow-delay 2
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from fake_openai_server import FakeOpenAIServer  # noqa: E402
+
+
+def _percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run_scenario(client, policy, requests, concurrency):
+    """
+    requests번 스트리밍 요청을 보내 성공한 요청의 소요 시간 목록과 실패 수를 반환
+    """
+    from resilience import resilient_stream
+
+    messages = [{"role": "user", "content": "벤치마크"}]
+
+    def open_stream(timeout):
+        stream = client.chat.completions.create(
+            model="gpt-4o", messages=messages, stream=True, timeout=timeout
+        )
+        with stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def one(_):
+        started = time.perf_counter()
+        try:
+            "".join(resilient_stream(open_stream, policy))
+        except Exception:
+            return None
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    latencies = [r for r in results if r is not None]
+    return latencies, len(results) - len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="재시도/헤지 설정별 꼬리 지연 비교")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=2.0)
+    parser.add_argument("--chunk-delay", type=float, default=0.002)
+    parser.add_argument("--deadline", type=float, default=10.0)
+    parser.add_argument("--warmup", type=int, default=100, help="설정마다 먼저 보내는 사전 요청 수")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        chunk_size=64, chunk_delay=args.chunk_delay,
+        error_rate=args.error_rate, retry_after=0.05,
+        slow_rate=args.slow_rate, slow_delay=args.slow_delay, seed=args.seed
+    ).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+
+    # 환경 변수를 정한 뒤에 불러와야 테스트 서버 주소를 씀
+    from openai_client import get_openai_client
+    from resilience import LatencyTracker, ResiliencePolicy
+
+    client = get_openai_client()
+    scenarios = [
+        ("재시도 없음", dict(max_attempts=1, hedge=False)),
+        ("재시도", dict(max_attempts=4, hedge=False)),
+        ("재시도 + 헤지(p90)", dict(max_attempts=4, hedge=True, hedge_percentile=90)),
+    ]
+
+    print(f"요청 {args.requests}건, 동시 {args.concurrency}, 오류 {args.error_rate:.0%}, "
+          f"느린 응답 {args.slow_rate:.0%}({args.slow_delay}초)")
+    print(f"{'설정':<18}{'p50':>8}{'p95':>8}{'p99':>8}{'실패':>6}{'요청':>6}")
+    try:
+        for name, options in scenarios:
+            tracker = LatencyTracker()
+            policy = ResiliencePolicy(deadline=args.deadline, backoff_base=0.05, tracker=tracker, **options)
+            # 헤지 기준 지연을 잡기 위한 사전 요청 (결과에는 포함하지 않음)
+            run_scenario(client, policy, args.warmup, args.concurrency)
+            sent_before = server.request_count
+            latencies, failures = run_scenario(client, policy, args.requests, args.concurrency)
+            sent = server.request_count - sent_before
+            print(f"{name:<18}{_percentile(latencies, 50):>8.3f}{_percentile(latencies, 95):>8.3f}"
+                  f"{_percentile(latencies, 99):>8.3f}{failures:>6}{sent:>6}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Range 요청을 지원하는 로컬 영상 파일 서버 (인스타그램 CDN 대신 쓰는 테스트용)
+
+이어받기(Range)와 중간에 끊긴 다운로드를 확인할 때 사용합니다.
+
+    python fake_media_server.py videos --port 8766 --drop-after 100000 --drops 1
+    python media_pipeline.py http://127.0.0.1:8766/cuts.mp4
+"""
+import argparse
+import hashlib
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 1 << 16
+
+
+class FakeMediaServer:
+    """
+    directory 아래 파일을 ETag/Range(206)/If-Range를 지원해 내려주는 서버
+
+    장애 주입:
+    - drop_after: 처음 drops번의 응답은 본문을 이 바이트만큼 보낸 뒤 연결을 끊음
+    - chunk_delay: 본문 조각(64KB) 사이 대기 시간 (느린 CDN 흉내)
+    """
+
+    def __init__(self, directory, host="127.0.0.1", port=0, drop_after=None, drops=0, chunk_delay=0.0):
+        self.directory = Path(directory)
+        self.drop_after = drop_after
+        self.drops = drops
+        self.chunk_delay = chunk_delay
+        self.requests = []
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, name):
+        return f"{self.base_url}/{name}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _record(self, path, headers):
+        """
+        요청을 기록하고 이번 응답을 몇 바이트 보낸 뒤 끊을지 정함 (끊지 않으면 None)
+        """
+        with self._lock:
+            self.requests.append({"path": path, "range": headers.get("Range"), "if_range": headers.get("If-Range")})
+            if self.drop_after is not None and self.drops > 0:
+                self.drops -= 1
+                return self.drop_after
+            return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def do_HEAD(self):
+                self._serve(body=False)
+
+            def do_GET(self):
+                self._serve(body=True)
+
+            def _serve(self, body):
+                path = (server.directory / self.path.split("?", 1)[0].lstrip("/")).resolve()
+                if server.directory.resolve() not in path.parents or not path.is_file():
+                    self.send_error(404)
+                    return
+                stat = path.stat()
+                size = stat.st_size
+                etag = '"' + hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16] + '"'
+                drop_after = server._record(self.path, self.headers) if body else None
+
+                start, end = 0, size - 1
+                partial = False
+                requested = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                # If-Range가 현재 ETag와 다르면(파일이 바뀜) Range를 무시하고 전체를 보냄
+                if requested and (not if_range or if_range == etag):
+                    match = _RANGE.match(requested.strip())
+                    if not match or (not match.group(1) and not match.group(2)):
+                        self.send_error(416)
+                        return
+                    if match.group(1):
+                        start = int(match.group(1))
+                        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                    else:
+                        start = max(0, size - int(match.group(2)))
+                    if start >= size or start > end:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    partial = True
+
+                length = end - start + 1
+                self.send_response(206 if partial else 200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Content-Length", str(length))
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", etag)
+                if partial:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+                if not body:
+                    return
+
+                with open(path, "rb") as f:
+                    f.seek(start)
+                    remaining = length
+                    sent = 0
+                    while remaining > 0:
+                        chunk = f.read(min(CHUNK_SIZE, remaining))
+                        if drop_after is not None and sent + len(chunk) > drop_after:
+                            # 일부만 보내고 연결을 끊어 다운로드 중단을 흉내 냄
+                            self.wfile.write(chunk[:max(0, drop_after - sent)])
+                            self.wfile.flush()
+                            with server._lock:
+                                server.bytes_sent += max(0, drop_after - sent)
+                            self.close_connection = True
+                            return
+                        self.wfile.write(chunk)
+                        sent += len(chunk)
+                        remaining -= len(chunk)
+                        with server._lock:
+                            server.bytes_sent += len(chunk)
+                        if server.chunk_delay:
+                            time.sleep(server.chunk_delay)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Range 요청을 지원하는 로컬 영상 서버")
+    parser.add_argument("directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--drop-after", type=int, help="본문을 이 바이트만큼 보낸 뒤 연결 끊기")
+    parser.add_argument("--drops", type=int, default=0, help="연결을 끊을 응답 수")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="64KB 조각 사이 대기 시간(초)")
+    args = parser.parse_args()
+
+    server = FakeMediaServer(args.directory, host=args.host, port=args.port,
+                             drop_after=args.drop_after, drops=args.drops, chunk_delay=args.chunk_delay)
+    print(f"영상 서버 실행 중: {server.base_url} ({os.path.abspath(args.directory)})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+OpenAI Chat Completions API를 흉내 내는 로컬 테스트 서버
+
+실제 API 키 없이 스트리밍(SSE) 표시나 앱 동작을 확인할 때 사용합니다.
+
+    python fake_openai_server.py --port 8765
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=test streamlit run app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = """# 1. 주제:
+- **설명: 테스트 서버가 돌려주는 예시 분석입니다.**
+- ✅ **공유 및 저장**: "소중한 친구에게 공유해주세요"
+- ✅ **모수**: "누구나 가능합니다"
+- ✅ **문제해결**: "3초만에 만들어요"
+- ❌ **욕망충족**: 해당 내용 없음
+- ✅ **흥미유발**: "요즘은 이렇게 하면"
+
+# 2. 초반 3초
+## 카피라이팅 :
+- **설명: 구체적인 숫자로 시작합니다.**
+- ✅ **구체적 수치**: "3초만에"
+- ❌ **뇌 충격**: 해당 내용 없음
+- ✅ **이익, 손해 강조**: "시간 절약"
+- ❌ **권위 강조**: 해당 내용 없음
+
+## 영상 구성 :
+- **설명: 결과 화면을 먼저 보여줍니다.**
+- ✅ **상식 파괴**: "AI가 알아서 써줍니다"
+- ✅ **결과 먼저**: 완성된 PPT 화면
+- ❌ **부정 강조**: 해당 내용 없음
+- ✅ **공감 유도**: "발표 준비"
+
+# 3. 내용 구성:
+- **설명: 단계별 사용법을 보여줍니다.**
+- ✅ **문제해결**: "생성 누르면 끝"
+- ✅ **호기심 유발**: "요즘은 이렇게 하면"
+- ✅ **행동 유도**: "공유해주세요"
+- ❌ **스토리**: 해당 내용 없음
+- ✅ **제안**: "감마 사이트 들어가서"
+
+# 4. 개선할 점:
+- ❌ **스토리**: 사용 전후 비교를 넣어보세요.
+
+# 5. 적용할 점:
+- ✅ **구체적 수치**: 첫 문장에 숫자를 넣습니다.
+
+# 6. 벤치마킹 적용 기획:
+## 🎙️ 1. 스크립트 예시:
+요즘은 이렇게 하면 보고서 3분만에 끝나요
+
+## ✏️ 2. 캡션 예시:
+✨보고서 3분 완성✨ 저장해두고 써보세요 #업무꿀팁
+"""
+
+
+def _split_chunks(text, chunk_size):
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def _usage(body, text):
+    # 실제 토큰 수 대신 글자 수로 채움 (지표/로그 확인용)
+    prompt = sum(len(str(message.get("content", ""))) for message in body.get("messages", []))
+    return {"prompt_tokens": prompt, "completion_tokens": len(text), "total_tokens": prompt + len(text)}
+
+
+class FakeOpenAIServer:
+    """
+    /v1/chat/completions 요청에 미리 정해둔 응답을 돌려주는 서버
+
+    stream=True 요청에는 chunk_size 글자씩 SSE 청크로 나눠 보내고,
+    청크 사이마다 chunk_delay 초씩 쉬어 실제 토큰 생성 속도를 흉내 냅니다.
+
+    장애 주입 (재시도/헤지 동작 확인용):
+    - error_rate: 이 비율의 요청에 429 또는 500을 돌려줌 (retry_after 초를 Retry-After 헤더로 보냄)
+    - slow_rate: 이 비율의 요청은 첫 응답 전에 slow_delay 초를 멈춤 (느린 꼬리 지연)
+    first_token_delay를 주면 모든 요청이 첫 조각 전에 그만큼 멈춥니다. (부하 테스트용 기본 지연)
+    seed를 주면 같은 순서로 장애가 발생합니다.
+    """
+
+    def __init__(self, response_text=DEFAULT_RESPONSE, host="127.0.0.1", port=0,
+                 chunk_size=8, chunk_delay=0.0, error_rate=0.0, retry_after=None,
+                 slow_rate=0.0, slow_delay=0.0, seed=None, first_token_delay=0.0):
+        self.response_text = response_text
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.first_token_delay = first_token_delay
+        self.request_count = 0
+        self.requests = []
+        self.faults = {"error": 0, "slow": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, body):
+        """
+        요청 하나에 보낼 응답: (텍스트, usage, 첫 조각 전 대기 시간, 조각 사이 대기 시간)
+        None을 돌려주면 404로 응답합니다. (녹화한 응답을 재생하는 서버 등에서 바꿔 씀)
+        """
+        return self.response_text, _usage(body, self.response_text), self.first_token_delay, self.chunk_delay
+
+    def _record(self, body):
+        """
+        요청을 기록하고 이번 요청에 주입할 장애를 정함: ("error", 상태 코드) / ("slow", None) / None
+        """
+        with self._lock:
+            self.request_count += 1
+            self.requests.append(body)
+            roll = self._random.random()
+            if roll < self.error_rate:
+                self.faults["error"] += 1
+                return "error", self._random.choice([429, 500])
+            if roll < self.error_rate + self.slow_rate:
+                self.faults["slow"] += 1
+                return "slow", None
+            return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # 헤지에서 진 요청처럼 클라이언트가 먼저 연결을 끊은 경우
+                    pass
+
+            def do_GET(self):
+                # 연결 미리 맺기(warm-up)에 쓰는 모델 목록 조회
+                if not self.path.rstrip("/").endswith("/models"):
+                    self.send_error(404)
+                    return
+                payload = json.dumps({
+                    "object": "list",
+                    "data": [{"id": "gpt-4o", "object": "model", "created": 0, "owned_by": "fake"}]
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                fault = server._record(body)
+                if fault and fault[0] == "error":
+                    self._send_fault(fault[1])
+                    return
+                if fault and fault[0] == "slow":
+                    time.sleep(server.slow_delay)
+
+                response = server.respond(body)
+                if response is None:
+                    self._send_fault(404, "No recorded response for this request")
+                elif body.get("stream"):
+                    self._send_stream(body, *response)
+                else:
+                    self._send_completion(body, *response)
+
+            def _send_fault(self, status, message=None):
+                if message is None:
+                    message = "Rate limit reached" if status == 429 else "Internal server error"
+                payload = json.dumps({
+                    "error": {"message": message, "type": "fake_fault", "code": None}
+                }).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if server.retry_after is not None:
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_completion(self, body, text, usage, first_delay, chunk_delay):
+                time.sleep(first_delay)
+                payload = json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "gpt-4o"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": usage
+                }, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_stream(self, body, text, usage, first_delay, chunk_delay):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                # chunked 전송으로 보내서 스트리밍 후에도 연결을 재사용(keep-alive)할 수 있게 함
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                model = body.get("model", "gpt-4o")
+                pieces = _split_chunks(text, server.chunk_size)
+                time.sleep(first_delay)
+                for i, piece in enumerate(pieces):
+                    delta = {"content": piece}
+                    if i == 0:
+                        delta["role"] = "assistant"
+                    self._send_event({
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+                    })
+                    if chunk_delay:
+                        time.sleep(chunk_delay)
+                self._send_event({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                })
+                # 실제 API처럼 stream_options.include_usage를 주면 choices 없이 usage만 담은 조각을 보냄
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    self._send_event({
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [],
+                        "usage": usage
+                    })
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def _send_event(self, data):
+                line = "data: " + json.dumps(data, ensure_ascii=False) + "\n\n"
+                self._write_chunk(line.encode("utf-8"))
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 OpenAI 호환 테스트 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--chunk-size", type=int, default=8)
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="SSE 청크 사이 대기 시간(초)")
+    parser.add_argument("--response-file", help="응답으로 보낼 텍스트 파일 (기본: 예시 분석)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/500 오류를 돌려줄 요청 비율")
+    parser.add_argument("--retry-after", type=float, help="오류 응답에 붙일 Retry-After(초)")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="첫 응답을 늦출 요청 비율")
+    parser.add_argument("--slow-delay", type=float, default=0.0, help="느린 요청의 첫 응답 지연(초)")
+    parser.add_argument("--seed", type=int, help="장애 발생 순서를 고정할 난수 시드")
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="모든 요청의 첫 응답 전 대기 시간(초)")
+    args = parser.parse_args()
+
+    response_text = DEFAULT_RESPONSE
+    if args.response_file:
+        with open(args.response_file, encoding="utf-8") as f:
+            response_text = f.read()
+
+    server = FakeOpenAIServer(response_text, host=args.host, port=args.port,
+                              chunk_size=args.chunk_size, chunk_delay=args.chunk_delay,
+                              error_rate=args.error_rate, retry_after=args.retry_after,
+                              slow_rate=args.slow_rate, slow_delay=args.slow_delay, seed=args.seed,
+                              first_token_delay=args.first_token_delay)
+    print(f"테스트 서버 실행 중: {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
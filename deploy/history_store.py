@@ -0,0 +1,329 @@
+"""
+분석 기록 저장소 (지난 분석 검색/다시 열기)
+
+분석 캐시는 용량/기간이 지나면 지워지므로, 끝난 분석의 입력과 결과, ✅/❌ 항목을 따로 SQLite 파일에 남겨
+지난달에 분석한 릴스도 검색해서 LLM 호출 없이 다시 열 수 있게 합니다.
+
+- 전문 검색: FTS5. 한국어는 두 글자 단어(부업, 꿀팁 등)가 많아 trigram 토크나이저로는 찾지 못하므로,
+  단어를 글자 2-gram으로 나눈 search_terms 열을 unicode61로 색인하고 검색어도 같은 방식으로 나눠
+  2-gram 구(phrase)로 찾음 (한 글자 검색어는 접두어 검색)
+- 보조 인덱스: 사용자(owner), 주제, 날짜(created_at)
+- 순서/페이지 넘기기: 기록 번호(id)가 기록한 순서이므로 id 역순이 최신순. OFFSET 대신 마지막 항목의 id를
+  cursor로 넘기는 keyset 방식이라 10만 건 이상에서도 뒤쪽 페이지가 느려지지 않고, 검색어가 있으면
+  FTS 결과를 rowid 역순으로 읽다가 한 페이지가 차면 멈춤 (정렬하려고 일치하는 기록을 모두 읽지 않음)
+- 같은 사용자가 같은 입력을 다시 분석하면 이전 항목을 지우고 새 번호로 기록 (목록 맨 위로 올라옴)
+
+    python history_store.py search "부업 꿀팁" --owner local
+    python history_store.py show 42
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import closing
+from datetime import datetime
+
+from analysis_cache import make_cache_key
+from analysis_parser import ParsedAnalysis
+from api_config import HISTORY_DB_PATH
+
+PAGE_SIZE = 20
+# 목록에 보여줄 캡션/나레이션 길이
+PREVIEW_CHARS = 80
+
+_WORD = re.compile(r"\w+")
+
+logger = logging.getLogger("reels_benchmark.history")
+
+
+def _words(text):
+    return _WORD.findall(unicodedata.normalize("NFKC", text or "").lower())
+
+
+def search_terms(*texts):
+    """
+    색인할 텍스트를 글자 2-gram 토큰 문자열로 ("직장인 부업" -> "직장 장인 부업")
+    """
+    tokens = []
+    for text in texts:
+        for word in _words(text):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens += [word[i:i + 2] for i in range(len(word) - 1)]
+    return " ".join(tokens)
+
+
+def match_query(query):
+    """
+    검색어를 FTS5 MATCH 식으로 (단어마다 2-gram 구, 모든 단어를 포함하는 기록만)
+    """
+    parts = []
+    for word in _words(query):
+        if len(word) == 1:
+            parts.append(f"{word}*")
+        else:
+            parts.append('"' + " ".join(word[i:i + 2] for i in range(len(word) - 1)) + '"')
+    return " AND ".join(parts)
+
+
+class HistoryStore:
+    def __init__(self, path):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # 목록/정렬에 쓰는 작은 열을 앞에 둬서 큰 텍스트의 overflow 페이지를 읽지 않게 함
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    input_key TEXT NOT NULL UNIQUE,
+                    owner TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    passed INTEGER NOT NULL,
+                    failed INTEGER NOT NULL,
+                    caption TEXT NOT NULL,
+                    transcript TEXT NOT NULL,
+                    search_terms TEXT NOT NULL,
+                    input TEXT NOT NULL,
+                    analysis TEXT NOT NULL,
+                    structured TEXT NOT NULL,
+                    reels_info TEXT NOT NULL
+                )
+            """)
+            # 인덱스 항목은 같은 값 안에서 id 순이라 owner/topic으로 거른 목록도 정렬 없이 최신순으로 읽음
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_owner ON analyses (owner)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_topic ON analyses (topic)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses (created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS check_items (
+                    analysis_id INTEGER NOT NULL,
+                    section TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    passed INTEGER NOT NULL,
+                    text TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_items_analysis ON check_items (analysis_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_items_label ON check_items (label, passed)")
+            # analyses.search_terms를 색인하는 외부 콘텐츠 FTS 테이블 (트리거로 함께 갱신)
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5(
+                    search_terms, content='analyses', content_rowid='id'
+                )
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS analyses_ai AFTER INSERT ON analyses BEGIN
+                    INSERT INTO analyses_fts (rowid, search_terms) VALUES (new.id, new.search_terms);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS analyses_ad AFTER DELETE ON analyses BEGIN
+                    INSERT INTO analyses_fts (analyses_fts, rowid, search_terms)
+                    VALUES ('delete', old.id, old.search_terms);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS analyses_au AFTER UPDATE OF search_terms ON analyses BEGIN
+                    INSERT INTO analyses_fts (analyses_fts, rowid, search_terms)
+                    VALUES ('delete', old.id, old.search_terms);
+                    INSERT INTO analyses_fts (rowid, search_terms) VALUES (new.id, new.search_terms);
+                END
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return closing(conn)
+
+    def record(self, input_data, analysis, structured, reels_info, owner="local", created_at=None):
+        """
+        분석 하나를 기록하고 기록 번호를 반환 (같은 사용자의 같은 입력이면 이전 기록을 대신함)
+        structured: ParsedAnalysis 또는 to_dict() 결과
+        """
+        return self.record_many([{
+            "input_data": input_data, "analysis": analysis, "structured": structured,
+            "reels_info": reels_info, "owner": owner, "created_at": created_at
+        }])[0]
+
+    def record_many(self, entries):
+        """
+        record()에 넘기는 값들의 dict 목록을 한 트랜잭션으로 기록 (가져오기/벤치마크용)
+        반환: 기록 번호 목록
+        """
+        with self._connect() as conn, conn:
+            return [self._record(conn, **entry) for entry in entries]
+
+    def _record(self, conn, input_data, analysis, structured, reels_info, owner="local", created_at=None):
+        if isinstance(structured, dict):
+            structured = ParsedAnalysis.from_dict(structured)
+        video_analysis = input_data["video_analysis"]
+        topic = (input_data["content_info"].get("topic") or "").strip()
+        checklist = structured.checklist()
+        row = {
+            "input_key": make_cache_key(section="history", owner=owner, input=input_data),
+            "owner": owner,
+            "topic": topic,
+            "caption": video_analysis.get("caption") or "",
+            "transcript": video_analysis.get("transcript") or "",
+            "input": json.dumps(input_data, ensure_ascii=False),
+            "analysis": analysis,
+            "structured": json.dumps(structured.to_dict(), ensure_ascii=False),
+            "reels_info": json.dumps(reels_info, ensure_ascii=False),
+            "passed": sum(1 for _, item in checklist if item.passed),
+            "failed": sum(1 for _, item in checklist if not item.passed),
+            "search_terms": search_terms(video_analysis.get("caption"), video_analysis.get("transcript"), topic),
+            "created_at": time.time() if created_at is None else created_at
+        }
+        for (old_id,) in conn.execute("DELETE FROM analyses WHERE input_key = ? RETURNING id",
+                                      (row["input_key"],)).fetchall():
+            conn.execute("DELETE FROM check_items WHERE analysis_id = ?", (old_id,))
+        row_id = conn.execute(
+            f"INSERT INTO analyses ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+            tuple(row.values())
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO check_items (analysis_id, section, label, passed, text) VALUES (?, ?, ?, ?, ?)",
+            [(row_id, section, item.label, int(item.passed), item.text) for section, item in checklist]
+        )
+        return row_id
+
+    def search(self, query="", owner=None, topic=None, since=None, until=None, cursor=None, limit=PAGE_SIZE):
+        """
+        최신순 기록 목록 한 페이지
+        query: 캡션/나레이션/주제 전문 검색, owner/topic: 정확히 같은 값, since/until: 기록 시각(초) 범위
+        cursor: 이전 페이지의 next_cursor
+        반환: (기록 요약 목록, 다음 페이지 cursor 또는 None)
+        """
+        match = match_query(query)
+        # 검색어가 있으면 FTS 결과를 바깥 반복으로 두고(CROSS JOIN) rowid 역순으로 읽음
+        key = "f.rowid" if match else "a.id"
+        source = "analyses_fts AS f CROSS JOIN analyses AS a ON a.id = f.rowid" if match else "analyses AS a"
+        conditions, params = [], []
+        if match:
+            conditions.append("analyses_fts MATCH ?")
+            params.append(match)
+        for column, value in (("owner", owner), ("topic", topic)):
+            if value is not None:
+                conditions.append(f"a.{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("a.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("a.created_at < ?")
+            params.append(until)
+        if cursor is not None:
+            conditions.append(f"{key} < ?")
+            params.append(int(cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connect() as conn:
+            # 페이지의 번호만 먼저 고르고(인덱스만 읽음) 그 기록의 열을 읽음
+            # (기간 필터처럼 정렬이 필요한 경우에도 큰 행을 정렬하지 않음)
+            rows = conn.execute(
+                f"SELECT a.id, a.created_at, a.owner, a.topic, substr(a.caption, 1, {PREVIEW_CHARS}), "
+                f"substr(a.transcript, 1, {PREVIEW_CHARS}), a.passed, a.failed FROM analyses AS a "
+                f"WHERE a.id IN (SELECT {key} FROM {source} {where} ORDER BY {key} DESC LIMIT ?) "
+                "ORDER BY a.id DESC",
+                params + [limit + 1]
+            ).fetchall()
+        items = [
+            dict(zip(("id", "created_at", "owner", "topic", "caption", "transcript", "passed", "failed"), row))
+            for row in rows[:limit]
+        ]
+        next_cursor = items[-1]["id"] if len(rows) > limit else None
+        return items, next_cursor
+
+    def get(self, row_id):
+        """
+        기록 하나의 입력/결과/✅❌ 항목 (없으면 None, LLM을 호출하지 않고 저장된 결과만 읽음)
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, created_at, owner, topic, input, analysis, structured, reels_info "
+                "FROM analyses WHERE id = ?",
+                (row_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            items = conn.execute(
+                "SELECT section, label, passed, text FROM check_items WHERE analysis_id = ? ORDER BY rowid",
+                (row_id,)
+            ).fetchall()
+        entry = dict(zip(("id", "created_at", "owner", "topic", "input", "analysis", "structured", "reels_info"), row))
+        for name in ("input", "structured", "reels_info"):
+            entry[name] = json.loads(entry[name])
+        entry["items"] = [
+            {"section": section, "label": label, "passed": bool(passed), "text": text}
+            for section, label, passed, text in items
+        ]
+        return entry
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """
+    프로세스 전체에서 공유하는 분석 기록 저장소
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore(HISTORY_DB_PATH)
+    return _store
+
+
+def record_analysis(input_data, analysis, structured, reels_info, owner="local"):
+    """
+    끝난 분석을 기록 (기록하지 못해도 분석 결과 표시는 계속되도록 오류는 로그만 남김)
+    """
+    try:
+        return get_history_store().record(input_data, analysis, structured, reels_info, owner=owner)
+    except Exception:
+        logger.exception("분석 기록을 저장하지 못했습니다.")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분석 기록 검색")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="최신순 검색 (한 페이지)")
+    search.add_argument("query", nargs="?", default="")
+    search.add_argument("--owner")
+    search.add_argument("--topic")
+    search.add_argument("--cursor", type=int, help="이전 결과의 다음 페이지 cursor")
+    search.add_argument("--limit", type=int, default=PAGE_SIZE)
+    show = commands.add_parser("show", help="기록 하나의 분석 결과")
+    show.add_argument("id", type=int)
+    args = parser.parse_args()
+
+    store = get_history_store()
+    if args.command == "search":
+        items, next_cursor = store.search(args.query, owner=args.owner, topic=args.topic,
+                                          cursor=args.cursor, limit=args.limit)
+        for item in items:
+            created = datetime.fromtimestamp(item["created_at"]).strftime("%Y-%m-%d %H:%M")
+            print(f"{item['id']:>8}  {created}  {item['owner']:<12} ✅{item['passed']} ❌{item['failed']}  "
+                  f"{item['topic'] or '-'} | {item['caption'][:40]}")
+        if next_cursor:
+            print(f"다음 페이지: --cursor {next_cursor}")
+    else:
+        entry = store.get(args.id)
+        print(entry["analysis"] if entry else "없는 기록입니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+분석 작업 대기열 (백그라운드 실행)
+
+분석 버튼을 누르면 작업을 저장소에 넣고 작업 번호만 바로 돌려줍니다. 실제 분석은 정해진 수(JOB_WORKERS)의
+작업 스레드가 실행하고, 화면은 작업 번호로 진행 상황을 주기적으로 읽어 그립니다.
+작업 상태, 진행 중인 응답, 결과를 SQLite 파일에 저장하므로 페이지를 새로 고치거나 앱을 재시작해도 이어집니다.
+
+- 순서: 우선순위(priority)가 높은 작업부터, 같은 우선순위 안에서는 지금 실행 중인 작업이 적고
+  가장 오래전에 작업을 시작한 사용자(owner)의 작업부터 (한 사용자가 대기열을 독차지하지 않음)
+- 사용자 한 명이 동시에 실행하는 작업 수는 JOB_MAX_PER_OWNER개까지
+- 실행 중인 작업은 주기적으로 updated_at을 갱신하고, JOB_STALE_SECONDS 동안 갱신이 없으면
+  (프로세스가 죽은 것으로 보고) 다른 작업 스레드가 다시 실행 (MAX_ATTEMPTS번까지)
+- 상태별 작업 수는 reels_job_queue_depth 지표로 내보냄 (queued 값이 오토스케일링 기준)
+
+    python job_queue.py stats
+    python job_queue.py show <작업 번호>
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+import metrics
+from api_config import JOB_DB_PATH, JOB_WORKERS, JOB_MAX_PER_OWNER, JOB_STALE_SECONDS
+from history_store import record_analysis
+
+# 진행 중인 응답을 저장소에 쓰는 간격(초)
+PROGRESS_INTERVAL = 0.5
+# 새 작업 알림이 없을 때 다른 프로세스가 넣은 작업을 확인하는 간격(초)
+POLL_INTERVAL = 1.0
+MAX_ATTEMPTS = 3
+# 끝난 작업을 지우기 전까지 보관하는 시간(초)
+RETENTION_SECONDS = 7 * 24 * 3600
+# 실행할 수 있는 작업과 순서를 정하는 값 (_claim과 대기 순번(position) 계산이 같이 씀)
+# running: 그 사용자가 지금 실행 중인 작업 수, last_started: 그 사용자가 마지막으로 작업을 시작한 시각
+_CANDIDATES = """
+    SELECT id, payload, priority, created_at,
+        (SELECT COUNT(*) FROM jobs AS r
+         WHERE r.owner = j.owner AND r.status = 'running' AND r.updated_at >= :stale) AS running,
+        (SELECT IFNULL(MAX(r.started_at), 0) FROM jobs AS r WHERE r.owner = j.owner) AS last_started
+    FROM jobs AS j
+    WHERE status = 'queued' OR (status = 'running' AND updated_at < :stale)
+"""
+_CLAIM_ORDER = "priority DESC, running, last_started, created_at"
+
+
+def run_analysis_job(payload, progress):
+    """
+    작업 하나의 분석 실행 (progress(지금까지 받은 텍스트)로 진행 상황을 알림)
+    반환값은 app.get_cached_analysis / get_cached_topic_analyses와 같은 모양을 JSON으로 바꾼 dict
+    """
+    # openai/tiktoken을 불러오는 데 오래 걸리므로 첫 작업을 실행할 때 불러옴 (앱 첫 화면을 늦추지 않음)
+    from reels_extraction import analysis_structure, analyze_topics, analyze_with_gpt4, extract_reels_info
+
+    input_data, topics, mode = payload["input_data"], payload["topics"], payload.get("mode")
+    owner = payload.get("owner", "local")
+    reels_info = extract_reels_info(input_data)
+    if len(topics) > 1:
+        analyses = analyze_topics(reels_info, input_data, topics, mode=mode)
+        structured = []
+        for topic, analysis in analyses:
+            topic_input = {**input_data, "content_info": {"topic": topic}}
+            structured.append(analysis_structure(reels_info, topic_input, mode))
+            record_analysis(topic_input, analysis, structured[-1], reels_info, owner=owner)
+        return {
+            "analyses": [list(item) for item in analyses],
+            "structured": [parsed.to_dict() for parsed in structured],
+            "reels_info": reels_info
+        }
+
+    received = []
+
+    def on_delta(delta):
+        received.append(delta)
+        progress("".join(received))
+
+    analysis = analyze_with_gpt4(reels_info, input_data, on_delta=on_delta, mode=mode)
+    structured = analysis_structure(reels_info, input_data, mode)
+    record_analysis(input_data, analysis, structured, reels_info, owner=owner)
+    return {
+        "analysis": analysis,
+        "structured": structured.to_dict(),
+        "reels_info": reels_info
+    }
+
+
+class JobQueue:
+    def __init__(self, path, runner=run_analysis_job, workers=JOB_WORKERS,
+                 max_per_owner=JOB_MAX_PER_OWNER, stale_seconds=JOB_STALE_SECONDS):
+        self.path = str(path)
+        self.runner = runner
+        self.workers = workers
+        self.max_per_owner = max_per_owner
+        self.stale_seconds = stale_seconds
+        # 작업 스레드마다 다른 이름을 붙여, 멈춘 것으로 보고 다시 실행된 작업에 옛 스레드가 결과를 쓰지 않게 함
+        self.worker_prefix = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._running = {}
+        self._running_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, priority, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (owner, status, updated_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner_started ON jobs (owner, started_at)")
+
+    def _connect(self):
+        # 스레드마다 따로 연결 (sqlite3 연결은 스레드 간 공유하지 않음)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return _Transaction(conn)
+
+    def _read(self):
+        # 읽기만 하는 조회는 쓰기 잠금 없이 (화면이 자주 읽어도 작업 스레드를 막지 않음)
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    def start(self):
+        """
+        작업 스레드와 진행 기록(heartbeat) 스레드를 띄움 (이미 띄웠으면 아무것도 하지 않음)
+        """
+        if self._threads:
+            return self
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{self.worker_prefix}-{i}",),
+                                      name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopped.clear()
+
+    def submit(self, payload, owner="anonymous", priority=0):
+        """
+        작업을 대기열에 넣고 작업 번호를 바로 반환
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, owner, priority, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, owner, priority, json.dumps(payload, ensure_ascii=False), now, now)
+            )
+        self._update_depth()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """
+        작업 상태 dict (없으면 None)
+        queued이면 position(앞에 있는 작업 수), running이면 progress(지금까지 받은 텍스트),
+        done이면 result, failed이면 error가 들어 있습니다.
+        position은 _claim과 같은 순서로 센 지금 시점의 값이고 (동시 실행 한도에 걸린 사용자의 작업은 뒤로),
+        다른 작업이 시작되거나 끝나면 사용자별 실행 수가 바뀌어 순서가 달라질 수 있습니다.
+        """
+        with self._read() as conn:
+            row = conn.execute(
+                "SELECT id, owner, priority, status, progress, result, error, attempts, "
+                "created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(zip(
+                ("id", "owner", "priority", "status", "progress", "result", "error", "attempts",
+                 "created_at", "started_at", "finished_at"),
+                row
+            ))
+            if job["status"] == "queued":
+                job["position"] = conn.execute(f"""
+                    SELECT position FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            ORDER BY (:limit > 0 AND running >= :limit), {_CLAIM_ORDER}
+                        ) - 1 AS position
+                        FROM ({_CANDIDATES})
+                    ) WHERE id = :id
+                """, {"stale": time.time() - self.stale_seconds, "limit": self.max_per_owner, "id": job_id}
+                ).fetchone()[0]
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def depth(self):
+        """
+        상태별 대기/실행 중 작업 수 (같은 저장소를 쓰는 모든 프로세스의 합계)
+        """
+        with self._read() as conn:
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE status IN ('queued', 'running') GROUP BY status"
+            ).fetchall())
+        return {status: counts.get(status, 0) for status in ("queued", "running")}
+
+    def _update_depth(self):
+        for status, count in self.depth().items():
+            metrics.JOB_QUEUE_DEPTH.set(count, status=status)
+
+    def _claim(self, worker):
+        """
+        다음에 실행할 작업 하나를 실행 중으로 바꾸고 (작업 번호, payload, 대기 시간)을 반환 (없으면 None)
+        """
+        now = time.time()
+        stale = now - self.stale_seconds
+        with self._connect() as conn:
+            # 여러 번 다시 실행해도 끝나지 않은 작업은 실패로 처리
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = '작업을 실행하던 프로세스가 여러 번 멈췄습니다.', "
+                "finished_at = ?, updated_at = ? WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+                (now, now, stale, MAX_ATTEMPTS)
+            )
+            row = conn.execute(f"""
+                SELECT id, payload, created_at FROM ({_CANDIDATES})
+                WHERE :limit = 0 OR running < :limit
+                ORDER BY {_CLAIM_ORDER}
+                LIMIT 1
+            """, {"stale": stale, "limit": self.max_per_owner}).fetchone()
+            if row is None:
+                return None
+            job_id, payload, created_at = row
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, updated_at = ?, "
+                "progress = NULL, attempts = attempts + 1 WHERE id = ?",
+                (worker, now, now, job_id)
+            )
+        return job_id, json.loads(payload), now - created_at
+
+    def _work(self, worker):
+        while not self._stopped.is_set():
+            claimed = self._claim(worker)
+            if claimed is None:
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._update_depth()
+            self._run(worker, *claimed)
+            self._update_depth()
+
+    def _run(self, worker, job_id, payload, waited):
+        metrics.JOB_WAIT_SECONDS.observe(waited)
+        with self._running_lock:
+            self._running[job_id] = worker
+        last_write = [0.0]
+
+        def progress(text):
+            now = time.time()
+            if now - last_write[0] < PROGRESS_INTERVAL:
+                return
+            last_write[0] = now
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ? AND worker = ?",
+                    (text, now, job_id, worker)
+                )
+
+        try:
+            with metrics.trace_analysis("job"):
+                result = self.runner(payload, progress)
+            status, result, error = "done", json.dumps(result, ensure_ascii=False), None
+        except Exception as e:
+            status, result, error = "failed", None, f"분석 중 오류가 발생했습니다: {e}"
+        finally:
+            with self._running_lock:
+                self._running.pop(job_id, None)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, progress = NULL, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ?",
+                (status, result, error, now, now, job_id, worker)
+            )
+        metrics.JOBS.inc(outcome=status)
+
+    def _heartbeat(self):
+        # 실행 중인 작업의 updated_at을 갱신하고 대기열 지표와 오래된 작업을 정리
+        while not self._stopped.wait(max(1.0, self.stale_seconds / 4)):
+            now = time.time()
+            with self._running_lock:
+                running = list(self._running.items())
+            with self._connect() as conn:
+                conn.executemany(
+                    "UPDATE jobs SET updated_at = ? WHERE id = ? AND worker = ?",
+                    [(now, job_id, worker) for job_id, worker in running]
+                )
+                conn.execute(
+                    "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                    (now - RETENTION_SECONDS,)
+                )
+            self._update_depth()
+            # 다른 프로세스가 죽어 멈춘 작업도 다시 실행되도록 작업 스레드를 깨움
+            self._wakeup.set()
+
+
+class _Transaction:
+    # with 블록 전체를 한 트랜잭션으로 실행하고 연결을 닫음 (쓰기 잠금을 처음부터 잡음)
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    프로세스 전체에서 공유하는 작업 대기열 (처음 부를 때 작업 스레드를 띄움)
+    """
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(JOB_DB_PATH).start()
+    return _queue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분석 작업 대기열 상태 확인")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="대기/실행 중 작업 수")
+    show = commands.add_parser("show", help="작업 하나의 상태")
+    show.add_argument("job_id")
+    args = parser.parse_args()
+
+    # 상태만 읽으므로 작업 스레드는 띄우지 않음
+    queue = JobQueue(JOB_DB_PATH)
+    if args.command == "stats":
+        print(json.dumps(queue.depth(), ensure_ascii=False))
+    else:
+        job = queue.get(args.job_id)
+        print(json.dumps(job, ensure_ascii=False, indent=2) if job else "없는 작업입니다.")
+
+
+if __name__ == "__main__":
+    main()
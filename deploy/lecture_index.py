@@ -0,0 +1,305 @@
+"""
+릴스 강의 정리(릴스 강의_정리.csv) 검색 인덱스
+
+강의 내용을 짧은 구간(passage)으로 나누고 글자 n-gram(2~3글자) BM25 인덱스를 만들어
+파일 하나에 저장합니다. 분석할 때는 이 파일을 메모리 매핑(np.memmap)으로 열어
+릴스 스크립트/캡션과 관련 있는 구간 몇 개만 골라 프롬프트에 넣습니다.
+
+- n-gram은 해시 버킷 번호로 바꿔 저장하므로 단어 사전을 읽어 들일 필요가 없음
+- 버킷마다 (구간 번호, BM25 가중치) 목록을 CSR 형태로 저장해 검색은 배열 합산만 함
+- 원본 CSV의 해시를 함께 저장해 두고, CSV가 바뀌면 다음 사용 시 다시 만듦
+
+    python lecture_index.py build            # 인덱스 미리 만들기
+    python lecture_index.py search "초반 3초 후킹"
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import threading
+import unicodedata
+import zlib
+
+import numpy as np
+
+from api_config import LECTURE_CONTEXT, LECTURE_TOP_K, LECTURE_NOTES_PATH, LECTURE_INDEX_PATH
+
+MAGIC = b"RLIDX1\n\0"
+INDEX_VERSION = 1
+# n-gram 해시 버킷 수 (충돌이 드물 만큼 크게, 오프셋 배열은 버킷당 4바이트)
+BUCKETS = 1 << 18
+NGRAM_SIZES = (2, 3)
+PASSAGE_CHARS = 300
+PASSAGE_OVERLAP = 50
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"[0-9a-z가-힣]+")
+
+
+def tokenize(text):
+    """
+    한국어 텍스트를 글자 n-gram 해시 버킷 번호 목록으로 변환
+    조사/어미가 붙어도 어간의 n-gram이 겹치므로 형태소 분석 없이도 비슷한 표현끼리 맞춰집니다.
+    """
+    text = unicodedata.normalize("NFC", text or "").lower()
+    buckets = []
+    for word in _WORD.findall(text):
+        if len(word) < min(NGRAM_SIZES):
+            buckets.append(_bucket(word))
+            continue
+        for size in NGRAM_SIZES:
+            for i in range(len(word) - size + 1):
+                buckets.append(_bucket(word[i:i + size]))
+    return buckets
+
+
+def _bucket(gram):
+    return zlib.crc32(gram.encode("utf-8")) % BUCKETS
+
+
+def split_passages(text, size=PASSAGE_CHARS, overlap=PASSAGE_OVERLAP):
+    """
+    긴 강의 텍스트를 size 글자 안팎의 구간으로 나눔 (단어 중간에서 자르지 않고, 앞 구간과 overlap 글자 겹침)
+    """
+    text = " ".join((text or "").split())
+    passages = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            space = text.rfind(" ", start + size // 2, end)
+            end = space if space > 0 else end
+        passages.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        next_start = text.find(" ", max(start + 1, end - overlap), end)
+        start = next_start + 1 if next_start > 0 else end
+    return [p for p in passages if p]
+
+
+def load_lecture_passages(csv_path=LECTURE_NOTES_PATH):
+    with open(csv_path, encoding="utf-8-sig", newline="") as f:
+        rows = [row.get("text") or "" for row in csv.DictReader(f)]
+    return [passage for row in rows for passage in split_passages(row)]
+
+
+def _file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_index(passages, out_path, source_hash=""):
+    """
+    구간 목록으로 BM25 인덱스 파일을 만듦 (임시 파일에 쓴 뒤 교체하므로 읽는 쪽이 깨진 파일을 보지 않음)
+    """
+    doc_terms = []
+    lengths = np.zeros(len(passages), dtype=np.float32)
+    for doc_id, passage in enumerate(passages):
+        buckets = tokenize(passage)
+        lengths[doc_id] = len(buckets)
+        counts = {}
+        for bucket in buckets:
+            counts[bucket] = counts.get(bucket, 0) + 1
+        doc_terms.append(counts)
+
+    n_docs = len(passages)
+    avg_length = float(lengths.mean()) if n_docs else 0.0
+    postings = {}
+    for doc_id, counts in enumerate(doc_terms):
+        for bucket, tf in counts.items():
+            postings.setdefault(bucket, []).append((doc_id, tf))
+
+    counts_per_bucket = np.zeros(BUCKETS, dtype=np.int32)
+    doc_ids = []
+    weights = []
+    for bucket in sorted(postings):
+        entries = postings[bucket]
+        df = len(entries)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        for doc_id, tf in entries:
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / (avg_length or 1))
+            doc_ids.append(doc_id)
+            weights.append(idf * tf * (BM25_K1 + 1) / norm)
+        counts_per_bucket[bucket] = df
+    offsets = np.zeros(BUCKETS + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum(counts_per_bucket)
+
+    text = [p.encode("utf-8") for p in passages]
+    text_offsets = np.zeros(n_docs + 1, dtype=np.int64)
+    text_offsets[1:] = np.cumsum([len(t) for t in text])
+    arrays = {
+        "offsets": offsets,
+        "doc_ids": np.asarray(doc_ids, dtype=np.int32),
+        "weights": np.asarray(weights, dtype=np.float32),
+        "text_offsets": text_offsets,
+        "text": np.frombuffer(b"".join(text), dtype=np.uint8)
+    }
+    _write_arrays(out_path, arrays, {
+        "version": INDEX_VERSION,
+        "buckets": BUCKETS,
+        "n_docs": n_docs,
+        "source_hash": source_hash,
+        "params": {"ngram": list(NGRAM_SIZES), "passage_chars": PASSAGE_CHARS, "k1": BM25_K1, "b": BM25_B}
+    })
+
+
+def _write_arrays(path, arrays, meta):
+    # [MAGIC][헤더 길이][JSON 헤더][8바이트 정렬된 배열들...]
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        layout[name] = [position, array.dtype.str, int(array.size)]
+        position += _aligned(array.nbytes)
+    header = json.dumps({**meta, "arrays": layout}).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        f.write(b"\0" * (data_start - f.tell()))
+        for array in arrays.values():
+            f.write(array.tobytes())
+            f.write(b"\0" * (_aligned(array.nbytes) - array.nbytes))
+    os.replace(tmp_path, path)
+
+
+def _aligned(size):
+    return (size + 7) // 8 * 8
+
+
+class LectureIndex:
+    """
+    인덱스 파일을 메모리 매핑으로 열어 검색 (읽기 전용, 여러 스레드에서 함께 사용 가능)
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"강의 인덱스 파일 형식이 아닙니다: {path}")
+            (header_size,) = struct.unpack("<Q", f.read(8))
+            self.meta = json.loads(f.read(header_size))
+        data_start = _aligned(len(MAGIC) + 8 + header_size)
+        self.path = path
+        self.n_docs = self.meta["n_docs"]
+        self._arrays = {
+            name: np.memmap(path, dtype=np.dtype(dtype), mode="r", offset=data_start + offset, shape=(count,))
+            for name, (offset, dtype, count) in self.meta["arrays"].items()
+        }
+
+    @property
+    def source_hash(self):
+        return self.meta.get("source_hash", "")
+
+    def passage(self, doc_id):
+        start, end = self._arrays["text_offsets"][doc_id:doc_id + 2]
+        return bytes(self._arrays["text"][start:end]).decode("utf-8")
+
+    def search(self, query, k=3):
+        """
+        query와 관련도가 높은 구간 k개: [(점수, 구간 번호, 구간 텍스트)]
+        """
+        if not self.n_docs:
+            return []
+        offsets = self._arrays["offsets"]
+        doc_ids = self._arrays["doc_ids"]
+        weights = self._arrays["weights"]
+        # 질의 n-gram들의 게시 목록을 모아 구간별로 한 번에 합산
+        slices = [slice(offsets[b], offsets[b + 1]) for b in set(tokenize(query)) if offsets[b] != offsets[b + 1]]
+        if not slices:
+            return []
+        scores = np.bincount(
+            np.concatenate([doc_ids[s] for s in slices]),
+            weights=np.concatenate([weights[s] for s in slices]),
+            minlength=self.n_docs
+        )
+
+        k = min(k, self.n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), int(i), self.passage(int(i))) for i in top if scores[i] > 0]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_lecture_index(notes_path=LECTURE_NOTES_PATH, index_path=LECTURE_INDEX_PATH):
+    """
+    프로세스 전체에서 공유하는 강의 인덱스 (파일이 없거나 CSV가 바뀌었으면 새로 만듦)
+    강의 CSV가 없으면 None
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if not os.path.exists(notes_path):
+                    return None
+                source_hash = _file_sha256(notes_path)
+                index = None
+                if os.path.exists(index_path):
+                    try:
+                        index = LectureIndex(index_path)
+                    except (ValueError, OSError):
+                        index = None
+                if index is None or index.source_hash != source_hash or index.meta.get("version") != INDEX_VERSION:
+                    build_index(load_lecture_passages(notes_path), index_path, source_hash)
+                    index = LectureIndex(index_path)
+                _index = index
+    return _index
+
+
+def lecture_fingerprint():
+    """
+    프롬프트에 강의 구간을 넣는 설정과 강의 내용의 해시 (분석 캐시 키에 넣음, 끄면 빈 문자열)
+    """
+    if not LECTURE_CONTEXT:
+        return ""
+    index = get_lecture_index()
+    return f"{index.source_hash}:{LECTURE_TOP_K}" if index is not None else ""
+
+
+def retrieve_passages(query, k=LECTURE_TOP_K):
+    """
+    query와 관련 있는 강의 구간 텍스트 최대 k개 (설정으로 끄거나 강의 CSV가 없으면 빈 목록)
+    """
+    if not LECTURE_CONTEXT:
+        return []
+    index = get_lecture_index()
+    if index is None:
+        return []
+    return [passage for _, _, passage in index.search(query, k)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="릴스 강의 정리 검색 인덱스")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="인덱스 파일 만들기")
+    build.add_argument("--notes", default=LECTURE_NOTES_PATH)
+    build.add_argument("--out", default=LECTURE_INDEX_PATH)
+    search = sub.add_parser("search", help="인덱스 검색")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        passages = load_lecture_passages(args.notes)
+        build_index(passages, args.out, _file_sha256(args.notes))
+        print(f"구간 {len(passages)}개 -> {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB)")
+        return
+
+    index = get_lecture_index()
+    if index is None:
+        print("강의 CSV를 찾을 수 없습니다.")
+        return
+    for score, doc_id, passage in index.search(args.query, args.k):
+        print(f"[{doc_id}] {score:.2f} {passage[:120]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+내려받은 릴스 영상 원본 저장소 (TEMP_DIR/blobs)
+
+인스타그램 CDN URL은 oe= 값이 지나면 만료되고 영상도 크기 때문에,
+한 번 받은 영상은 내용 해시(sha256) 이름의 파일로 저장해 두고 다시 받지 않습니다.
+
+- 키: shortcode가 있으면 shortcode, 없으면 URL의 경로 (만료되는 서명 쿼리는 빼고)
+  같은 키는 URL이 새로 발급되어도 같은 영상으로 찾고, 내용이 같은 영상은 파일 하나만 저장
+- 이어받기: 받는 중인 파일은 partial/ 아래에 두고, 끊기면 다음 요청에서 Range로 남은 부분만 받음
+  (If-Range로 ETag를 확인해 서버의 파일이 바뀌었으면 처음부터 다시 받음)
+- 스트리밍: 받는 조각을 바로 파일에 쓰면서 해시를 계산하므로 영상 전체를 메모리에 올리지 않음
+- 원자적 교체: 다 받은 파일만 os.replace로 blobs/에 옮기므로 다른 워커가 받다 만 파일을 읽는 일이 없음
+  같은 키를 여러 프로세스가 동시에 받으면 파일 잠금으로 한 프로세스만 받고 나머지는 결과를 씀
+- 용량: 전체 크기가 max_bytes를 넘으면 가장 오래 쓰지 않은 영상부터 삭제 (LRU)
+
+    python media_cache.py fetch "https://...mp4" --key C_5jgbugE2_
+    python media_cache.py stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import httpx
+
+from analysis_cache import _Transaction
+from api_config import MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES
+from single_flight import FileLockSingleFlight
+
+CHUNK_SIZE = 1 << 16
+# 연결이 끊겼을 때 이어받기를 다시 시도하는 횟수
+RESUME_ATTEMPTS = 3
+
+
+class DownloadError(OSError):
+    pass
+
+
+def media_key(url, shortcode=None):
+    """
+    영상 캐시 키 (shortcode 우선, 없으면 CDN 호스트와 서명 쿼리를 뺀 URL 경로)
+    """
+    if shortcode:
+        return f"shortcode:{shortcode}"
+    return f"path:{urlparse(url).path}"
+
+
+class MediaCache:
+    def __init__(self, root=MEDIA_CACHE_DIR, max_bytes=MEDIA_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.blob_dir = self.root / "blobs"
+        self.partial_dir = self.root / "partial"
+        for folder in (self.blob_dir, self.partial_dir):
+            os.makedirs(folder, exist_ok=True)
+        self.path = str(self.root / "index.sqlite3")
+        self._flight = FileLockSingleFlight(self.root / "locks")
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    suffix TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_accessed ON blobs (accessed_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS refs (
+                    key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_refs_digest ON refs (digest)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            conn.execute(
+                "INSERT OR IGNORE INTO stats (name, value) VALUES "
+                "('hits', 0), ('misses', 0), ('downloaded_bytes', 0), ('resumed', 0), ('evicted', 0)"
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return _Transaction(conn)
+
+    def _blob_path(self, digest, suffix):
+        return self.blob_dir / digest[:2] / f"{digest}{suffix}"
+
+    def _lookup(self, key, count=False):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT blobs.digest, blobs.suffix FROM refs JOIN blobs ON blobs.digest = refs.digest "
+                "WHERE refs.key = ?", (key,)
+            ).fetchone()
+            path = self._blob_path(*row) if row else None
+            if path is not None and not path.exists():
+                # 파일이 밖에서 지워졌으면 색인도 정리
+                conn.execute("DELETE FROM refs WHERE digest = ?", (row[0],))
+                conn.execute("DELETE FROM blobs WHERE digest = ?", (row[0],))
+                path = None
+            if path is not None:
+                conn.execute("UPDATE blobs SET accessed_at = ? WHERE digest = ?", (now, row[0]))
+            if count:
+                name = "hits" if path is not None else "misses"
+                conn.execute("UPDATE stats SET value = value + 1 WHERE name = ?", (name,))
+            return path
+
+    def get(self, key):
+        """
+        저장된 영상 경로 (없으면 None)
+        """
+        return self._lookup(key, count=True)
+
+    def fetch(self, url, key=None, timeout=60):
+        """
+        key의 영상 경로를 반환하고, 없으면 url에서 받아 저장한 뒤 반환
+        """
+        key = key or media_key(url)
+        path = self.get(key)
+        if path is not None:
+            return path
+        # 잠금을 기다리는 동안 다른 프로세스가 받았을 수 있으므로 다시 확인
+        return self._flight.do(key, lambda: self._lookup(key) or self._download(url, key, timeout))
+
+    def _download(self, url, key, timeout):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        part_path = self.partial_dir / f"{name}.part"
+        meta_path = self.partial_dir / f"{name}.json"
+        suffix = Path(urlparse(url).path).suffix or ".mp4"
+
+        last_error = None
+        for _ in range(RESUME_ATTEMPTS):
+            try:
+                digest = self._download_part(url, part_path, meta_path, timeout)
+                break
+            except httpx.HTTPStatusError as e:
+                # 404/403(만료된 URL) 같은 오류는 다시 시도해도 같음
+                if e.response.status_code < 500:
+                    raise DownloadError(f"영상을 내려받을 수 없습니다: {e}") from e
+                last_error = e
+            except (httpx.HTTPError, DownloadError) as e:
+                # 받은 부분은 partial/에 남아 있으므로 다음 시도는 이어받기
+                last_error = e
+        else:
+            raise DownloadError(f"영상을 내려받을 수 없습니다: {last_error}") from last_error
+
+        path = self._blob_path(digest, suffix)
+        os.makedirs(path.parent, exist_ok=True)
+        if path.exists():
+            # 같은 내용의 영상이 이미 있으면 받은 파일은 버리고 그 파일을 가리킴
+            part_path.unlink()
+        else:
+            os.replace(part_path, path)
+        meta_path.unlink(missing_ok=True)
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO blobs (digest, suffix, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (digest, suffix, path.stat().st_size, now, now)
+            )
+            conn.execute("UPDATE blobs SET accessed_at = ? WHERE digest = ?", (now, digest))
+            conn.execute("INSERT OR REPLACE INTO refs (key, digest) VALUES (?, ?)", (key, digest))
+            self._evict(conn, keep=digest)
+        return path
+
+    def _download_part(self, url, part_path, meta_path, timeout):
+        """
+        part_path에 이어서 받고 전체 내용의 sha256을 반환 (이미 받은 부분이 있으면 Range 요청)
+        """
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() and part_path.exists() else {}
+        offset = part_path.stat().st_size if meta else 0
+        headers = {}
+        if offset and meta.get("validator"):
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = meta["validator"]
+
+        with httpx.stream("GET", url, headers=headers, timeout=timeout, follow_redirects=True) as response:
+            if response.status_code == 416 and offset:
+                # 이미 끝까지 받은 파일이거나 서버 파일이 줄어든 경우: 처음부터 다시
+                part_path.unlink(missing_ok=True)
+                meta_path.unlink(missing_ok=True)
+                raise DownloadError("이어받기 범위가 맞지 않습니다.")
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                start = int(response.headers.get("Content-Range", "bytes 0-").split()[1].split("-")[0])
+                if start != offset:
+                    raise DownloadError("서버가 요청과 다른 범위를 보냈습니다.")
+                mode = "ab"
+                digest = _hash_file(part_path)
+                with self._connect() as conn:
+                    conn.execute("UPDATE stats SET value = value + 1 WHERE name = 'resumed'")
+            else:
+                # 200이면 서버가 전체를 다시 보내는 것이므로 처음부터 씀
+                offset = 0
+                mode = "wb"
+                digest = hashlib.sha256()
+            length = response.headers.get("Content-Length")
+            total = offset + int(length) if length is not None else None
+            validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+            meta_path.write_text(json.dumps({"url": url, "validator": validator, "total": total}))
+
+            received = 0
+            try:
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_bytes(CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        received += len(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
+            finally:
+                with self._connect() as conn:
+                    conn.execute(
+                        "UPDATE stats SET value = value + ? WHERE name = 'downloaded_bytes'", (received,)
+                    )
+
+        if total is not None and part_path.stat().st_size != total:
+            raise DownloadError(f"영상을 끝까지 받지 못했습니다 ({part_path.stat().st_size}/{total} 바이트)")
+        return digest.hexdigest()
+
+    def _evict(self, conn, keep=None):
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 가장 오래 쓰지 않은 영상부터 용량이 한도 아래로 내려갈 때까지 삭제 (방금 받은 영상은 제외)
+        stale = []
+        for digest, suffix, size in conn.execute(
+            "SELECT digest, suffix, size FROM blobs WHERE digest != ? ORDER BY accessed_at", (keep or "",)
+        ):
+            if total <= self.max_bytes:
+                break
+            stale.append((digest, suffix))
+            total -= size
+        for digest, suffix in stale:
+            # 이미 파일을 연 프로세스는 삭제 후에도 끝까지 읽을 수 있음
+            self._blob_path(digest, suffix).unlink(missing_ok=True)
+        conn.executemany("DELETE FROM refs WHERE digest = ?", [(digest,) for digest, _ in stale])
+        conn.executemany("DELETE FROM blobs WHERE digest = ?", [(digest,) for digest, _ in stale])
+        conn.execute("UPDATE stats SET value = value + ? WHERE name = 'evicted'", (len(stale),))
+
+    def stats(self):
+        """
+        적중/미스 횟수, 내려받은 바이트, 이어받기/삭제 횟수, 영상 수, 전체 크기(바이트)
+        """
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats"))
+            blobs, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            refs = conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+        return {**counters, "blobs": blobs, "keys": refs, "size_bytes": size}
+
+
+def _hash_file(path):
+    # 이어받기 전에 이미 받은 부분의 해시 상태를 만듦 (조각 단위로 읽음)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_media_cache():
+    """
+    프로세스 전체에서 공유하는 영상 저장소
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = MediaCache(MEDIA_CACHE_DIR)
+    return _cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="릴스 영상 원본 저장소")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fetch = sub.add_parser("fetch", help="영상 받기 (이미 있으면 저장된 파일)")
+    fetch.add_argument("url")
+    fetch.add_argument("--key", help="shortcode")
+    sub.add_parser("stats", help="저장소 통계")
+    args = parser.parse_args()
+
+    cache = get_media_cache()
+    if args.command == "fetch":
+        started = time.perf_counter()
+        path = cache.fetch(args.url, media_key(args.url, args.key))
+        print(f"{path} ({path.stat().st_size / 1024 / 1024:.1f} MB, {time.perf_counter() - started:.2f}초)")
+        return
+    print(json.dumps(cache.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
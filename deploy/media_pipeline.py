@@ -0,0 +1,322 @@
+"""
+릴스 영상에서 나레이션과 초반 3초 구성을 뽑아 입력 양식을 자동으로 채우는 처리 단계
+
+영상(로컬 파일 또는 URL)마다 ffmpeg 프로세스 두 개를 동시에 실행합니다.
+- 음성: 16kHz 모노 wav로 추출해 음성 인식(Transcriber)에 넘김 -> transcript
+- 초반 3초: 첫 장면과 장면이 바뀌는 프레임(키프레임)을 jpg로 저장하고 전환 시각을 기록 -> intro_structure
+
+여러 영상은 프로세스 풀에서 나눠 처리하고, ffmpeg 결과는 MEDIA_DIR(TEMP_DIR 아래)에 바로 씁니다.
+URL 영상은 영상 저장소(media_cache.py)에 한 번만 받아 두고 다시 쓰므로 같은 릴스를 매번 내려받지 않습니다.
+음성 인식은 TRANSCRIBERS에 등록된 방식 중 TRANSCRIBER_BACKEND로 고릅니다.
+기본값 "stub"은 API를 호출하지 않고 영상 옆의 같은 이름 .txt 파일(있으면)을 스크립트로 씁니다.
+
+    python media_pipeline.py video1.mp4 video2.mp4 --workers 4
+    python fake_media_server.py videos --port 8766 &      # URL 테스트용 로컬 서버
+    python media_pipeline.py http://127.0.0.1:8766/video1.mp4
+    python media_pipeline.py --csv ../reels_info_*.csv --limit 20
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from urllib.parse import urlparse
+
+from api_config import FFMPEG_PATH, MEDIA_DIR, MEDIA_WORKERS, TRANSCRIBER_BACKEND
+from media_cache import get_media_cache, media_key
+
+# 분석하는 초반 구간 길이 (초)
+INTRO_SECONDS = 3
+# 이 값보다 화면이 크게 바뀌면 장면 전환으로 봄 (ffmpeg scene 점수, 0~1)
+SCENE_THRESHOLD = 0.3
+# 초반 구간에서 저장하는 키프레임 최대 수
+MAX_KEYFRAMES = 10
+
+_PTS_TIME = re.compile(r"pts_time:\s*([0-9.]+)")
+_DURATION = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+class MediaError(RuntimeError):
+    pass
+
+
+@dataclass
+class MediaResult:
+    source: str
+    video_path: str = ""
+    audio_path: str = ""
+    keyframes: list = field(default_factory=list)
+    cut_times: list = field(default_factory=list)
+    duration: float | None = None
+    transcript: str = ""
+    intro_structure: str = ""
+    error: str = ""
+    seconds: float = 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class Transcriber:
+    """
+    음성 인식 방식의 공통 인터페이스
+    transcribe(음성 wav 경로, 원본 영상 경로) -> 스크립트 텍스트
+    """
+
+    def transcribe(self, audio_path, video_path=None):
+        raise NotImplementedError
+
+
+class StubTranscriber(Transcriber):
+    """
+    API 없이 쓰는 음성 인식 자리 표시자 (영상 옆 같은 이름의 .txt 파일 내용, 없으면 빈 문자열)
+    """
+
+    def transcribe(self, audio_path, video_path=None):
+        if video_path:
+            sidecar = Path(video_path).with_suffix(".txt")
+            if sidecar.exists():
+                return sidecar.read_text(encoding="utf-8").strip()
+        return ""
+
+
+class OpenAITranscriber(Transcriber):
+    """
+    OpenAI 음성 인식 API (whisper-1)
+    """
+
+    def __init__(self, model="whisper-1", language="ko"):
+        self.model = model
+        self.language = language
+
+    def transcribe(self, audio_path, video_path=None):
+        from openai_client import get_openai_client
+
+        with open(audio_path, "rb") as f:
+            response = get_openai_client().audio.transcriptions.create(
+                model=self.model, file=f, language=self.language
+            )
+        return response.text.strip()
+
+
+TRANSCRIBERS = {
+    "stub": StubTranscriber,
+    "openai": OpenAITranscriber
+}
+_transcribers = {}
+
+
+def register_transcriber(name, factory):
+    """
+    음성 인식 방식 추가 (factory()는 Transcriber를 반환)
+    프로세스 풀의 작업 프로세스에서도 쓰려면 이 모듈을 import할 때 등록되도록 해야 합니다.
+    """
+    TRANSCRIBERS[name] = factory
+    _transcribers.pop(name, None)
+
+
+def get_transcriber(name=TRANSCRIBER_BACKEND):
+    if name not in TRANSCRIBERS:
+        raise MediaError(f"알 수 없는 음성 인식 방식입니다: {name}")
+    if name not in _transcribers:
+        _transcribers[name] = TRANSCRIBERS[name]()
+    return _transcribers[name]
+
+
+def _is_url(source):
+    return urlparse(str(source)).scheme in ("http", "https")
+
+
+def _work_dir(video_path, downloaded):
+    # 같은 영상은 같은 폴더 (받은 영상은 파일 이름이 내용 해시, 로컬 파일은 경로/크기/수정 시각)
+    if downloaded:
+        key = Path(video_path).stem
+    else:
+        stat = os.stat(video_path)
+        key = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    folder = Path(MEDIA_DIR) / hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _ffmpeg(*args):
+    try:
+        return subprocess.Popen(
+            [FFMPEG_PATH, "-hide_banner", "-nostdin", "-y", *args],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+    except FileNotFoundError as e:
+        raise MediaError(f"ffmpeg를 찾을 수 없습니다: {FFMPEG_PATH}") from e
+
+
+def extract_media(video_path, folder, intro_seconds=INTRO_SECONDS):
+    """
+    음성(wav)과 초반 키프레임(jpg)을 ffmpeg 두 프로세스로 동시에 추출
+    반환: (음성 경로 또는 None, 키프레임 경로 목록, 장면 전환 시각 목록, 영상 길이)
+    """
+    folder = Path(folder)
+    audio_path = folder / "audio.wav"
+    for old in folder.glob("keyframe_*.jpg"):
+        old.unlink()
+
+    audio = _ffmpeg("-loglevel", "error", "-i", str(video_path),
+                    "-vn", "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le", str(audio_path))
+    # 첫 프레임 + 장면 점수가 기준보다 큰 프레임만 저장하고, showinfo 로그에서 각 프레임 시각을 읽음
+    frames = _ffmpeg("-loglevel", "info", "-t", str(intro_seconds), "-i", str(video_path),
+                     "-vf", f"select='eq(n,0)+gt(scene,{SCENE_THRESHOLD})',showinfo,scale=480:-2",
+                     "-fps_mode", "vfr", "-frames:v", str(MAX_KEYFRAMES),
+                     str(folder / "keyframe_%02d.jpg"))
+    _, frame_log = frames.communicate()
+    _, audio_log = audio.communicate()
+
+    frame_log = frame_log.decode("utf-8", "replace")
+    if frames.returncode != 0:
+        raise MediaError(f"키프레임을 추출할 수 없습니다: {frame_log.strip().splitlines()[-1:]}")
+    times = [float(t) for t in _PTS_TIME.findall(frame_log)]
+    duration = None
+    match = _DURATION.search(frame_log)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    # 음성 트랙이 없는 영상은 음성 없이 진행
+    if audio.returncode != 0 or not audio_path.exists():
+        audio_path = None
+    keyframes = sorted(str(path) for path in folder.glob("keyframe_*.jpg"))
+    return audio_path, keyframes, [t for t in times if t > 0], duration
+
+
+def describe_intro(cut_times, intro_seconds=INTRO_SECONDS):
+    """
+    장면 전환 시각으로 '영상 구성' 입력 문장 만들기
+    """
+    if not cut_times:
+        return f"초반 {intro_seconds}초 동안 장면 전환 없이 한 장면으로 진행"
+    times = ", ".join(f"{t:.1f}초" for t in cut_times)
+    pace = "빠른 장면 전환으로 시선을 붙잡음" if len(cut_times) >= 2 else "한 번의 장면 전환"
+    return f"초반 {intro_seconds}초 동안 장면 전환 {len(cut_times)}회 ({times}) - {pace}"
+
+
+def process_media(source, backend=TRANSCRIBER_BACKEND, intro_seconds=INTRO_SECONDS, shortcode=None):
+    """
+    영상 하나 처리: 내려받기(URL인 경우, 영상 저장소에 있으면 생략) -> ffmpeg 추출 -> 음성 인식
+    shortcode를 주면 URL이 만료되어 새로 발급되어도 저장해 둔 영상을 씁니다.
+    실패해도 예외 대신 error를 채운 MediaResult를 반환하므로 여러 영상을 처리할 때 한 영상 때문에 멈추지 않습니다.
+    """
+    started = time.perf_counter()
+    result = MediaResult(source=str(source))
+    try:
+        downloaded = _is_url(source)
+        if downloaded:
+            video_path = get_media_cache().fetch(str(source), media_key(str(source), shortcode))
+        else:
+            video_path = Path(source)
+        folder = _work_dir(video_path, downloaded)
+        result.video_path = str(video_path)
+        audio_path, result.keyframes, result.cut_times, result.duration = extract_media(
+            video_path, folder, intro_seconds
+        )
+        result.intro_structure = describe_intro(result.cut_times, intro_seconds)
+        if audio_path is not None:
+            result.audio_path = str(audio_path)
+            result.transcript = get_transcriber(backend).transcribe(str(audio_path), str(video_path))
+    except (MediaError, OSError) as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def process_media_batch(sources, workers=MEDIA_WORKERS, backend=TRANSCRIBER_BACKEND, on_result=None,
+                        shortcodes=None):
+    """
+    여러 영상을 프로세스 풀에서 나눠 처리하고 입력 순서대로 결과 반환
+    on_result(순번, MediaResult)는 영상 하나가 끝날 때마다 (끝난 순서대로) 호출됩니다.
+    shortcodes는 sources와 같은 순서의 shortcode 목록 (영상 저장소 키)
+    """
+    sources = list(sources)
+    shortcodes = list(shortcodes) if shortcodes is not None else [None] * len(sources)
+    results = [None] * len(sources)
+    if workers <= 1 or len(sources) <= 1:
+        for index, source in enumerate(sources):
+            results[index] = process_media(source, backend, shortcode=shortcodes[index])
+            if on_result:
+                on_result(index, results[index])
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(sources))) as pool:
+        futures = {
+            pool.submit(process_media, source, backend, shortcode=shortcodes[index]): index
+            for index, source in enumerate(sources)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            if on_result:
+                on_result(index, results[index])
+    return results
+
+
+def fill_video_analysis(video_analysis, result, overwrite=False):
+    """
+    입력 양식의 video_analysis에 영상 처리 결과(transcript, intro_structure)를 채운 새 dict
+    overwrite가 False면 사용자가 이미 입력한 칸은 그대로 둡니다.
+    """
+    filled = dict(video_analysis)
+    for key in ("transcript", "intro_structure"):
+        value = getattr(result, key)
+        if value and (overwrite or not (filled.get(key) or "").strip()):
+            filled[key] = value
+    return filled
+
+
+def _csv_video_urls(patterns):
+    # (video_url, shortcode)
+    csv.field_size_limit(sys.maxsize)
+    for path in sorted({path for pattern in patterns for path in glob.glob(pattern)}):
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                if (row.get("video_url") or "").strip():
+                    yield row["video_url"].strip(), (row.get("shortcode") or "").strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="릴스 영상 음성/초반 키프레임 추출")
+    parser.add_argument("sources", nargs="*", help="영상 파일 경로 또는 URL")
+    parser.add_argument("--csv", nargs="+", default=[], help="video_url 열을 읽을 reels_info CSV (glob 가능)")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=MEDIA_WORKERS)
+    parser.add_argument("--backend", default=TRANSCRIBER_BACKEND, choices=sorted(TRANSCRIBERS))
+    args = parser.parse_args()
+
+    items = [(source, None) for source in args.sources] + list(_csv_video_urls(args.csv))
+    if args.limit:
+        items = items[:args.limit]
+    sources = [source for source, _ in items]
+    if not sources:
+        parser.error("처리할 영상이 없습니다.")
+
+    def report(index, result):
+        if result.error:
+            print(f"[{index}] 실패 ({result.seconds:.2f}초): {result.error}")
+        else:
+            print(f"[{index}] {result.seconds:.2f}초, 키프레임 {len(result.keyframes)}장, "
+                  f"{result.intro_structure}, 스크립트 {len(result.transcript)}자")
+
+    started = time.perf_counter()
+    results = process_media_batch(sources, args.workers, args.backend, on_result=report,
+                                  shortcodes=[shortcode for _, shortcode in items])
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for result in results if result.error)
+    print(f"영상 {len(results)}개 (실패 {failed}개), {elapsed:.2f}초, 초당 {len(results) / elapsed:.1f}개 "
+          f"(작업 프로세스 {min(args.workers, len(results))}개)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""
+분석 요청 구간별 지연/토큰/캐시 지표 (Prometheus 텍스트 형식 + JSON 로그)
+
+분석 한 번(trace_analysis)을 하나의 추적으로 묶어, 아래 구간의 시간을 모읍니다.
+
+- prompt_build  프롬프트 만들기 (강의 구간 검색, 토큰 세기 포함)
+- queue         같은 요청을 합치는 잠금/다른 호출의 결과 대기, 호출 한도(RateLimiter) 대기
+- first_token   분석 시작부터 OpenAI 첫 토큰 도착까지
+- upstream      첫 OpenAI 요청 시작부터 마지막 응답 끝까지
+- parse         응답을 섹션으로 나누는 시간
+- render        화면 그리기 (Streamlit)
+- total         분석 시작부터 끝까지
+
+분석이 끝나면 구간별 시간을 히스토그램에 한 번씩 기록하고 JSON 로그 한 줄을 남깁니다.
+OpenAI 요청 하나하나의 첫 토큰 지연, 응답 시간, 토큰 수(response.usage)는 요청마다 따로 기록합니다.
+지표는 프로세스마다 따로 모이므로, 여러 워커를 띄우면 워커별로 수집해야 합니다.
+
+    GET /metrics (api_server) 또는 METRICS_PORT를 지정한 Streamlit 앱의 http://host:METRICS_PORT/metrics
+"""
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from api_config import METRICS_JSON_LOG
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+STAGES = ("prompt_build", "queue", "first_token", "upstream", "parse", "render", "total")
+# 초 단위 (첫 토큰은 1초 안쪽, 분석 전체는 "약 30초"라 2분까지)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 3000, 4000, 6000, 8000, 12000, 16000, 32000)
+
+logger = logging.getLogger("reels_benchmark.metrics")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 조합마다 [버킷별 개수..., +Inf 개수], 합계
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _label_text(self.labelnames, key, [("le", _number(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "reels_analysis_stage_seconds", "분석 한 번의 구간별 소요 시간", ("path", "stage")
+))
+ANALYSIS_TOKENS = REGISTRY.register(Histogram(
+    "reels_analysis_tokens", "분석 한 번에 쓴 OpenAI 토큰 수", ("path", "kind"), buckets=TOKEN_BUCKETS
+))
+ANALYSES = REGISTRY.register(Counter(
+    "reels_analyses_total", "끝난 분석 수", ("path", "outcome")
+))
+ERRORS = REGISTRY.register(Counter(
+    "reels_analysis_errors_total", "실패한 분석 수 (예외 종류별)", ("path", "error")
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "reels_cache_requests_total", "분석 캐시 조회 결과 (hit/miss/coalesced)", ("section", "result")
+))
+UPSTREAM_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "reels_openai_first_token_seconds", "OpenAI 요청 하나의 첫 토큰 지연", ("model",)
+))
+UPSTREAM_SECONDS = REGISTRY.register(Histogram(
+    "reels_openai_request_seconds", "OpenAI 요청 하나의 응답 시간 (마지막 조각까지)", ("model",)
+))
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    "reels_openai_requests_total", "OpenAI 요청 수 (오류는 예외 종류별, 재시도/헤지 포함)", ("model", "outcome")
+))
+UPSTREAM_TOKENS = REGISTRY.register(Counter(
+    "reels_openai_tokens_total", "OpenAI 응답의 usage 토큰 수", ("model", "kind")
+))
+# 작업 대기열 (job_queue.py): 대기 중인 작업 수는 같은 저장소를 쓰는 모든 프로세스의 합계
+JOB_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "reels_job_queue_depth", "상태별 분석 작업 수 (queued: 오토스케일링 기준)", ("status",)
+))
+JOB_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "reels_job_wait_seconds", "분석 작업이 실행되기 전까지 대기열에서 기다린 시간"
+))
+JOBS = REGISTRY.register(Counter(
+    "reels_jobs_total", "끝난 분석 작업 수", ("outcome",)
+))
+SPECULATIONS = REGISTRY.register(Counter(
+    "reels_speculations_total",
+    "미리 한 릴스 분석 결과 (done/cancelled/cached/over_budget/failed)", ("outcome",)
+))
+
+_current = contextvars.ContextVar("reels_analysis_trace", default=None)
+
+
+class Trace:
+    """
+    분석 한 번의 구간별 시간/토큰/캐시 결과 (여러 스레드/태스크가 함께 기록)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.cache = {}
+        self.upstream_calls = 0
+        self.error = None
+        self._upstream_span = None
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def first_token(self, now):
+        with self._lock:
+            self.stages.setdefault("first_token", now - self.started)
+
+    def upstream(self, start, end):
+        # 동시에 보낸 요청은 겹치는 구간을 한 번만 세도록 처음 시작~마지막 끝으로 기록
+        with self._lock:
+            if self._upstream_span is None:
+                self._upstream_span = (start, end)
+            else:
+                self._upstream_span = (min(start, self._upstream_span[0]), max(end, self._upstream_span[1]))
+            self.stages["upstream"] = self._upstream_span[1] - self._upstream_span[0]
+
+    def usage(self, usage):
+        with self._lock:
+            self.upstream_calls += 1
+            self.tokens["prompt"] += usage.prompt_tokens or 0
+            self.tokens["completion"] += usage.completion_tokens or 0
+
+    def cache_result(self, section, result):
+        with self._lock:
+            counts = self.cache.setdefault(section, {})
+            counts[result] = counts.get(result, 0) + 1
+
+    def to_dict(self):
+        return {
+            "event": "analysis",
+            "trace_id": self.trace_id,
+            "path": self.path,
+            "outcome": "error" if self.error else "ok",
+            "error": self.error,
+            "stages": {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            "tokens": dict(self.tokens, total=self.tokens["prompt"] + self.tokens["completion"]),
+            "upstream_calls": self.upstream_calls,
+            "cache": {section: dict(counts) for section, counts in self.cache.items()}
+        }
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def trace_analysis(path):
+    """
+    with 블록 안에서 일어난 분석 한 번을 추적 (path: "app", "api", "batch" 등 호출 경로)
+    블록을 나가면 구간별 히스토그램과 토큰 수를 기록하고 JSON 로그를 남깁니다.
+    """
+    trace = Trace(path)
+    token = _current.set(trace)
+    try:
+        yield trace
+    except Exception as e:
+        record_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        trace.add("total", time.perf_counter() - trace.started)
+        _finish(trace)
+
+
+def _finish(trace):
+    for stage, seconds in trace.stages.items():
+        STAGE_SECONDS.observe(seconds, path=trace.path, stage=stage)
+    if trace.upstream_calls:
+        for kind in ("prompt", "completion"):
+            ANALYSIS_TOKENS.observe(trace.tokens[kind], path=trace.path, kind=kind)
+    outcome = "error" if trace.error else "ok"
+    ANALYSES.inc(path=trace.path, outcome=outcome)
+    if trace.error:
+        ERRORS.inc(path=trace.path, error=trace.error)
+    logger.info(json.dumps(trace.to_dict(), ensure_ascii=False))
+
+
+def record_error(error):
+    """
+    예외를 잡아 화면에 보여주는 쪽에서 호출하면 현재 분석을 실패로 기록
+    """
+    trace = _current.get()
+    if trace is not None and trace.error is None:
+        trace.error = type(error).__name__
+
+
+def record_cache(section, result):
+    CACHE_REQUESTS.inc(section=section, result=result)
+    trace = _current.get()
+    if trace is not None:
+        trace.cache_result(section, result)
+
+
+def observe_stage(stage, seconds):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def stage(name):
+    """
+    with 블록의 소요 시간을 현재 분석의 name 구간에 더함 (분석 밖에서는 기록하지 않음)
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def timed(name):
+    """
+    함수 실행 시간을 현재 분석의 name 구간에 더하는 데코레이터
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class UpstreamCall:
+    """
+    OpenAI 스트리밍 요청 하나의 첫 토큰 지연/응답 시간/usage 기록
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.started = time.perf_counter()
+        self._trace = _current.get()
+        self._first_token = None
+
+    def token(self):
+        if self._first_token is None:
+            self._first_token = time.perf_counter()
+            UPSTREAM_FIRST_TOKEN.observe(self._first_token - self.started, model=self.model)
+            if self._trace is not None:
+                self._trace.first_token(self._first_token)
+
+    def usage(self, usage):
+        UPSTREAM_TOKENS.inc(usage.prompt_tokens or 0, model=self.model, kind="prompt")
+        UPSTREAM_TOKENS.inc(usage.completion_tokens or 0, model=self.model, kind="completion")
+        if self._trace is not None:
+            self._trace.usage(usage)
+
+    def finish(self):
+        end = time.perf_counter()
+        UPSTREAM_SECONDS.observe(end - self.started, model=self.model)
+        UPSTREAM_REQUESTS.inc(model=self.model, outcome="ok")
+        if self._trace is not None:
+            self._trace.upstream(self.started, end)
+
+    def fail(self, error):
+        UPSTREAM_REQUESTS.inc(model=self.model, outcome=type(error).__name__)
+
+
+def bind(fn):
+    """
+    현재 분석 추적을 스레드 풀 작업으로 넘기는 래퍼 (호출할 때마다 컨텍스트를 복사해서 실행)
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def render_metrics():
+    return REGISTRY.render()
+
+
+def configure_json_log(stream=None):
+    """
+    JSON 로그를 stderr(또는 stream)에 한 줄씩 출력 (이미 핸들러가 있으면 그대로 둠)
+    """
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """
+    /metrics를 응답하는 HTTP 서버를 백그라운드 스레드로 시작 (Streamlit처럼 API가 없는 프로세스용)
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if METRICS_JSON_LOG:
+    configure_json_log()
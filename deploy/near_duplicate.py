@@ -0,0 +1,367 @@
+"""
+거의 같은 입력의 이전 분석 찾기 (MinHash + LSH)
+
+띄어쓰기 하나, 해시태그 하나, 스크립트 오타 수정처럼 조금만 고친 입력은 캐시 키가 달라져
+매번 gpt-4o를 새로 호출합니다. 분석이 끝날 때마다 입력 텍스트의 MinHash 서명을 저장해 두고,
+새 입력은 LSH로 후보만 골라 추정 유사도가 기준 이상인 이전 분석을 찾습니다.
+
+- 정규화: 유니코드 NFKC, 소문자, 문장부호/이모지/# 제거, 연속 공백 하나로
+- 서명: 글자 3-gram 집합의 MinHash 128개 (같은 값의 비율 = Jaccard 유사도 추정값)
+- LSH: 서명을 4개씩 32개 밴드로 나눠, 밴드 하나라도 같은 항목만 후보로 비교
+  (유사도 0.7 이상은 99% 넘게 후보에 들어가고, 관계없는 입력은 거의 후보가 되지 않음)
+- 밴드 테이블: 불러온 항목은 정렬한 numpy 배열(searchsorted로 조회), 그 뒤에 추가된 항목은 dict
+- 저장: SQLite 파일에 서명을 쌓고, 메모리의 밴드 테이블은 조회할 때 새로 추가된 행만 읽어 맞춤
+  (같은 파일을 쓰는 다른 프로세스가 추가한 분석도 찾음)
+- 삭제: 분석 캐시에서 지운 항목의 서명은 remove_keys로 지우고, 메모리에서는 지운 항목 번호만 표시해 둠
+  (다른 프로세스가 지운 서명은 조회 결과를 돌려주기 전에 파일에 남아 있는지 확인해 걸러냄)
+
+    python near_duplicate.py compare "첫 번째 스크립트" "두 번째 스크립트"
+    python near_duplicate.py stats
+"""
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+
+from api_config import NEAR_DUPLICATE_PATH
+
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+BAND_ROWS = 4
+BANDS = NUM_PERM // BAND_ROWS
+# 한 번에 돌려주는 최대 후보 수
+MAX_RESULTS = 5
+
+_NON_WORD = re.compile(r"[^\w\s]|_")
+_MERSENNE_PRIME = (1 << 61) - 1
+# 프로세스가 달라도 같은 서명이 나오도록 고정한 무작위 1차 함수 (a * x + b) mod p
+_rng = np.random.RandomState(20240901)
+_PERM_A = _rng.randint(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+_EMPTY_SIGNATURE = np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint32)
+_BAND_SALT = np.arange(1, BANDS + 1, dtype=np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+# 정렬 배열에 합치지 않고 dict로 들고 있는 최근 항목 수 (넘으면 전체를 다시 정렬)
+RECENT_ROWS = 1024
+# 메모리에 지운 것으로만 표시해 둔 항목이 이보다 많으면 파일에서 전체를 다시 읽음
+REMOVED_ROWS = 1024
+# SQLite 변수 개수 한도보다 작게 나눠서 IN 조건에 넣음
+_BATCH = 500
+
+
+def normalize(text):
+    """
+    사소한 차이를 지운 텍스트 (NFKC, 소문자, 문장부호/이모지/# 제거, 연속 공백 하나로)
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def shingles(text):
+    """
+    정규화한 텍스트의 글자 3-gram 해시 집합 (crc32, 짧으면 텍스트 전체 하나)
+    """
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode("utf-8"))} if text else set()
+    return {
+        zlib.crc32(text[i:i + SHINGLE_SIZE].encode("utf-8"))
+        for i in range(len(text) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(text):
+    """
+    텍스트의 MinHash 서명 (uint32 NUM_PERM개)
+    """
+    hashes = np.fromiter(shingles(text), dtype=np.uint64)
+    if not len(hashes):
+        return _EMPTY_SIGNATURE.copy()
+    # x, a < 2^32 이므로 a * x + b 는 uint64를 넘지 않음
+    values = (hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME
+    return (values & 0xFFFFFFFF).astype(np.uint32).min(axis=0)
+
+
+def similarity(a, b):
+    """
+    두 서명의 추정 Jaccard 유사도 (0~1)
+    """
+    return float(np.mean(np.asarray(a) == np.asarray(b)))
+
+
+def _band_keys(sigs):
+    """
+    서명 (n, NUM_PERM)을 밴드마다 정수 하나로 줄인 (n, BANDS) 배열
+    밴드의 uint32 4개를 uint64 2개로 보고 밴드 번호와 함께 섞어, 모든 밴드를 한 테이블에서 찾음
+    (드물게 겹쳐도 후보가 하나 늘 뿐, 유사도는 서명으로 다시 계산함)
+    """
+    halves = np.ascontiguousarray(sigs, dtype=np.uint32).view(np.uint64).reshape(len(sigs), BANDS, 2)
+    return (halves[:, :, 0] * np.uint64(0x9E3779B97F4A7C15)) ^ halves[:, :, 1] ^ _BAND_SALT
+
+
+class NearDuplicateIndex:
+    """
+    분석 결과 캐시 키를 서명으로 찾는 LSH 인덱스
+
+    scope는 텍스트 말고 정확히 같아야 하는 조건(주제, 모델, 프롬프트 버전 등)의 해시로,
+    scope가 다른 항목은 유사도가 높아도 돌려주지 않습니다.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # 조회할 때마다 새 행만 읽으므로 연결은 하나를 잠금으로 나눠 씀
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._create_table()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _create_table(self):
+        # id는 AUTOINCREMENT: 마지막 행을 지운 뒤 같은 id를 다시 쓰면 _sync가 새 행을 놓침
+        table = """
+            CREATE TABLE signatures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                reel_key TEXT NOT NULL,
+                planning_key TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (reel_key, planning_key)
+            )
+        """
+        row = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'signatures'"
+        ).fetchone()
+        if row is None:
+            self._conn.execute(table)
+        elif "AUTOINCREMENT" not in row[0]:
+            # 이전 버전에서 만든 파일은 행을 그대로 옮겨 담음
+            self._conn.execute("ALTER TABLE signatures RENAME TO signatures_old")
+            self._conn.execute(table)
+            self._conn.execute("INSERT INTO signatures SELECT * FROM signatures_old")
+            self._conn.execute("DROP TABLE signatures_old")
+        # remove_keys가 planning_key로도 지우므로 (reel_key는 UNIQUE 인덱스로 찾음)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signatures_planning ON signatures (planning_key)")
+
+    def _reset(self):
+        # 메모리 인덱스를 비움 (다음 _sync에서 파일의 모든 행을 다시 읽음)
+        self._signatures = np.empty((1024, NUM_PERM), dtype=np.uint32)
+        self._entries = []
+        self._ids = []
+        self._rows_by_id = {}
+        self._known = set()
+        # 파일에서 지워져 조회에서 빼는 항목 번호
+        self._removed = set()
+        # 정렬된 밴드 값과 그 값의 항목 번호, 정렬 뒤에 추가된 항목의 {밴드 값: [항목 번호]}
+        self._sorted_keys = np.empty(0, dtype=np.uint64)
+        self._sorted_rows = np.empty(0, dtype=np.int64)
+        self._recent = {}
+        self._recent_rows = 0
+        self._last_id = 0
+
+    def _sync(self):
+        # 잠금을 잡은 상태에서 호출: 마지막으로 읽은 뒤 추가된 행만 메모리 인덱스에 넣음
+        rows = self._conn.execute(
+            "SELECT id, scope, reel_key, planning_key, signature FROM signatures WHERE id > ? ORDER BY id",
+            (self._last_id,)
+        ).fetchall()
+        if not rows:
+            return
+        needed = len(self._entries) + len(rows)
+        if needed > len(self._signatures):
+            grown = np.empty((max(needed, len(self._signatures) * 2), NUM_PERM), dtype=np.uint32)
+            grown[:len(self._entries)] = self._signatures[:len(self._entries)]
+            self._signatures = grown
+        start = len(self._entries)
+        sigs = np.frombuffer(b"".join(row[4] for row in rows), dtype=np.uint32).reshape(len(rows), NUM_PERM)
+        self._signatures[start:needed] = sigs
+        for row_id, scope, reel_key, planning_key, _ in rows:
+            self._rows_by_id[row_id] = len(self._entries)
+            self._ids.append(row_id)
+            self._entries.append((scope, reel_key, planning_key or None))
+            self._known.add((reel_key, planning_key or None))
+        self._last_id = rows[-1][0]
+
+        if self._recent_rows + len(rows) > RECENT_ROWS:
+            keys = _band_keys(self._signatures[:needed]).ravel()
+            order = np.argsort(keys, kind="stable")
+            self._sorted_keys = keys[order]
+            self._sorted_rows = order // BANDS
+            self._recent = {}
+            self._recent_rows = 0
+            return
+        for index, keys in enumerate(_band_keys(sigs).tolist(), start):
+            for key in keys:
+                self._recent.setdefault(key, []).append(index)
+        self._recent_rows += len(rows)
+
+    def _forget(self, row_ids):
+        # 잠금을 잡은 상태에서 호출: 파일에서 지운 행을 조회 결과에서 뺌
+        for row_id in row_ids:
+            index = self._rows_by_id.pop(row_id, None)
+            if index is not None:
+                self._removed.add(index)
+                self._known.discard(self._entries[index][1:])
+        if len(self._removed) > REMOVED_ROWS:
+            self._reset()
+            self._sync()
+
+    def remove_keys(self, keys):
+        """
+        reel_key나 planning_key가 keys에 있는 서명 삭제 (분석 캐시에서 지운 항목)
+        반환: 지운 서명 수
+        """
+        keys = list(keys)
+        removed = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for start in range(0, len(keys), _BATCH):
+                    batch = keys[start:start + _BATCH]
+                    marks = ", ".join("?" * len(batch))
+                    removed += [row_id for (row_id,) in self._conn.execute(
+                        f"DELETE FROM signatures WHERE reel_key IN ({marks}) OR planning_key IN ({marks}) "
+                        "RETURNING id",
+                        batch + batch
+                    ).fetchall()]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._forget(removed)
+        return len(removed)
+
+    def add(self, sig, scope, reel_key, planning_key=None):
+        """
+        분석 하나의 서명 저장 (같은 캐시 키 조합이 이미 있으면 무시)
+        """
+        self.add_many([(sig, scope, reel_key, planning_key)])
+
+    def add_many(self, items):
+        """
+        (서명, scope, reel_key, planning_key) 목록을 한 트랜잭션으로 저장
+        """
+        now = time.time()
+        with self._lock:
+            self._sync()
+            rows = [
+                (scope, reel_key, planning_key or "", np.asarray(sig, dtype=np.uint32).tobytes(), now)
+                for sig, scope, reel_key, planning_key in items
+                if (reel_key, planning_key or None) not in self._known
+            ]
+            if not rows:
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO signatures (scope, reel_key, planning_key, signature, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._sync()
+
+    def query(self, sig, scope, threshold, limit=MAX_RESULTS):
+        """
+        유사도가 threshold 이상인 항목을 높은 순으로 반환
+        반환: [(유사도, reel_key, planning_key)]
+        """
+        sig = np.asarray(sig, dtype=np.uint32)
+        with self._lock:
+            self._sync()
+            keys = _band_keys(sig[None])[0]
+            starts = np.searchsorted(self._sorted_keys, keys, side="left")
+            ends = np.searchsorted(self._sorted_keys, keys, side="right")
+            candidates = set()
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if end > start:
+                    candidates.update(self._sorted_rows[start:end].tolist())
+            for key in keys.tolist():
+                candidates.update(self._recent.get(key, ()))
+            candidates = [
+                index for index in candidates
+                if index not in self._removed and self._entries[index][0] == scope
+            ]
+            if not candidates:
+                return []
+            scores = (self._signatures[candidates] == sig).mean(axis=1)
+            matches = sorted(
+                ((float(score), index) for score, index in zip(scores, candidates) if score >= threshold),
+                reverse=True
+            )
+            if not matches:
+                return []
+            # 다른 프로세스가 지운 서명은 빼고 돌려줌
+            ids = [self._ids[index] for _, index in matches]
+            alive = set()
+            for start in range(0, len(ids), _BATCH):
+                batch = ids[start:start + _BATCH]
+                alive.update(row_id for (row_id,) in self._conn.execute(
+                    f"SELECT id FROM signatures WHERE id IN ({', '.join('?' * len(batch))})", batch
+                ).fetchall())
+            result = [
+                (score, *self._entries[index][1:])
+                for score, index in matches
+                if self._ids[index] in alive
+            ][:limit]
+            self._forget([row_id for row_id in ids if row_id not in alive])
+            return result
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._entries) - len(self._removed)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index():
+    """
+    프로세스 전체에서 공유하는 유사 입력 인덱스
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex(NEAR_DUPLICATE_PATH)
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="거의 같은 입력 찾기 인덱스")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compare = commands.add_parser("compare", help="두 텍스트의 추정 유사도와 실제 Jaccard 유사도 비교")
+    compare.add_argument("first")
+    compare.add_argument("second")
+    commands.add_parser("stats", help="저장된 서명 수")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        a, b = shingles(args.first), shingles(args.second)
+        exact = len(a & b) / len(a | b) if a | b else 1.0
+        print(f"추정 유사도 {similarity(signature(args.first), signature(args.second)):.3f} "
+              f"(실제 Jaccard {exact:.3f})")
+    else:
+        print(f"{NEAR_DUPLICATE_PATH}: 서명 {len(get_near_duplicate_index()):,}개")
+
+
+if __name__ == "__main__":
+    main()
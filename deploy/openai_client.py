@@ -0,0 +1,204 @@
+"""
+프로세스 전체에서 공유하는 OpenAI 클라이언트 (연결 풀)
+
+분석마다 openai.OpenAI(...)를 새로 만들면 매번 새 httpx 클라이언트가 생기고
+TCP/TLS 연결도 처음부터 다시 맺습니다. 여기서 만든 클라이언트 하나를 모든 사용자가 함께 쓰면
+연결 풀 안의 연결(keep-alive)이 재사용되어 두 번째 분석부터는 핸드셰이크 비용이 사라집니다.
+h2 패키지가 설치되어 있으면 HTTP/2로 연결 하나에 여러 요청을 동시에 보냅니다.
+
+pool_stats()로 연결 수(사용 중/대기 중)와 지금까지 맺은 TCP 연결, TLS 핸드셰이크 수를 확인할 수 있습니다.
+"""
+import threading
+import time
+
+import httpx
+import openai
+
+from api_config import (
+    get_api_config,
+    OPENAI_POOL_SIZE,
+    OPENAI_KEEPALIVE_EXPIRY,
+    OPENAI_CONNECT_TIMEOUT,
+    OPENAI_READ_TIMEOUT,
+    OPENAI_HTTP2,
+)
+
+
+def _http2_available():
+    if not OPENAI_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ConnectionCounter:
+    """
+    httpcore trace 이벤트로 새 연결/핸드셰이크 횟수를 셈
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tcp_connects = 0
+        self.tls_handshakes = 0
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def trace(self, name, info):
+        if name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.tcp_connects += 1
+        elif name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    async def atrace(self, name, info):
+        # 비동기 클라이언트는 trace 콜백도 코루틴이어야 함
+        self.trace(name, info)
+
+
+_counter = _ConnectionCounter()
+_lock = threading.Lock()
+_client = None
+_async_client = None
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=OPENAI_POOL_SIZE,
+        max_keepalive_connections=OPENAI_POOL_SIZE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+    )
+
+
+def _timeout():
+    # 연결/풀 대기는 짧게, 응답 읽기는 긴 분석 생성 시간을 고려해 길게
+    return httpx.Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT, pool=OPENAI_CONNECT_TIMEOUT)
+
+
+def _on_request(request):
+    request.extensions["trace"] = _counter.trace
+    _counter.count_request()
+
+
+async def _on_request_async(request):
+    request.extensions["trace"] = _counter.atrace
+    _counter.count_request()
+
+
+def get_openai_client():
+    """
+    프로세스 전체에서 공유하는 OpenAI 클라이언트 (스레드 안전)
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                api_config = get_api_config()
+                http_client = httpx.Client(
+                    limits=_limits(),
+                    timeout=_timeout(),
+                    http2=_http2_available(),
+                    event_hooks={"request": [_on_request]}
+                )
+                _client = openai.OpenAI(
+                    api_key=api_config["api_key"],
+                    base_url=api_config["base_url"],
+                    timeout=_timeout(),
+                    # 재시도는 resilience.py가 마감 시간 안에서 직접 처리
+                    max_retries=0,
+                    http_client=http_client
+                )
+    return _client
+
+
+def get_async_openai_client():
+    """
+    프로세스 전체에서 공유하는 AsyncOpenAI 클라이언트 (한 이벤트 루프 안에서 사용)
+    """
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                api_config = get_api_config()
+                http_client = httpx.AsyncClient(
+                    limits=_limits(),
+                    timeout=_timeout(),
+                    http2=_http2_available(),
+                    event_hooks={"request": [_on_request_async]}
+                )
+                _async_client = openai.AsyncOpenAI(
+                    api_key=api_config["api_key"],
+                    base_url=api_config["base_url"],
+                    timeout=_timeout(),
+                    # 재시도는 resilience.py가 마감 시간 안에서 직접 처리
+                    max_retries=0,
+                    http_client=http_client
+                )
+    return _async_client
+
+
+async def close_async_openai_client():
+    """
+    비동기 클라이언트 종료 (이벤트 루프를 닫기 전에 호출, 다음 사용 시 새로 만듦)
+    """
+    global _async_client
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.close()
+
+
+def warm_up_openai_client():
+    """
+    앱 시작 시 미리 연결을 맺어두어 첫 분석에서 TLS 핸드셰이크 시간을 줄임
+    모델 목록 조회는 토큰을 쓰지 않으며, 실패해도 분석에는 영향이 없습니다.
+    반환: 걸린 시간(초)
+    """
+    started = time.perf_counter()
+    try:
+        get_openai_client().models.list()
+    except openai.OpenAIError:
+        pass
+    return time.perf_counter() - started
+
+
+async def warm_up_async_openai_client():
+    started = time.perf_counter()
+    try:
+        await get_async_openai_client().models.list()
+    except openai.OpenAIError:
+        pass
+    return time.perf_counter() - started
+
+
+def _pool_connections(client):
+    # httpx가 공개하지 않는 내부 연결 풀을 조회 (버전이 달라 없으면 빈 목록)
+    if client is None:
+        return []
+    transport = getattr(client._client, "_transport", None)
+    pool = getattr(transport, "_pool", None)
+    return list(getattr(pool, "connections", []))
+
+
+def pool_stats():
+    """
+    연결 풀 상태: 사용 중/대기 중 연결 수와 누적 요청, TCP 연결, TLS 핸드셰이크 횟수
+    요청 수에 비해 핸드셰이크 수가 적을수록 연결이 잘 재사용되고 있다는 뜻입니다.
+    """
+    connections = _pool_connections(_client) + _pool_connections(_async_client)
+    idle = sum(1 for conn in connections if conn.is_idle())
+    closed = sum(1 for conn in connections if conn.is_closed())
+    return {
+        "pool_size": OPENAI_POOL_SIZE,
+        "http2": _http2_available(),
+        "active_connections": len(connections) - idle - closed,
+        "idle_connections": idle,
+        "requests": _counter.requests,
+        "tcp_connects": _counter.tcp_connects,
+        "tls_handshakes": _counter.tls_handshakes
+    }
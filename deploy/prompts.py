@@ -0,0 +1,351 @@
+"""
+분석 프롬프트 템플릿과 토큰 계산
+
+템플릿 문자열은 모듈을 불러올 때 한 번만 정리(들여쓰기/빈 줄 제거)하고, 요청 항목 조합별 안내문도
+처음 한 번만 이어 붙여 둡니다. 요청마다 바뀌는 값(스크립트, 캡션, 사용자 입력, 주제)만 채워 넣습니다.
+릴스 스크립트와 캡션은 시스템 메시지에 한 번만 넣습니다.
+
+토큰 수는 tiktoken이 설치되어 있으면 모델 인코딩으로 세고, 없으면 글자 수로 어림합니다.
+"""
+import re
+import textwrap
+
+# gpt-4o 기준 입력+출력 한도와 출력 한도
+CONTEXT_WINDOW = 128000
+MAX_OUTPUT_TOKENS = 16384
+
+PLANNING_HEADER = "# 6. 벤치마킹 적용 기획:"
+NO_TOPIC_MESSAGE = "주제가 입력되지 않았습니다. 구체적인 기획을 위해 주제를 입력해주세요."
+
+SYSTEM_TEMPLATE = """
+다음 릴스를 분석하고, 입력된 주제에 맞게 벤치마킹 기획을 해주세요:
+
+스크립트: {transcript}
+캡션: {caption}
+{lecture_context}
+{checked_items}
+{user_inputs}
+{topic_line}
+
+위 릴스의 장점과 특징을 분석한 후, 새로운 주제에 맞게 벤치마킹하여 구체적인 스크립트, 캡션, 영상 기획을 제시해주세요.
+"""
+
+PREAMBLE = """
+당신은 릴스 분석 전문가입니다. 다음 형식으로 분석 결과를 제공해주세요.
+각 항목에 대해 ✅/❌를 표시하고, 그 판단의 근거가 되는 스크립트나 캡션의 구체적인 내용을 인용해주세요.
+여기서 모수란 이 내용이 얼마나 많은 사람들의 관심을 끌 수 있는지에 대한 것입니다.
+문제 해결이란 시청자가 갖고 있는 문제를 해결해줄 수 있는지에 대한 것입니다:
+"""
+
+TOPIC_SECTION = """
+# 1. 주제:
+- **설명: (이 영상의 주제에 대한 내용)**
+- ✅/❌ **공유 및 저장**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **모수**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **문제해결**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **욕망충족**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **흥미유발**: 스크립트/캡션 중 해당 내용
+"""
+
+INTRO_SECTION = """
+# 2. 초반 3초
+## 카피라이팅 :
+- **설명: (이 영상의 초반 3초 카피라이팅에 대한 내용)**
+- ✅/❌ **구체적 수치**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **뇌 충격**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **이익, 손해 강조**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **권위 강조**: 스크립트/캡션 중 해당 내용
+
+## 영상 구성 :
+- **설명: (이 영상의 초반 3초 영상 구성에 대한 내용)**
+- ✅/❌ **상식 파괴**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **결과 먼저**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **부정 강조**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **공감 유도**: 스크립트/캡션 중 해당 내용
+"""
+
+CONTENT_SECTION = """
+# 3. 내용 구성:
+- **설명: (이 영상의 스크립트/캡션의 전체적인 내용 구성에 대한 내용)**
+- ✅/❌ **문제해결**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **호기심 유발**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **행동 유도**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **스토리**: 스크립트/캡션 중 해당 내용
+- ✅/❌ **제안**: 스크립트/캡션 중 해당 내용
+
+# 4. 개선할 점:
+- ❌ **(항목명)**: 개선할 점 설명 추가 ex. 스크립트/캡션 예시
+
+# 5. 적용할 점:
+- ✅ **(항목명)**: 적용할 점 설명 추가 ex. 스크립트/캡션 중 해당 내용
+"""
+
+# 스크립트/캡션은 시스템 메시지에 이미 있으므로 여기서는 참조만 함
+PLANNING_SECTION = PLANNING_HEADER + """
+
+- 입력하신 주제 "{topic}"에 대한 벤치마킹 적용 기획입니다.
+- 릴스 분석에서 체크(✅)된 항목들을 모두 반영하여 벤치마킹한 내용입니다.
+
+시스템 메시지의 스크립트와 캡션을 최대한 유사하게 벤치마킹하여 다음과 같이 작성했습니다:
+
+## 🎙️ 1. 스크립트 예시:
+[원본 스크립트의 문장 구조, 호흡, 강조점을 거의 그대로 활용하되 새로운 주제에 맞게 변경.
+예를 들어 원본이 "이것 하나만 있으면 ~~" 구조라면, 새로운 주제도 동일한 구조 사용]
+
+## ✏️ 2. 캡션 예시:
+[원본 캡션의 구조를 거의 그대로 활용.
+예를 들어 원본이 "✨꿀팁 공개✨" 시작이라면, 새로운 캡션도 동일한 구조 사용.
+이모지, 해시태그 스타일도 원본과 동일하게 구성]
+
+## 🎬 3. 영상 기획:
+원본 영상의 구성을 최대한 유사하게 벤치마킹하되, 다음 요소들을 추가/보완했습니다:
+
+1. **🎯 도입부** (3초):
+   - 💥 **뇌 충격을 주는 구체적 수치 활용** (스크립트/캡션 예시 내용)
+   - 🔄 **상식을 깨는 내용으로 시작** (스크립트/캡션 예시 내용)
+   - ⭐ **결과를 먼저 보여주는 방식 적용** (스크립트/캡션 예시 내용)
+
+2. **📝 전개**:
+   - **문제 해결형 구조 적용:**
+     * ❓ **명확한 문제 제시** (스크립트/캡션 예시 내용)
+     * ✅ **구체적인 해결책 제시** (스크립트/캡션 예시 내용)
+   - **시청 지속성 확보:**
+     * 🎙️ **나레이션과 영상의 일치성 유지** (스크립트/캡션 예시 내용)
+     * 🎵 **트렌디한 BGM 활용** (스크립트/캡션 예시 내용)
+     * 📹 **고화질 영상 품질 유지** (스크립트/캡션 예시 내용)
+
+3. **🔚 마무리**:
+   - **행동 유도 요소 포함:**
+     * 💾 **저장/공유 유도 멘트** (스크립트/캡션 예시 내용)
+     * 👥 **팔로우 제안** (스크립트/캡션 예시 내용)
+   - **캡션 최적화:**
+     * 🎣 **첫 줄 후킹** (스크립트/캡션 예시 내용)
+     * 📑 **단락 구분으로 가독성 확보** (스크립트/캡션 예시 내용)
+     * 📊 **구체적 수치/권위 요소 포함** (스크립트/캡션 예시 내용)
+"""
+
+# 긴 스크립트를 구간별로 정리하는 요청 (map 단계, 결과를 이어 붙여 위 분석 프롬프트의 스크립트로 씀)
+CHUNK_TEMPLATE = """
+다음은 긴 릴스 스크립트의 {index}/{total}번째 구간입니다.
+체크리스트 분석에 쓸 수 있도록 이 구간의 특징만 짧게 정리해주세요. 인용은 원문 그대로 따옴표 안에 적어주세요.
+
+- 요약: (이 구간의 핵심 내용 2~3문장)
+- 후킹 문장: (시선을 끄는 문장, 구체적 수치, 권위/이익/손해 강조 표현 인용)
+- 구성: (문제 제시, 해결책, 스토리, 행동 유도, 제안 등 이 구간이 맡은 역할)
+
+스크립트 구간:
+{chunk}
+"""
+# 구간 정리 프롬프트를 바꾸면 올려서 이전 구간 캐시를 쓰지 않게 함
+CHUNK_PROMPT_VERSION = "1"
+# 구간 정리 하나의 최대 출력 토큰 (구간이 많으면 transcript.summary_budget이 더 줄임)
+CHUNK_MAX_TOKENS = 400
+
+# 강의 구간을 찾을 때 릴스 내용과 함께 넣는 항목별 검색어 (체크리스트 기준 용어)
+PART_QUERY_HINTS = {
+    "topic": "주제 공유 저장 모수 문제 해결 욕망 충족 흥미 유발",
+    "intro": "초반 3초 카피라이팅 구체적 수치 뇌 충격 이익 손해 권위 상식 파괴 결과 먼저 부정 공감",
+    "content": "내용 구성 호기심 행동 유도 스토리 제안",
+    "planning": "벤치마킹 스크립트 캡션 영상 기획 후킹"
+}
+
+SUBSET_NOTE = "위 형식의 항목만 작성하고, 다른 번호의 항목은 출력하지 마세요."
+
+# 사용자 입력 정보 항목 (비어 있는 항목은 프롬프트에서 뺌)
+USER_INPUT_FIELDS = (
+    ("intro_copy", "초반 3초 카피라이팅"),
+    ("intro_structure", "초반 3초 영상 구성"),
+    ("narration", "나레이션"),
+    ("music", "음악"),
+    ("font", "폰트"),
+)
+
+# 항목별 기본 출력 토큰 (기획은 원본 스크립트/캡션 길이만큼 더 씀 - output_budget 참고)
+PART_MAX_TOKENS = {
+    "topic": 1000,
+    "intro": 1500,
+    "content": 1800,
+    "planning": 2500
+}
+
+_BLANK_LINES = re.compile(r"\n{3,}")
+_SPACES = re.compile(r"[ \t ]+")
+_HANGUL = re.compile(r"[가-힣ㄱ-ㆎ]")
+
+
+def _compact(text):
+    # 들여쓰기, 줄 끝 공백, 연속 빈 줄 정리
+    lines = [line.rstrip() for line in textwrap.dedent(text).splitlines()]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def compact_input(value):
+    """
+    스크립트/캡션 등 사용자 입력의 공백 정리 (줄바꿈은 유지)
+    """
+    if not value:
+        return ""
+    lines = [_SPACES.sub(" ", line).strip() for line in str(value).splitlines()]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _load_encoding():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception:
+        # 미설치이거나 인코딩 파일을 받을 수 없는 환경
+        return None
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def count_tokens(text):
+    """
+    텍스트의 토큰 수 (tiktoken이 없으면 한글은 글자당 1개, 그 밖에는 4글자당 1개로 어림)
+    """
+    global _encoding, _encoding_loaded
+    if not text:
+        return 0
+    if not _encoding_loaded:
+        _encoding = _load_encoding()
+        _encoding_loaded = True
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    hangul = len(_HANGUL.findall(text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+def count_message_tokens(messages):
+    # 메시지마다 역할/구분자 토큰이 몇 개씩 붙음
+    return sum(count_tokens(message["content"]) + 4 for message in messages) + 3
+
+
+class PromptTemplate:
+    """
+    버전이 붙은 분석 프롬프트
+    정적인 안내문은 만들 때 한 번 정리해 두고, build()는 요청마다 바뀌는 값만 채웁니다.
+    version은 캐시 키에 들어가므로 프롬프트 내용을 바꾸면 함께 올려야 합니다.
+    """
+
+    def __init__(self, version, system, preamble, sections, subset_note, all_parts):
+        self.version = version
+        self.system = _compact(system)
+        self.preamble = _compact(preamble)
+        self.sections = {part: _compact(text) for part, text in sections.items()}
+        self.subset_note = _compact(subset_note)
+        self.all_parts = tuple(all_parts)
+        self._user_templates = {}
+
+    def user_template(self, parts):
+        """
+        항목 조합별 사용자 메시지 틀 (조합마다 처음 한 번만 이어 붙임)
+        """
+        parts = tuple(parts)
+        template = self._user_templates.get(parts)
+        if template is None:
+            blocks = [self.preamble] + [self.sections[part] for part in parts]
+            if parts != self.all_parts:
+                blocks.append(self.subset_note)
+            template = "\n\n".join(blocks)
+            self._user_templates[parts] = template
+        return template
+
+    def build(self, info, input_data, parts, lecture_passages=(), checked_items=()):
+        """
+        lecture_passages: 판단 기준으로 함께 보여줄 릴스 강의 구간 (lecture_index.retrieve_passages)
+        checked_items: 기획만 따로 요청할 때 함께 보여줄 1~5번 분석의 ✅ 항목 ("항목명: 설명")
+        """
+        video = input_data["video_analysis"]
+        user_inputs = "\n".join(
+            f"- {label}: {compact_input(video.get(field))}"
+            for field, label in USER_INPUT_FIELDS
+            if compact_input(video.get(field))
+        )
+        if user_inputs:
+            user_inputs = "\n사용자 입력 정보:\n" + user_inputs
+        # 1~5번만 요청할 때는 주제를 넣지 않아야 주제가 달라도 같은 분석 결과를 재사용할 수 있음
+        topic = input_data["content_info"]["topic"] if "planning" in parts else ""
+        topic_line = f"\n벤치마킹할 새로운 주제: {topic}" if topic else ""
+
+        lecture_context = ""
+        if lecture_passages:
+            lecture_context = "\n참고할 릴스 강의 내용 (항목 판단 기준):\n" + "\n".join(
+                f"- {compact_input(passage)}" for passage in lecture_passages
+            )
+
+        checked_context = ""
+        if checked_items and "planning" in parts:
+            checked_context = "\n릴스 분석에서 체크(✅)된 항목 (기획에 모두 반영):\n" + "\n".join(
+                f"- ✅ {compact_input(item)}" for item in checked_items
+            )
+
+        system = self.system.format(
+            transcript=compact_input(info["refined_transcript"]),
+            caption=compact_input(info["caption"]),
+            lecture_context=lecture_context,
+            checked_items=checked_context,
+            user_inputs=user_inputs,
+            topic_line=topic_line
+        )
+        user = self.user_template(parts)
+        if "planning" in parts and topic:
+            user = user.replace("{topic}", topic)
+        elif "planning" in parts:
+            user = user.replace(self.sections["planning"], f"{PLANNING_HEADER}\n{NO_TOPIC_MESSAGE}")
+        return [
+            {"role": "system", "content": _compact(system)},
+            {"role": "user", "content": user}
+        ]
+
+
+ANALYSIS_PROMPT = PromptTemplate(
+    version="6",
+    system=SYSTEM_TEMPLATE,
+    preamble=PREAMBLE,
+    sections={
+        "topic": TOPIC_SECTION,
+        "intro": INTRO_SECTION,
+        "content": CONTENT_SECTION,
+        "planning": PLANNING_SECTION
+    },
+    subset_note=SUBSET_NOTE,
+    all_parts=("topic", "intro", "content", "planning")
+)
+_CHUNK_TEMPLATE = _compact(CHUNK_TEMPLATE)
+
+
+def build_chunk_messages(chunk, index, total):
+    """
+    스크립트 구간 하나를 정리하는 요청 메시지 (index는 1부터)
+    """
+    return [{
+        "role": "user",
+        "content": _CHUNK_TEMPLATE.format(index=index, total=total, chunk=compact_input(chunk))
+    }]
+
+
+def lecture_query(info, input_data, parts):
+    """
+    강의 구간 검색어: 릴스 스크립트/캡션 + 요청한 항목의 기준 용어 (+ 기획이면 새 주제)
+    """
+    words = [info["refined_transcript"] or "", info["caption"] or ""]
+    words += [PART_QUERY_HINTS[part] for part in parts]
+    if "planning" in parts:
+        words.append(input_data["content_info"]["topic"] or "")
+    return " ".join(words)
+
+
+def output_budget(parts, info, input_tokens=0):
+    """
+    요청한 항목에 맞춘 max_tokens
+    기획(6번)은 원본 스크립트/캡션을 새 주제로 다시 쓰므로 원본 길이만큼 더 잡고,
+    모델의 출력 한도와 남은 컨텍스트를 넘지 않게 자릅니다.
+    """
+    budget = sum(PART_MAX_TOKENS[part] for part in parts)
+    if "planning" in parts:
+        budget += count_tokens(compact_input(info["refined_transcript"]))
+        budget += count_tokens(compact_input(info["caption"]))
+    return max(1, min(budget, MAX_OUTPUT_TOKENS, CONTEXT_WINDOW - input_tokens))
@@ -0,0 +1,58 @@
+"""
+OpenAI 분당 요청 수(RPM)/토큰 수(TPM) 한도를 넘지 않도록 호출 속도를 조절하는 토큰 버킷
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    분당 rate_per_minute 만큼 채워지는 버킷 (최대 capacity 까지 모아둘 수 있음)
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        """
+        amount 만큼 꺼낼 수 있을 때까지 기다렸다가 꺼냄
+        (버킷 크기보다 큰 요청은 버킷 크기만큼만 꺼내서 영원히 기다리지 않게 함)
+        """
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """
+    요청 수와 토큰 수 버킷을 함께 확인 (None인 한도는 제한하지 않음)
+    """
+
+    def __init__(self, rpm=None, tpm=None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    async def acquire(self, tokens):
+        """
+        요청 하나를 보낼 수 있을 때까지 기다림
+        tokens: 입력 토큰 수 + max_tokens (OpenAI는 이 값으로 TPM 한도를 계산)
+        """
+        if self.requests:
+            await self.requests.acquire(1)
+        if self.tokens:
+            await self.tokens.acquire(tokens)
+
@@ -0,0 +1,180 @@
+"""
+스크래퍼 결과(reels_info_*.csv)의 릴스 성과 분석
+
+조회수/좋아요/댓글/영상 길이로 성과 지표를 계산하고 벤치마킹할 만한 릴스를 고릅니다.
+모든 계산은 pandas/NumPy 열 단위 연산이라 수십만 행도 파이썬 반복문 없이 처리합니다.
+
+- engagement_rate: (좋아요 + 댓글) / 조회수
+- views_per_second: 조회수 / 영상 길이(초)
+- likes_per_comment: 좋아요 / 댓글 (댓글이 없으면 비어 있음)
+- owner_rank / music_rank: 같은 계정 / 같은 음악 안에서 조회수 백분위 (0~1)
+
+CSV를 한 번 읽으면 Parquet으로 저장해 두고, CSV 크기와 수정 시각이 같으면 다음부터는 Parquet을 읽습니다.
+
+    python reels_analytics.py ../reels_info_*.csv --top 20
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from api_config import ANALYTICS_CACHE_DIR
+
+# 분석에 쓰는 열과 자료형 (CSV에서 이 열만 읽고, 스크립트/캡션/영상 주소 같은 긴 텍스트 열은 읽지 않음)
+NUMERIC_COLUMNS = {
+    "view_count": "int64",
+    "likes": "int64",
+    "comments": "int64",
+    "video_duration": "float64"
+}
+TEXT_COLUMNS = ["shortcode", "date", "owner", "music_title", "music_artist"]
+_SNAPSHOT_TIME = re.compile(r"(\d{8}_\d{6})")
+
+# 벤치마킹 점수 가중치 (전체 조회수 순위, 참여율 순위, 계정 안에서의 조회수 순위)
+SCORE_WEIGHTS = {
+    "view_rank": 0.4,
+    "engagement_rank": 0.3,
+    "owner_rank": 0.3
+}
+
+
+def snapshot_time(path):
+    """
+    파일 이름의 수집 시각 (reels_info_20250130_144309.csv -> 2025-01-30 14:43:09), 없으면 NaT
+    """
+    match = _SNAPSHOT_TIME.search(os.path.basename(path))
+    if not match:
+        return pd.NaT
+    return pd.to_datetime(match.group(1), format="%Y%m%d_%H%M%S")
+
+
+def _parquet_path(csv_path):
+    # 같은 CSV(경로, 크기, 수정 시각)면 같은 캐시 파일
+    stat = os.stat(csv_path)
+    key = f"{os.path.abspath(csv_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return Path(ANALYTICS_CACHE_DIR) / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.parquet"
+
+
+def read_reels_csv(csv_path):
+    """
+    CSV 한 개를 열 자료형을 맞춘 DataFrame으로 읽음 (Parquet 캐시가 있으면 그걸 읽음)
+    """
+    cache_path = _parquet_path(csv_path)
+    if cache_path.exists():
+        return pd.read_parquet(cache_path)
+
+    frame = pd.read_csv(
+        csv_path,
+        encoding="utf-8-sig",
+        # 없는 열이 있어도 읽을 수 있도록 함수로 지정 (빠진 열은 _normalize가 채움)
+        usecols=lambda column: column in NUMERIC_COLUMNS or column in TEXT_COLUMNS,
+        dtype={column: "string" for column in TEXT_COLUMNS}
+    )
+    frame = _normalize(frame)
+    frame["captured_at"] = snapshot_time(csv_path)
+
+    os.makedirs(cache_path.parent, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, cache_path)
+    return frame
+
+
+def _normalize(frame):
+    for column, dtype in NUMERIC_COLUMNS.items():
+        values = pd.to_numeric(frame.get(column, pd.Series(index=frame.index, dtype="float64")), errors="coerce")
+        frame[column] = values.fillna(0).astype(dtype)
+    for column in TEXT_COLUMNS:
+        if column not in frame:
+            frame[column] = pd.Series(pd.NA, index=frame.index, dtype="string")
+        else:
+            frame[column] = frame[column].astype("string")
+    frame["date"] = pd.to_datetime(frame["date"], errors="coerce")
+    # 반복이 많은 값은 범주형으로 저장해 메모리와 groupby 시간을 줄임
+    frame["owner"] = frame["owner"].fillna("").astype("category")
+    frame["music"] = (
+        frame["music_title"].fillna("") + " - " + frame["music_artist"].fillna("")
+    ).str.strip(" -").replace("", "(음악 없음)").astype("category")
+    return frame
+
+
+def load_reels_exports(paths):
+    """
+    여러 CSV(또는 glob 패턴)를 하나의 DataFrame으로 합침
+    같은 릴스가 여러 스냅샷에 있으면 가장 최근에 수집한 행만 남깁니다.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = sorted({path for pattern in paths for path in (glob.glob(str(pattern)) or [str(pattern)])})
+    if not files:
+        raise FileNotFoundError("reels_info CSV 파일을 찾을 수 없습니다.")
+
+    frames = [read_reels_csv(path) for path in files]
+    frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    frame = frame.sort_values("captured_at", kind="stable").drop_duplicates("shortcode", keep="last")
+    for column in ("owner", "music"):
+        frame[column] = frame[column].astype("category")
+    return frame.reset_index(drop=True)
+
+
+def _ratio(numerator, denominator):
+    # 0으로 나누는 행은 NaN
+    denominator = denominator.astype("float64")
+    return numerator.astype("float64") / denominator.where(denominator > 0)
+
+
+def compute_metrics(frame):
+    """
+    성과 지표 열을 추가한 새 DataFrame
+    """
+    frame = frame.copy()
+    frame["engagement_rate"] = _ratio(frame["likes"] + frame["comments"], frame["view_count"])
+    frame["views_per_second"] = _ratio(frame["view_count"], frame["video_duration"])
+    frame["likes_per_comment"] = _ratio(frame["likes"], frame["comments"])
+
+    frame["view_rank"] = frame["view_count"].rank(pct=True)
+    frame["engagement_rank"] = frame["engagement_rate"].rank(pct=True)
+    frame["owner_rank"] = frame.groupby("owner", observed=True)["view_count"].rank(pct=True)
+    frame["music_rank"] = frame.groupby("music", observed=True)["view_count"].rank(pct=True)
+
+    score = np.zeros(len(frame))
+    for column, weight in SCORE_WEIGHTS.items():
+        score += weight * frame[column].fillna(0).to_numpy()
+    frame["benchmark_score"] = score
+    return frame
+
+
+def top_benchmark_reels(frame, n=20, min_views=10000):
+    """
+    벤치마킹할 만한 릴스 n개 (benchmark_score 순)
+    조회수가 min_views보다 적은 릴스는 뺍니다.
+    """
+    if "benchmark_score" not in frame:
+        frame = compute_metrics(frame)
+    candidates = frame[frame["view_count"] >= min_views]
+    return candidates.nlargest(n, "benchmark_score")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="reels_info CSV 성과 분석")
+    parser.add_argument("paths", nargs="+", help="reels_info_*.csv 파일 또는 glob 패턴")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--min-views", type=int, default=10000)
+    args = parser.parse_args()
+
+    frame = compute_metrics(load_reels_exports(args.paths))
+    top = top_benchmark_reels(frame, n=args.top, min_views=args.min_views)
+    columns = ["shortcode", "owner", "view_count", "engagement_rate", "views_per_second",
+               "likes_per_comment", "owner_rank", "music_rank", "benchmark_score"]
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(f"릴스 {len(frame)}개 중 상위 {len(top)}개")
+        print(top[columns].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
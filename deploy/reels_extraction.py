@@ -1,9 +1,42 @@
-import openai
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import partial
 from pathlib import Path
 import tempfile
-from api_config import get_api_config
-import streamlit as st
+from api_config import (
+    ANALYSIS_EXECUTION_MODE,
+    TRANSCRIPT_CHUNK_MODEL,
+    NEAR_DUPLICATE,
+    NEAR_DUPLICATE_THRESHOLD,
+)
+import metrics
+from openai_client import get_openai_client
+from analysis_cache import add_evict_listener, get_analysis_cache, make_cache_key
+from analysis_parser import ParsedAnalysis, parse_analysis
+from analysis_pipeline import (
+    ANALYSIS_MODEL,
+    NO_TOPIC_PLANNING,
+    PROMPT_VERSION,
+    REEL_PARTS,
+    CachedJob,
+    OrderedMerge,
+    build_analysis_request,
+    chunk_cache_key,
+    completion_delta,
+    completion_params,
+    new_single_flight,
+    planning_cache_key,
+    planning_checklist,
+    reel_cache_key,
+)
+from resilience import resilient_stream
+from prompts import build_chunk_messages
+from lecture_index import lecture_fingerprint
+from near_duplicate import get_near_duplicate_index, signature
+from transcript import needs_reduction, reduce_transcript, refine_transcript
 
 # 상대 경로로 변경 (스트림릿 클라우드 호환)
 BASE_DIR = Path(__file__).parent.parent
@@ -12,133 +45,352 @@ BASE_DIR = Path(__file__).parent.parent
 TEMP_DIR = Path(tempfile.gettempdir()) / "reels_benchmark"
 os.makedirs(TEMP_DIR, exist_ok=True)
 
-@st.cache_data(ttl=3600)
-def analyze_with_gpt4(info, input_data):
-        api_config = get_api_config()
-        client = openai.OpenAI(api_key=api_config["api_key"])
-        
-        messages = [
-            {
-                "role": "system",
-                "content": f"""
-                다음 릴스를 분석하고, 입력된 주제에 맞게 벤치마킹 기획을 해주세요:
-                
-                스크립트: {info['refined_transcript']}
-                캡션: {info['caption']}
-                
-                사용자 입력 정보:
-                - 초반 3초 카피라이팅: {input_data['video_analysis']['intro_copy']}
-                - 초반 3초 영상 구성: {input_data['video_analysis']['intro_structure']}
-                - 나레이션: {input_data['video_analysis']['narration']}
-                - 음악: {input_data['video_analysis']['music']}
-                - 폰트: {input_data['video_analysis']['font']}
-                
-                벤치마킹할 새로운 주제: {input_data['content_info']['topic']}
-                
-                위 릴스의 장점과 특징을 분석한 후, 새로운 주제에 맞게 벤치마킹하여 구체적인 스크립트, 캡션, 영상 기획을 제시해주세요.
-                """
-            },
-            {
-                "role": "user",
-                "content": """
-                당신은 릴스 분석 전문가입니다. 다음 형식으로 분석 결과를 제공해주세요. 
-                각 항목에 대해 ✅/❌를 표시하고, 그 판단의 근거가 되는 스크립트나 캡션의 구체적인 내용을 인용해주세요. 
-                여기서 모수란 이 내용이 얼마나 많은 사람들의 관심을 끌 수 있는지에 대한 것입니다.
-                문제 해결이란 시청자가 갖고 있는 문제를 해결해줄 수 있는지에 대한 것입니다:
-
-                # 1. 주제: 
-                - **설명: (이 영상의 주제에 대한 내용)**
-                - ✅/❌ **공유 및 저장**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **모수**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **문제해결**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **욕망충족**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **흥미유발**: 스크립트/캡션 중 해당 내용
-
-                # 2. 초반 3초
-                ## 카피라이팅 :
-                - **설명: (이 영상의 초반 3초 카피라이팅에 대한 내용)**
-                - ✅/❌ **구체적 수치**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **뇌 충격**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **이익, 손해 강조**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **권위 강조**: 스크립트/캡션 중 해당 내용
-
-                ## 영상 구성 : 
-                - **설명: (이 영상의 초반 3초 영상 구성에 대한 내용)**
-                - ✅/❌ **상식 파괴**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **결과 먼저**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **부정 강조**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **공감 유도**: 스크립트/캡션 중 해당 내용
-
-                # 3. 내용 구성: 
-                - **설명: (이 영상의 스크립트/캡션의 전체적인 내용 구성에 대한 내용)**
-                - ✅/❌ **문제해결**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **호기심 유발**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **행동 유도**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **스토리**: 스크립트/캡션 중 해당 내용
-                - ✅/❌ **제안**: 스크립트/캡션 중 해당 내용
-
-                # 4. 개선할 점:
-                - ❌ **(항목명)**: 개선할 점 설명 추가 ex. 스크립트/캡션 예시
-                
-                # 5. 적용할 점:
-                - ✅ **(항목명)**: 적용할 점 설명 추가 ex. 스크립트/캡션 중 해당 내용
-
-                # 6. 벤치마킹 적용 기획:
-                {f'''
-                - 입력하신 주제 "{input_data["content_info"]["topic"]}"에 대한 벤치마킹 적용 기획입니다.
-                - 위에서 체크(✅)된 항목들을 모두 반영하여 벤치마킹한 내용입니다.
-                
-                [시스템 참고용 - 출력하지 말 것]
-                - 스크립트: {info['refined_transcript']}
-                - 캡션: {info['caption']}
-                
-                위 스크립트와 캡션을 최대한 유사하게 벤치마킹하여 다음과 같이 작성했습니다:
-                
-                ## 🎙️ 1. 스크립트 예시:
-                [원본 스크립트의 문장 구조, 호흡, 강조점을 거의 그대로 활용하되 새로운 주제에 맞게 변경.
-                예를 들어 원본이 "이것 하나만 있으면 ~~" 구조라면, 새로운 주제도 동일한 구조 사용]
-
-                ## ✏️ 2. 캡션 예시:
-                [원본 캡션의 구조를 거의 그대로 활용.
-                예를 들어 원본이 "✨꿀팁 공개✨" 시작이라면, 새로운 캡션도 동일한 구조 사용.
-                이모지, 해시태그 스타일도 원본과 동일하게 구성]
-
-                ## 🎬 3. 영상 기획:
-                원본 영상의 구성을 최대한 유사하게 벤치마킹하되, 다음 요소들을 추가/보완했습니다:
-
-                1. **🎯 도입부** (3초):
-                   - 💥 **뇌 충격을 주는 구체적 수치 활용** (스크립트/캡션 예시 내용)
-                   - 🔄 **상식을 깨는 내용으로 시작** (스크립트/캡션 예시 내용)
-                   - ⭐ **결과를 먼저 보여주는 방식 적용** (스크립트/캡션 예시 내용)
-                   
-                2. **📝 전개**:
-                   - **문제 해결형 구조 적용:**
-                     * ❓ **명확한 문제 제시** (스크립트/캡션 예시 내용)
-                     * ✅ **구체적인 해결책 제시** (스크립트/캡션 예시 내용)
-                   - **시청 지속성 확보:**
-                     * 🎙️ **나레이션과 영상의 일치성 유지** (스크립트/캡션 예시 내용)
-                     * 🎵 **트렌디한 BGM 활용** (스크립트/캡션 예시 내용)
-                     * 📹 **고화질 영상 품질 유지** (스크립트/캡션 예시 내용)
-                   
-                3. **🔚 마무리**:
-                   - **행동 유도 요소 포함:**
-                     * 💾 **저장/공유 유도 멘트** (스크립트/캡션 예시 내용)
-                     * 👥 **팔로우 제안** (스크립트/캡션 예시 내용)
-                   - **캡션 최적화:**
-                     * 🎣 **첫 줄 후킹** (스크립트/캡션 예시 내용)
-                     * 📑 **단락 구분으로 가독성 확보** (스크립트/캡션 예시 내용)
-                     * 📊 **구체적 수치/권위 요소 포함** (스크립트/캡션 예시 내용)
-                ''' if input_data["content_info"]["topic"] else "주제가 입력되지 않았습니다. 구체적인 기획을 위해 주제를 입력해주세요."}
-                """
-            }
-        ]
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0,
-            max_tokens=10000
+# 동시에 들어온 같은 분석 요청은 GPT 호출 한 번으로 합침
+_inflight = new_single_flight()
+
+# 한 번에 기획할 수 있는 주제별 동시 요청 수
+MAX_TOPIC_WORKERS = 8
+
+
+def extract_reels_info(input_data):
+    """
+    입력 양식(video_analysis/content_info)에서 분석에 쓰는 릴스 정보 추출
+    """
+    return {
+        'refined_transcript': refine_transcript(input_data['video_analysis']['transcript']),
+        'caption': input_data['video_analysis']['caption']
+    }
+
+def reduce_long_transcript(info):
+    """
+    스크립트가 TRANSCRIPT_TOKEN_BUDGET을 넘으면 구간별 정리로 줄인 info (넘지 않으면 그대로)
+    구간 정리는 구간 내용의 해시로 캐시하므로 같은 스크립트는 다시 정리하지 않습니다.
+    """
+    if not needs_reduction(info['refined_transcript']):
+        return info
+    return {**info, 'refined_transcript': reduce_transcript(info['refined_transcript'], _summarize_chunk)}
+
+def _summarize_chunk(chunk, index, total, max_tokens):
+    key = chunk_cache_key(chunk, index, total, max_tokens)
+
+    def compute_once():
+        job = CachedJob("chunk", parse=False)
+        cache = get_analysis_cache()
+        cached = cache.get(key)
+        if job.lookup(cached):
+            return cached
+        with metrics.stage("prompt_build"):
+            messages = build_chunk_messages(chunk, index, total)
+        for delta in _stream_completion(messages, max_tokens, model=TRANSCRIPT_CHUNK_MODEL):
+            job.feed(delta)
+        text, _ = job.finish()
+        cache.set(key, text)
+        return text
+
+    return _inflight.do(key, compute_once)
+
+def analyze_with_gpt4(info, input_data, on_delta=None, mode=None):
+        """
+        릴스 분석 결과를 반환 (디스크 캐시에 있으면 API를 호출하지 않음)
+        on_delta를 넘기면 응답을 스트리밍으로 받으며 조각마다 on_delta(조각)을 호출합니다.
+
+        1~5번 분석은 릴스 입력만으로 캐시하고, 주제가 필요한 6번 기획만 주제별로 따로 요청합니다.
+        기획 요청은 1~5번 분석의 ✅ 항목을 반영하므로 1~5번 분석이 끝난 뒤에 보냅니다. (둘 다 캐시에
+        있으면 바로 반환) 같은 키로 이미 진행 중인 요청이 있으면 새로 호출하지 않고
+        그 결과를 기다립니다. (기다린 쪽에는 완성된 결과가 한 번에 전달됩니다.)
+
+        mode:
+        - "single": 1~5번 분석을 한 번의 요청으로 작성
+        - "fanout": 1~5번을 주제/초반 3초/내용 구성으로 나눠 동시에 요청
+        """
+        mode = mode or ANALYSIS_EXECUTION_MODE
+        analysis = _merge_ordered([
+            lambda emit: _reel_sections(info, input_data, mode, emit),
+            lambda emit: _planning(info, input_data, mode, emit)
+        ], on_delta)
+        remember_analysis(info, input_data, mode)
+        return analysis
+
+class AnalysisCancelled(Exception):
+    """
+    precompute_reel_analysis가 cancelled()로 중간에 멈춤 (캐시에는 저장하지 않음)
+    """
+
+def reel_analysis_cached(info, input_data, mode=None):
+    """
+    주제와 무관한 1~5번 릴스 분석이 이미 캐시에 있는지
+    """
+    return get_analysis_cache().has(reel_cache_key(info, input_data, mode or ANALYSIS_EXECUTION_MODE))
+
+def precompute_reel_analysis(info, input_data, cancelled, mode=None):
+    """
+    1~5번 릴스 분석만 미리 요청해 캐시에 넣음 (주제를 입력하는 동안 speculation.py가 호출)
+    조각을 받을 때마다 cancelled()를 확인해 True이면 요청을 끊고 AnalysisCancelled를 냅니다.
+    (fanout이면 동시에 받던 항목별 요청도 모두 끊음)
+    같은 분석을 기다리는 다른 요청(분석 버튼 등)이 있으면 _cached_job이 끊지 않고 끝까지 받습니다.
+    """
+    mode = mode or ANALYSIS_EXECUTION_MODE
+
+    def emit(delta):
+        # 기다리는 호출이 있는지는 _cached_job이 single-flight 잠금 안에서 확인 (cancel_if_unwaited)
+        if cancelled():
+            raise AnalysisCancelled()
+
+    return _reel_sections(info, input_data, mode, emit)
+
+def analyze_topics(info, input_data, topics, mode=None):
+    """
+    릴스 하나를 여러 주제로 벤치마킹 (주제별 기획을 동시에 요청)
+    1~5번 분석은 모든 주제가 공유하므로 한 번만 요청됩니다.
+    반환: [(주제, 분석 결과)] - 입력한 주제 순서
+    """
+    def run(topic):
+        topic_input = {**input_data, "content_info": {**input_data["content_info"], "topic": topic}}
+        return analyze_with_gpt4(info, topic_input, mode=mode)
+
+    with ThreadPoolExecutor(max_workers=min(len(topics), MAX_TOPIC_WORKERS) or 1) as pool:
+        return list(zip(topics, pool.map(metrics.bind(run), topics)))
+
+def analysis_structure(info, input_data, mode=None):
+    """
+    analyze_with_gpt4 결과의 구조화된 형태 (ParsedAnalysis)
+    분석할 때 캐시에 함께 저장해 둔 값을 합쳐서 만들고, 없을 때만 텍스트를 다시 읽습니다.
+    """
+    with metrics.stage("parse"):
+        return _analysis_structure(info, input_data, mode or ANALYSIS_EXECUTION_MODE)
+
+def _analysis_keys(info, input_data, mode):
+    # (릴스 분석 키, 기획 키) - 주제가 없으면 기획은 요청하지 않으므로 키도 없음
+    if input_data["content_info"]["topic"]:
+        return reel_cache_key(info, input_data, mode), planning_cache_key(info, input_data)
+    return reel_cache_key(info, input_data, mode), None
+
+def _analysis_structure(info, input_data, mode):
+    return _structure_from_cache(_analysis_keys(info, input_data, mode))
+
+def _structure_from_cache(keys):
+    reel_key, planning_key = keys
+    keys = [key for key in keys if key]
+    cache = get_analysis_cache()
+    sections = []
+    for key in keys:
+        structured = cache.get_structured(key)
+        if structured is not None:
+            sections += ParsedAnalysis.from_dict(structured).sections
+        else:
+            sections += parse_analysis(cache.get(key) or "").sections
+    if not planning_key:
+        sections += parse_analysis(NO_TOPIC_PLANNING).sections
+    return ParsedAnalysis(sections=sections)
+
+def _near_duplicate_text(input_data):
+    # 스크립트와 캡션을 중심으로 영상 분석 항목 전체를 서명 (주제는 scope로 정확히 비교)
+    video_analysis = input_data["video_analysis"]
+    return "\n".join(str(video_analysis.get(field) or "") for field in (
+        "transcript", "caption", "intro_copy", "intro_structure", "narration", "music", "font"
+    ))
+
+def _near_duplicate_scope(input_data, mode):
+    return make_cache_key(
+        section="near_duplicate",
+        topic=input_data["content_info"]["topic"],
+        model=ANALYSIS_MODEL,
+        prompt_version=PROMPT_VERSION,
+        lecture=lecture_fingerprint(),
+        mode=mode
+    )
+
+def _forget_evicted(keys):
+    # 분석 캐시에서 지운(용량 초과/만료/삭제) 분석은 유사 입력으로도 찾지 않음
+    get_near_duplicate_index().remove_keys(keys)
+
+if NEAR_DUPLICATE:
+    add_evict_listener(_forget_evicted)
+
+def remember_analysis(info, input_data, mode=None):
+    """
+    캐시에 저장된 분석의 입력 서명을 유사 입력 인덱스에 추가 (find_similar_analysis가 찾을 수 있도록)
+    """
+    if not NEAR_DUPLICATE:
+        return
+    mode = mode or ANALYSIS_EXECUTION_MODE
+    reel_key, planning_key = _analysis_keys(info, input_data, mode)
+    get_near_duplicate_index().add(
+        signature(_near_duplicate_text(input_data)), _near_duplicate_scope(input_data, mode), reel_key, planning_key
+    )
+
+def find_similar_analysis(info, input_data, mode=None, threshold=None):
+    """
+    입력이 조금만 다른(유사도 threshold 이상) 이전 분석을 캐시에서 찾음
+    정확히 같은 입력의 분석이 있으면 그 분석은 일반 캐시가 찾으므로 None을 반환합니다.
+    반환: {"similarity", "analysis", "structured"(ParsedAnalysis)} 또는 None
+    근사 결과이므로 그대로 보여주지 말고 근사임을 표시하고 새로 분석할 수 있게 해야 합니다.
+    """
+    if not NEAR_DUPLICATE:
+        return None
+    mode = mode or ANALYSIS_EXECUTION_MODE
+    threshold = NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    keys = _analysis_keys(info, input_data, mode)
+    with metrics.stage("near_duplicate"):
+        matches = get_near_duplicate_index().query(
+            signature(_near_duplicate_text(input_data)), _near_duplicate_scope(input_data, mode), threshold
         )
-        
-        return response.choices[0].message.content.strip()
+        cache = get_analysis_cache()
+        for score, reel_key, planning_key in matches:
+            if (reel_key, planning_key) == keys:
+                return None
+            # 다른 프로세스에서 만료/삭제된 분석은 서명도 지우고 건너뜀
+            texts = [cache.get(key) for key in (reel_key, planning_key) if key]
+            if any(text is None for text in texts):
+                get_near_duplicate_index().remove_keys(
+                    [key for key, text in zip((reel_key, planning_key), texts) if text is None]
+                )
+                continue
+            if not planning_key:
+                texts.append(NO_TOPIC_PLANNING)
+            metrics.record_cache("near_duplicate", "hit")
+            return {
+                "similarity": score,
+                "analysis": "\n\n".join(text.strip() for text in texts),
+                "structured": _structure_from_cache((reel_key, planning_key))
+            }
+    metrics.record_cache("near_duplicate", "miss")
+    return None
+
+def _reel_sections(info, input_data, mode, emit):
+    def compute(forward):
+        if mode == "fanout":
+            return _merge_ordered([
+                partial(_stream_parts, (part,), info, input_data)
+                for part in REEL_PARTS
+            ], forward)
+        return _stream_parts(REEL_PARTS, info, input_data, forward)
+
+    return _cached_job("reel", reel_cache_key(info, input_data, mode), compute, emit)
+
+def _planning(info, input_data, mode, emit):
+    if not input_data["content_info"]["topic"]:
+        # 주제가 없으면 기획 요청은 보내지 않고 안내 문구만 넣음
+        emit(NO_TOPIC_PLANNING)
+        return NO_TOPIC_PLANNING
+
+    def compute(forward):
+        # 기획 프롬프트는 1~5번의 ✅ 항목을 반영하므로, 동시에 진행 중인 릴스 분석을 기다려 받음
+        # (릴스 분석은 입력만으로 정해지므로 기획 캐시 키는 그대로)
+        reel_text = _reel_sections(info, input_data, mode, lambda delta: None)
+        structured = get_analysis_cache().get_structured(reel_cache_key(info, input_data, mode))
+        checked = planning_checklist(reel_text, structured)
+        return _stream_parts(("planning",), info, input_data, forward, checked)
+
+    return _cached_job("planning", planning_cache_key(info, input_data), compute, emit)
+
+def _cached_job(section, key, compute, emit):
+    """
+    캐시에 있으면 그대로 내보내고, 없으면 compute(emit)으로 만들어 캐시에 저장
+    같은 키를 동시에 계산하려는 호출은 한 번으로 합칩니다.
+    """
+    job = CachedJob(section)
+    detached = []
+
+    def compute_once():
+        job.begin()
+        # 잠금을 기다리는 동안 다른 워커가 채웠을 수 있으므로 캐시부터 확인
+        cache = get_analysis_cache()
+        cached = cache.get(key)
+        if job.lookup(cached):
+            return cached
+
+        def forward(delta):
+            job.feed(delta)
+            if detached:
+                return
+            try:
+                emit(delta)
+            except AnalysisCancelled:
+                # 같은 결과를 기다리는 호출이 있으면 그쪽을 위해 끝까지 받고, 이 호출에만 그만 내보냄
+                if _inflight.cancel_if_unwaited(key):
+                    raise
+                detached.append(True)
+
+        text, structured = job.finish(compute(forward))
+        cache.set(key, text, structured=structured)
+        return text
+
+    text = _inflight.do(key, compute_once)
+    job.joined()
+    if not job.streamed:
+        # 캐시 적중이거나 같은 요청을 먼저 시작한 호출의 결과를 기다림
+        emit(text)
+    return text
+
+def _stream_completion(messages, max_tokens, model=ANALYSIS_MODEL):
+    # 마감 시간/재시도/헤지는 resilient_stream이 처리하고, 여기서는 요청 한 번만 담당
+    def open_stream(timeout):
+        call = metrics.UpstreamCall(model)
+        try:
+            stream = get_openai_client().chat.completions.create(
+                **completion_params(messages, max_tokens, model, timeout)
+            )
+            # 헤지에서 진 요청은 close()로 연결을 바로 끊음
+            with stream:
+                for chunk in stream:
+                    delta = completion_delta(chunk, call)
+                    if delta:
+                        yield delta
+        except Exception as e:
+            call.fail(e)
+            raise
+        call.finish()
+
+    return resilient_stream(open_stream)
+
+def _stream_parts(parts, info, input_data, emit, checked_items=()):
+    # 지정한 항목만 요청하고, 받은 조각을 emit으로 넘긴 뒤 전체 텍스트를 반환
+    # 긴 스크립트는 이 단계(캐시 미스)에서만 줄이므로 캐시 키는 원래 스크립트 기준
+    info = reduce_long_transcript(info)
+    with metrics.stage("prompt_build"):
+        messages, max_tokens, _ = build_analysis_request(info, input_data, parts, checked_items)
+    chunks = []
+    # emit이 예외를 내면(취소) 스트림을 바로 닫아 연결을 끊음
+    with closing(_stream_completion(messages, max_tokens)) as stream:
+        for delta in stream:
+            chunks.append(delta)
+            emit(delta)
+    return "".join(chunks)
+
+def _merge_ordered(jobs, on_delta=None):
+    """
+    job(emit)들을 스레드 풀에서 동시에 실행하고 결과를 순서대로 이어 붙임 (OrderedMerge)
+
+    on_delta는 호출한 스레드에서만 불리므로 Streamlit 화면을 바로 갱신해도 됩니다.
+    한 job이 실패하거나 on_delta가 예외를 내면, 나머지 job은 다음 조각을 내보낼 때
+    AnalysisCancelled로 멈추고 (스트림도 닫힘) 끝나기를 기다리지 않고 예외를 다시 던집니다.
+    """
+    events = queue.Queue()
+    cancel = threading.Event()
+    merge = OrderedMerge(len(jobs), on_delta)
+
+    def run(index, job):
+        # 작업 스레드: 받은 조각을 (순번, 종류, 값) 형태로 events 큐에 넣음
+        def put(delta):
+            if cancel.is_set():
+                raise AnalysisCancelled()
+            events.put((index, "delta", delta))
+
+        try:
+            events.put((index, "done", job(put)))
+        except Exception as e:
+            events.put((index, "error", e))
+
+    pool = ThreadPoolExecutor(max_workers=len(jobs))
+    try:
+        for index, job in enumerate(jobs):
+            pool.submit(metrics.bind(run), index, job)
+        while not merge.done:
+            merge.handle(*events.get())
+    finally:
+        # 정상 종료면 모든 job이 이미 끝났고, 예외로 나가는 중이면 남은 job을 멈추고 기다리지 않음
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
 
+    return merge.text()
@@ -0,0 +1,336 @@
+"""
+OpenAI 스트리밍 호출의 지연/실패 대응 (마감 시간, 재시도, 헤지 요청)
+
+- 마감 시간(deadline): 요청 하나가 deadline 초를 넘기면 DeadlineExceeded로 끝냄
+- 재시도: 429/5xx/연결 오류는 지수 백오프 + 지터로 다시 시도하고, Retry-After 헤더가 있으면 따름
+- 헤지(hedging): 첫 토큰이 최근 첫 토큰 지연의 p95(설정값)보다 늦으면 같은 요청을 하나 더 보내
+  먼저 첫 토큰을 준 쪽을 쓰고 나머지는 닫음
+
+스트리밍 응답은 조각이 화면에 나가기 시작한 뒤에는 다시 보낼 수 없으므로,
+재시도와 헤지는 모두 첫 토큰을 받기 전까지만 적용됩니다.
+"""
+import asyncio
+import contextvars
+import email.utils
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import openai
+
+from api_config import (
+    OPENAI_DEADLINE,
+    OPENAI_MAX_ATTEMPTS,
+    OPENAI_BACKOFF_BASE,
+    OPENAI_BACKOFF_MAX,
+    OPENAI_HEDGE,
+    OPENAI_HEDGE_PERCENTILE,
+)
+
+# 헤지 기준 지연을 계산하기 전에 모아야 하는 최소 표본 수
+HEDGE_MIN_SAMPLES = 20
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self):
+        super().__init__("분석 요청이 마감 시간 안에 끝나지 않았습니다.")
+
+
+class LatencyTracker:
+    """
+    최근 첫 토큰 지연(TTFT) 표본으로 백분위 값을 계산 (스레드 안전)
+    """
+
+    def __init__(self, size=500):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p, min_samples=HEDGE_MIN_SAMPLES):
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class ResiliencePolicy:
+    def __init__(self, deadline=OPENAI_DEADLINE, max_attempts=OPENAI_MAX_ATTEMPTS,
+                 backoff_base=OPENAI_BACKOFF_BASE, backoff_max=OPENAI_BACKOFF_MAX,
+                 hedge=OPENAI_HEDGE, hedge_percentile=OPENAI_HEDGE_PERCENTILE, tracker=None):
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.tracker = tracker or LatencyTracker()
+
+    def hedge_delay(self):
+        """
+        헤지 요청을 보낼 대기 시간 (헤지를 끄거나 표본이 부족하면 None)
+        """
+        if not self.hedge:
+            return None
+        return self.tracker.percentile(self.hedge_percentile)
+
+    def backoff(self, attempt, error):
+        """
+        attempt번째 실패 후 기다릴 시간 (Retry-After가 있으면 그 값, 없으면 full jitter)
+        """
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+_default_policy = None
+
+
+def get_default_policy():
+    global _default_policy
+    if _default_policy is None:
+        _default_policy = ResiliencePolicy()
+    return _default_policy
+
+
+def resilient_stream(open_stream, policy=None):
+    """
+    open_stream(timeout)이 돌려주는 조각(delta) 이터레이터에 마감 시간/재시도/헤지를 적용한 생성기
+    """
+    policy = policy or get_default_policy()
+    started = time.monotonic()
+    deadline = started + policy.deadline
+
+    attempt = 0
+    while True:
+        try:
+            first, stream, latency = _race_first_token(open_stream, deadline, policy.hedge_delay())
+            break
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            attempt += 1
+            if not is_retryable(e) or attempt >= policy.max_attempts:
+                raise
+            delay = policy.backoff(attempt - 1, e)
+            if time.monotonic() + delay >= deadline:
+                raise DeadlineExceeded() from e
+            time.sleep(delay)
+
+    # 성공한 요청 하나의 첫 토큰 지연만 기록 (백오프 대기나 실패한 시도까지 넣으면 429가 몰릴 때 헤지 기준이 늘어남)
+    policy.tracker.record(latency)
+    try:
+        if first is not None:
+            yield first
+        for delta in stream:
+            if time.monotonic() > deadline:
+                raise DeadlineExceeded()
+            yield delta
+    finally:
+        _close(stream)
+
+
+def _race_first_token(open_stream, deadline, hedge_delay):
+    """
+    요청을 보내 첫 토큰을 기다림. hedge_delay가 지나도 첫 토큰이 없으면 같은 요청을 하나 더 보내고
+    먼저 첫 토큰을 준 쪽의 (첫 토큰, 나머지 스트림, 그 요청의 첫 토큰 지연)을 반환. 진 쪽은 끝나는 대로 닫음.
+    """
+    results = queue.Queue()
+
+    def attempt():
+        stream = None
+        started = time.monotonic()
+        try:
+            stream = iter(open_stream(timeout=max(0.1, deadline - time.monotonic())))
+            first = next(stream, None)
+            results.put((stream, first, None, time.monotonic() - started))
+        except Exception as e:
+            _close(stream)
+            results.put((None, None, e, None))
+
+    def wait_next(timeout):
+        try:
+            return results.get(timeout=max(0.0, timeout))
+        except queue.Empty:
+            return None
+
+    _start_attempt(attempt)
+    launched, received = 1, 0
+    item = None
+    if hedge_delay is not None:
+        item = wait_next(min(hedge_delay, deadline - time.monotonic()))
+        if item is None and time.monotonic() < deadline:
+            _start_attempt(attempt)
+            launched = 2
+
+    while True:
+        if item is None:
+            item = wait_next(deadline - time.monotonic())
+            if item is None:
+                _close_losers(results, launched - received)
+                raise DeadlineExceeded()
+        received += 1
+        stream, first, error, latency = item
+        if error is None or received == launched:
+            break
+        # 헤지 중 한쪽이 실패하면 다른 쪽 결과를 기다림
+        item = None
+
+    _close_losers(results, launched - received)
+    if error is not None:
+        raise error
+    return first, stream, latency
+
+
+def _start_attempt(attempt):
+    # 요청 스레드에서도 호출한 쪽의 분석 추적(metrics)이 이어지도록 컨텍스트를 복사해서 실행
+    threading.Thread(target=contextvars.copy_context().run, args=(attempt,), daemon=True).start()
+
+
+def _close_losers(results, pending):
+    # 아직 끝나지 않은 시도는 백그라운드에서 기다렸다가 연결을 닫음
+    if pending <= 0:
+        return
+
+    def drain():
+        for _ in range(pending):
+            stream, _, _, _ = results.get()
+            _close(stream)
+
+    threading.Thread(target=drain, daemon=True).start()
+
+
+def _close(stream):
+    close = getattr(stream, "close", None)
+    if close:
+        close()
+
+
+async def async_resilient_stream(open_stream, policy=None):
+    """
+    resilient_stream의 asyncio 버전 (open_stream(timeout)은 조각을 내보내는 비동기 이터레이터)
+    """
+    policy = policy or get_default_policy()
+    started = time.monotonic()
+    deadline = started + policy.deadline
+
+    attempt = 0
+    while True:
+        try:
+            first, stream, latency = await _async_race_first_token(open_stream, deadline, policy.hedge_delay())
+            break
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            attempt += 1
+            if not is_retryable(e) or attempt >= policy.max_attempts:
+                raise
+            delay = policy.backoff(attempt - 1, e)
+            if time.monotonic() + delay >= deadline:
+                raise DeadlineExceeded() from e
+            await asyncio.sleep(delay)
+
+    # 성공한 요청 하나의 첫 토큰 지연만 기록 (백오프 대기나 실패한 시도까지 넣으면 429가 몰릴 때 헤지 기준이 늘어남)
+    policy.tracker.record(latency)
+    try:
+        if first is not None:
+            yield first
+        while True:
+            try:
+                delta = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline - time.monotonic()))
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded()
+            yield delta
+    finally:
+        await _aclose(stream)
+
+
+async def _async_race_first_token(open_stream, deadline, hedge_delay):
+    # 먼저 첫 토큰을 준 쪽의 (첫 토큰, 나머지 스트림, 그 요청의 첫 토큰 지연)을 반환
+    async def attempt():
+        started = time.monotonic()
+        stream = open_stream(timeout=max(0.1, deadline - time.monotonic())).__aiter__()
+        try:
+            return await stream.__anext__(), stream, time.monotonic() - started
+        except StopAsyncIteration:
+            return None, stream, time.monotonic() - started
+        except BaseException:
+            await _aclose(stream)
+            raise
+
+    tasks = {asyncio.create_task(attempt())}
+    if hedge_delay is not None:
+        done, _ = await asyncio.wait(tasks, timeout=max(0.0, min(hedge_delay, deadline - time.monotonic())))
+        if not done and time.monotonic() < deadline:
+            tasks.add(asyncio.create_task(attempt()))
+
+    error = None
+    while tasks:
+        done, tasks = await asyncio.wait(
+            tasks, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+        )
+        if not done:
+            # 마감 시간 초과
+            _cancel_losers(tasks)
+            raise DeadlineExceeded()
+        winners = [task for task in done if task.exception() is None]
+        if winners:
+            _cancel_losers(tasks | set(winners[1:]))
+            return winners[0].result()
+        error = next(iter(done)).exception()
+
+    raise error
+
+
+def _cancel_losers(tasks):
+    for task in tasks:
+        task.add_done_callback(_aclose_task_result)
+        task.cancel()
+
+
+def _aclose_task_result(task):
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(_aclose(task.result()[1]))
+
+
+async def _aclose(stream):
+    aclose = getattr(stream, "aclose", None)
+    if aclose:
+        await aclose()
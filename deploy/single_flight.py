@@ -0,0 +1,221 @@
+"""
+같은 키로 동시에 들어온 요청을 한 번의 실행으로 합치는 도구 (single-flight)
+
+인기 릴스를 여러 명이 거의 동시에 분석하면 캐시가 채워지기 전이라 모두 미스가 나고
+각자 GPT를 호출하게 됩니다. 키가 같은 요청은 먼저 온 한 요청만 실행하고,
+나머지는 그 결과를 기다렸다가 함께 받습니다.
+"""
+import asyncio
+import fcntl
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+
+
+# 비동기 파일 잠금을 다시 시도하는 간격(초) - 잠금을 기다리는 동안 이벤트 루프와 스레드를 막지 않음
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _acquire_file(path, blocking=True):
+    """
+    path에 배타적 flock을 잡고 파일 디스크립터를 반환 (blocking=False이면 바로 잡지 못할 때 None)
+
+    잠금을 기다리는 동안 앞선 프로세스가 파일을 지웠으면 지워진 파일의 잠금은 아무도 막지 못하므로,
+    잠금을 얻은 파일이 아직 path에 있는 그 파일인지 확인하고 아니면 새 파일로 다시 잡습니다.
+    """
+    flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, flags)
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        except FileNotFoundError:
+            pass
+        except BaseException:
+            os.close(fd)
+            raise
+        os.close(fd)
+
+
+def _release_file(path, fd):
+    # 잠금을 쥔 채로 지워야 다음 프로세스가 지워진 파일을 잡았는지 알 수 있음
+    try:
+        os.unlink(path)
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+@contextmanager
+def locked_file(path):
+    """
+    path에 배타적 flock을 잡고, 끝나면 파일을 지운 뒤 잠금을 풂 (키가 많아도 잠금 파일이 쌓이지 않음)
+    """
+    fd = _acquire_file(path)
+    try:
+        yield
+    finally:
+        _release_file(path, fd)
+
+
+def _lock_path(lock_dir, key):
+    name = hashlib.sha256(str(key).encode("utf-8")).hexdigest()
+    return lock_dir / f"{name}.lock"
+
+
+class SingleFlight:
+    """
+    한 프로세스 안의 스레드끼리 같은 키의 실행을 합침
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._waiters = {}
+
+    def do(self, key, fn):
+        """
+        key로 진행 중인 실행이 있으면 그 결과를 기다리고, 없으면 fn()을 실행해 결과를 공유
+        fn에서 난 예외도 기다리던 모든 호출자에게 그대로 전달됩니다.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self._waiters[key] = self._waiters.get(key, 0) + 1
+
+        if not leader:
+            try:
+                return future.result()
+            finally:
+                with self._lock:
+                    self._waiters[key] -= 1
+                    if not self._waiters[key]:
+                        del self._waiters[key]
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                # cancel_if_unwaited로 이미 빠졌으면 그 뒤에 시작한 다른 실행일 수 있음
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def cancel_if_unwaited(self, key):
+        """
+        key의 결과를 기다리는 호출이 없으면 True를 반환하고, 이후 같은 키의 호출은 새로 실행하게 함
+        (기다리는 호출 확인과 등록 해제를 한 번에 해서, 그 사이에 들어온 호출이 취소된 실행을 기다리지 않음)
+        기다리는 호출이 있으면 False를 반환하고 실행을 계속해야 합니다.
+        """
+        with self._lock:
+            if self._waiters.get(key):
+                return False
+            self._calls.pop(key, None)
+            return True
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    한 이벤트 루프 안의 코루틴끼리 같은 키의 실행을 합침 (API 서버용)
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """
+        key로 진행 중인 실행이 있으면 그 결과를 기다리고, 없으면 await fn()을 실행해 결과를 공유
+        기다리던 쪽이 취소되어도 먼저 시작한 실행은 취소되지 않습니다.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    def in_flight(self):
+        return len(self._calls)
+
+
+class FileLockSingleFlight:
+    """
+    여러 프로세스(워커)끼리 같은 키의 실행을 합침
+
+    키마다 잠금 파일에 flock을 걸어 한 번에 한 프로세스만 fn()을 실행합니다.
+    잠금을 기다린 프로세스는 앞선 프로세스가 결과를 캐시에 넣은 뒤 fn()을 실행하게 되므로,
+    fn()은 실행 전에 캐시를 다시 확인해야 합니다. 같은 프로세스의 스레드끼리는
+    SingleFlight로 먼저 합쳐서 잠금 파일을 한 번만 잡습니다.
+    잠금 파일은 실행이 끝나면 지우므로 키가 많아도 쌓이지 않습니다.
+    """
+
+    def __init__(self, lock_dir):
+        self.lock_dir = Path(lock_dir)
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._local = SingleFlight()
+
+    def do(self, key, fn):
+        return self._local.do(key, lambda: self._do_locked(key, fn))
+
+    def _do_locked(self, key, fn):
+        with locked_file(_lock_path(self.lock_dir, key)):
+            return fn()
+
+    def in_flight(self):
+        return self._local.in_flight()
+
+    def cancel_if_unwaited(self, key):
+        # 다른 프로세스는 잠금이 풀리면 캐시를 확인하고 직접 실행하므로 이 프로세스의 대기만 확인
+        return self._local.cancel_if_unwaited(key)
+
+
+class AsyncFileLockSingleFlight:
+    """
+    FileLockSingleFlight의 asyncio 버전 (API 서버를 여러 워커로 띄울 때)
+
+    잠금 파일과 키가 동기 버전과 같으므로 Streamlit 앱 워커와 API 서버 워커끼리도 합쳐집니다.
+    잠금은 LOCK_POLL_INTERVAL마다 기다리지 않고 다시 시도해서, 기다리는 동안 이벤트 루프와
+    스레드 풀을 막지 않습니다. fn()은 실행 전에 캐시를 다시 확인해야 합니다.
+    """
+
+    def __init__(self, lock_dir):
+        self.lock_dir = Path(lock_dir)
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._local = AsyncSingleFlight()
+
+    async def do(self, key, fn):
+        return await self._local.do(key, lambda: self._do_locked(key, fn))
+
+    async def _do_locked(self, key, fn):
+        path = _lock_path(self.lock_dir, key)
+        fd = _acquire_file(path, blocking=False)
+        while fd is None:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            fd = _acquire_file(path, blocking=False)
+        try:
+            return await fn()
+        finally:
+            _release_file(path, fd)
+
+    def in_flight(self):
+        return self._local.in_flight()
@@ -0,0 +1,332 @@
+"""
+수집 시각별 reels_info 스냅샷을 모아두는 시계열 저장소 (SQLite)
+
+스크래퍼는 실행할 때마다 reels_info_<날짜_시각>.csv 전체를 새로 씁니다.
+이 파일들을 (shortcode, captured_at) 단위로 한 저장소에 합쳐 두면,
+릴스 하나의 조회수/좋아요 변화(성장 곡선)를 모든 CSV를 다시 읽지 않고 인덱스 조회 한 번으로 얻을 수 있습니다.
+
+- 이미 넣은 파일(경로, 크기, 수정 시각이 같음)은 다시 읽지 않음
+- 행마다 해시를 저장해 직전 스냅샷과 내용이 같은 행은 새로 저장하지 않음
+  (영상 주소는 수집할 때마다 서명이 바뀌는 CDN 주소라 해시에 넣지 않고, 가장 최근 값으로만 갱신)
+- 기본 키 (shortcode, captured_at)가 shortcode 인덱스 역할을 함
+
+    python snapshot_store.py ingest ../reels_info_*.csv
+    python snapshot_store.py growth C_5jgbugE2_
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from api_config import SNAPSHOT_DB_PATH
+from reels_analytics import snapshot_time
+
+csv.field_size_limit(sys.maxsize)
+
+# 변화를 추적하는 수치 열
+METRIC_COLUMNS = ("view_count", "likes", "comments", "video_duration")
+# 릴스별 최신 정보로 보관하는 열 (바뀌면 새 스냅샷으로 저장)
+INFO_COLUMNS = ("date", "owner", "caption", "transcript", "music_title", "music_artist")
+# 한 트랜잭션에 넣는 행 수
+BATCH_SIZE = 5000
+
+
+def _number(value, cast):
+    try:
+        return cast(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def row_hash(row):
+    """
+    행 내용의 해시 (열 순서와 관계없이 같은 내용이면 같은 값)
+    video_url은 서명(oe=, _nc_*)이 수집할 때마다 바뀌므로 넣지 않습니다. (media_cache.py 참고)
+    """
+    payload = "\x1f".join(f"{column}={(row.get(column) or '').strip()}"
+                          for column in METRIC_COLUMNS + INFO_COLUMNS)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SnapshotStore:
+    def __init__(self, path=SNAPSHOT_DB_PATH):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    shortcode TEXT NOT NULL,
+                    captured_at TEXT NOT NULL,
+                    view_count INTEGER,
+                    likes INTEGER,
+                    comments INTEGER,
+                    video_duration REAL,
+                    row_hash TEXT NOT NULL,
+                    PRIMARY KEY (shortcode, captured_at)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS reels (
+                    shortcode TEXT PRIMARY KEY,
+                    date TEXT,
+                    owner TEXT,
+                    caption TEXT,
+                    transcript TEXT,
+                    music_title TEXT,
+                    music_artist TEXT,
+                    video_url TEXT,
+                    last_hash TEXT NOT NULL,
+                    last_captured_at TEXT NOT NULL,
+                    url_captured_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_reels_owner ON reels (owner);
+                CREATE TABLE IF NOT EXISTS ingested_files (
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    captured_at TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    inserted INTEGER NOT NULL,
+                    ingested_at REAL NOT NULL,
+                    PRIMARY KEY (path, size, mtime_ns)
+                );
+            """)
+            # 이전 버전에서 만든 파일에 영상 주소 수집 시각 열 추가
+            if "url_captured_at" not in {row[1] for row in conn.execute("PRAGMA table_info(reels)")}:
+                conn.execute("ALTER TABLE reels ADD COLUMN url_captured_at TEXT")
+        finally:
+            conn.close()
+        self._local = threading.local()
+
+    def _conn(self):
+        # 스레드마다 연결 하나를 재사용
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def ingest_csv(self, csv_path, captured_at=None):
+        """
+        스냅샷 CSV 하나를 저장소에 합침
+        captured_at을 주지 않으면 파일 이름의 시각(없으면 파일 수정 시각)을 씀
+        반환: {"rows": 읽은 행, "inserted": 새로 저장한 행, "unchanged": 바뀌지 않아 건너뛴 행, "skipped_file": bool}
+        """
+        stat = os.stat(csv_path)
+        path = os.path.abspath(csv_path)
+        conn = self._conn()
+        if conn.execute(
+            "SELECT 1 FROM ingested_files WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns)
+        ).fetchone():
+            return {"rows": 0, "inserted": 0, "unchanged": 0, "skipped_file": True}
+
+        if captured_at is None:
+            captured = snapshot_time(csv_path)
+            captured_at = datetime.fromtimestamp(stat.st_mtime) if pd.isna(captured) else captured.to_pydatetime()
+        captured_at = captured_at.isoformat(sep=" ", timespec="seconds")
+
+        # 릴스별 마지막 스냅샷 해시를 한 번에 읽어 두고 메모리에서 비교
+        latest = {
+            shortcode: (last_hash, last_captured_at)
+            for shortcode, last_hash, last_captured_at in conn.execute(
+                "SELECT shortcode, last_hash, last_captured_at FROM reels"
+            )
+        }
+        counts = {"rows": 0, "inserted": 0, "unchanged": 0, "skipped_file": False}
+        snapshots, reels, urls = [], [], []
+
+        def flush():
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO snapshots "
+                    "(shortcode, captured_at, view_count, likes, comments, video_duration, row_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    snapshots
+                )
+                conn.executemany(
+                    "INSERT INTO reels (shortcode, date, owner, caption, transcript, music_title, "
+                    "music_artist, last_hash, last_captured_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (shortcode) DO UPDATE SET "
+                    "date = excluded.date, owner = excluded.owner, caption = excluded.caption, "
+                    "transcript = excluded.transcript, music_title = excluded.music_title, "
+                    "music_artist = excluded.music_artist, "
+                    "last_hash = excluded.last_hash, last_captured_at = excluded.last_captured_at "
+                    "WHERE excluded.last_captured_at >= reels.last_captured_at",
+                    reels
+                )
+                # 영상 주소는 내용이 바뀌지 않은 행도 가장 최근에 수집한 값으로 갱신
+                conn.executemany(
+                    "UPDATE reels SET video_url = ?, url_captured_at = ? "
+                    "WHERE shortcode = ? AND (url_captured_at IS NULL OR url_captured_at <= ?)",
+                    urls
+                )
+            snapshots.clear()
+            reels.clear()
+            urls.clear()
+
+        with open(csv_path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                shortcode = (row.get("shortcode") or "").strip()
+                if not shortcode:
+                    continue
+                counts["rows"] += 1
+                urls.append((row.get("video_url"), captured_at, shortcode, captured_at))
+                digest = row_hash(row)
+                if digest == self._previous_hash(conn, latest, shortcode, captured_at):
+                    counts["unchanged"] += 1
+                else:
+                    counts["inserted"] += 1
+                    snapshots.append((
+                        shortcode, captured_at,
+                        _number(row.get("view_count"), int),
+                        _number(row.get("likes"), int),
+                        _number(row.get("comments"), int),
+                        _number(row.get("video_duration"), float),
+                        digest
+                    ))
+                    reels.append((shortcode, *(row.get(column) for column in INFO_COLUMNS), digest, captured_at))
+                    if shortcode not in latest or captured_at >= latest[shortcode][1]:
+                        latest[shortcode] = (digest, captured_at)
+                if len(urls) >= BATCH_SIZE:
+                    flush()
+        flush()
+
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ingested_files "
+                "(path, size, mtime_ns, captured_at, rows, inserted, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, captured_at, counts["rows"], counts["inserted"], time.time())
+            )
+        return counts
+
+    def _previous_hash(self, conn, latest, shortcode, captured_at):
+        # 보통은 시간 순서대로 넣으므로 마지막 스냅샷과 비교하고,
+        # 예전 스냅샷을 나중에 넣는 경우에만 그 시각 직전 스냅샷을 인덱스로 찾음
+        last = latest.get(shortcode)
+        if last is None:
+            return None
+        if captured_at > last[1]:
+            return last[0]
+        row = conn.execute(
+            "SELECT row_hash FROM snapshots WHERE shortcode = ? AND captured_at < ? "
+            "ORDER BY captured_at DESC LIMIT 1",
+            (shortcode, captured_at)
+        ).fetchone()
+        return row[0] if row else None
+
+    def ingest(self, paths):
+        """
+        여러 CSV(또는 glob 패턴)를 수집 시각 순서대로 합침
+        """
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        files = sorted({path for pattern in paths for path in (glob.glob(str(pattern)) or [str(pattern)])},
+                       key=lambda path: (str(snapshot_time(path)), path))
+        totals = {"files": 0, "rows": 0, "inserted": 0, "unchanged": 0, "skipped_files": 0}
+        for path in files:
+            counts = self.ingest_csv(path)
+            totals["files"] += 1
+            totals["skipped_files"] += counts["skipped_file"]
+            for key in ("rows", "inserted", "unchanged"):
+                totals[key] += counts[key]
+        return totals
+
+    def growth(self, shortcode):
+        """
+        릴스 하나의 성장 곡선: 스냅샷마다 수치와 직전 스냅샷 대비 시간당 증가량
+        반환: [{"captured_at", "view_count", "likes", "comments", "hours", "views_per_hour", "likes_per_hour"}]
+        """
+        rows = self._conn().execute("""
+            SELECT captured_at, view_count, likes, comments,
+                   ROUND((julianday(captured_at) - julianday(LAG(captured_at) OVER w)) * 86400) / 3600.0 AS hours,
+                   view_count - LAG(view_count) OVER w AS views_delta,
+                   likes - LAG(likes) OVER w AS likes_delta
+            FROM snapshots
+            WHERE shortcode = ?
+            WINDOW w AS (ORDER BY captured_at)
+            ORDER BY captured_at
+        """, (shortcode,)).fetchall()
+        curve = []
+        for captured_at, views, likes, comments, hours, views_delta, likes_delta in rows:
+            curve.append({
+                "captured_at": captured_at,
+                "view_count": views,
+                "likes": likes,
+                "comments": comments,
+                "hours": hours,
+                "views_per_hour": views_delta / hours if hours else None,
+                "likes_per_hour": likes_delta / hours if hours else None
+            })
+        return curve
+
+    def reel(self, shortcode):
+        """
+        릴스의 최신 정보 (없으면 None)
+        """
+        cursor = self._conn().execute("SELECT * FROM reels WHERE shortcode = ?", (shortcode,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            "files": conn.execute("SELECT COUNT(*) FROM ingested_files").fetchone()[0],
+            "reels": conn.execute("SELECT COUNT(*) FROM reels").fetchone()[0],
+            "snapshots": conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """
+    프로세스 전체에서 공유하는 스냅샷 저장소
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SnapshotStore(SNAPSHOT_DB_PATH)
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="reels_info 스냅샷 시계열 저장소")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="스냅샷 CSV 합치기")
+    ingest.add_argument("paths", nargs="+")
+    growth = sub.add_parser("growth", help="릴스 성장 곡선 보기")
+    growth.add_argument("shortcode")
+    args = parser.parse_args()
+
+    store = get_snapshot_store()
+    if args.command == "ingest":
+        started = time.perf_counter()
+        totals = store.ingest(args.paths)
+        print(f"파일 {totals['files']}개 (건너뜀 {totals['skipped_files']}개), 행 {totals['rows']}개: "
+              f"새로 저장 {totals['inserted']}개, 변화 없음 {totals['unchanged']}개 "
+              f"({time.perf_counter() - started:.2f}초)")
+        return
+
+    for point in store.growth(args.shortcode):
+        per_hour = f"{point['views_per_hour']:+,.0f}/h" if point["views_per_hour"] is not None else "-"
+        print(f"{point['captured_at']}  조회수 {point['view_count']:,}  ({per_hour})  좋아요 {point['likes']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+주제를 입력하는 동안 릴스 분석(1~5번)을 미리 해 두기
+
+1~5번 분석은 릴스 입력(캡션, 나레이션, 초반 3초, 스타일)만으로 정해지고, 사용자는 보통 릴스 입력을 먼저
+채운 뒤 "제작할 콘텐츠 주제"를 한참 작성합니다. 릴스 입력이 SPECULATION_DELAY초 동안 바뀌지 않으면
+그 사이에 1~5번 분석을 백그라운드에서 요청해 캐시에 넣어 두므로, 분석 버튼을 누르면 6번 기획만 남습니다.
+분석 버튼을 누를 때 미리 하던 분석이 아직 진행 중이면 새로 요청하지 않고 그 결과를 기다립니다.
+누르지 않을 수도 있는 분석에 비용을 쓰므로 기본은 꺼져 있고, SPECULATIVE_ANALYSIS=1로 켭니다.
+
+- 릴스 입력이 다시 바뀌면 예약/진행 중인 미리 분석을 취소 (받던 응답을 끊고 캐시에 넣지 않음)
+- 비용 한도: 세션당 SPECULATION_MAX_PER_SESSION번, 프로세스 전체에서 한 시간에 SPECULATION_MAX_PER_HOUR번
+  (이미 캐시에 있는 분석은 요청하지 않으므로 세지 않음)
+- 결과는 reels_speculations_total 지표와 "speculation" 경로의 분석 지표로 기록
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from api_config import (
+    SPECULATION_DELAY,
+    SPECULATION_MAX_PER_HOUR,
+    SPECULATION_MAX_PER_SESSION,
+)
+
+# 동시에 미리 분석하는 수 (분석 버튼을 누른 요청이 먼저 OpenAI 호출 한도를 쓰도록 작게)
+SPECULATION_WORKERS = 2
+# 이 시간(초) 동안 입력이 없던 세션의 상태는 지움
+SESSION_TTL = 3600
+# 미리 분석할 만큼 입력이 채워졌는지 판단하는 최소 글자 수 (캡션 + 나레이션)
+MIN_INPUT_CHARS = 10
+
+
+class Speculator:
+    def __init__(self, delay=SPECULATION_DELAY, max_per_session=SPECULATION_MAX_PER_SESSION,
+                 max_per_hour=SPECULATION_MAX_PER_HOUR, workers=SPECULATION_WORKERS):
+        self.delay = delay
+        self.max_per_session = max_per_session
+        self.max_per_hour = max_per_hour
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speculation")
+        self._lock = threading.Lock()
+        # 세션별 {"fields", "status", "cancel", "timer", "runs", "seen"}
+        self._sessions = {}
+        # 최근 한 시간 동안 미리 분석을 시작한 시각
+        self._started = deque()
+
+    def schedule(self, session, video_analysis):
+        """
+        릴스 입력이 지난번과 다르면 이전 미리 분석을 취소하고 delay초 뒤로 새로 예약
+        (입력이 계속 바뀌는 동안은 시작하지 않음) 반환: 세션의 현재 상태
+        """
+        fields = tuple(sorted((name, str(value or "").strip()) for name, value in video_analysis.items()))
+        now = time.time()
+        with self._lock:
+            self._forget_idle(now)
+            state = self._sessions.setdefault(session, {"fields": None, "status": "idle", "runs": 0})
+            state["seen"] = now
+            if state["fields"] == fields:
+                return state["status"]
+            self._cancel(state)
+            state["fields"] = fields
+            filled = len(video_analysis.get("caption") or "") + len(video_analysis.get("transcript") or "")
+            if filled < MIN_INPUT_CHARS:
+                state["status"] = "idle"
+                return state["status"]
+            cancel = threading.Event()
+            timer = threading.Timer(self.delay, self._submit, (session, dict(video_analysis), cancel))
+            timer.daemon = True
+            state.update(status="waiting", cancel=cancel, timer=timer)
+            timer.start()
+            return state["status"]
+
+    def status(self, session):
+        """
+        idle(입력 부족), waiting(입력이 멈추길 기다리는 중), running, done, cached(이미 분석함),
+        cancelled, over_budget, failed 중 하나
+        """
+        with self._lock:
+            state = self._sessions.get(session)
+            return state["status"] if state else "idle"
+
+    def cancel(self, session):
+        with self._lock:
+            state = self._sessions.get(session)
+            if state:
+                self._cancel(state)
+                state["fields"] = None
+                state["status"] = "idle"
+
+    def _cancel(self, state):
+        # 잠금을 잡은 상태에서 호출
+        if state.get("timer"):
+            state["timer"].cancel()
+        if state.get("cancel"):
+            state["cancel"].set()
+        state["timer"] = state["cancel"] = None
+
+    def _forget_idle(self, now):
+        for session in [s for s, state in self._sessions.items() if now - state["seen"] > SESSION_TTL]:
+            self._cancel(self._sessions.pop(session))
+
+    def _set_status(self, session, cancel, status):
+        # 취소되어 새 예약으로 바뀐 세션의 상태는 건드리지 않음
+        with self._lock:
+            state = self._sessions.get(session)
+            if state and state.get("cancel") is cancel:
+                state["status"] = status
+
+    def _reserve(self, session):
+        """
+        비용 한도 안이면 미리 분석 한 번을 세고 True
+        """
+        now = time.time()
+        with self._lock:
+            while self._started and now - self._started[0] > 3600:
+                self._started.popleft()
+            state = self._sessions.get(session)
+            if state is None or state["runs"] >= self.max_per_session or len(self._started) >= self.max_per_hour:
+                return False
+            state["runs"] += 1
+            self._started.append(now)
+            return True
+
+    def _submit(self, session, video_analysis, cancel):
+        if not cancel.is_set():
+            self._pool.submit(self._run, session, video_analysis, cancel)
+
+    def _run(self, session, video_analysis, cancel):
+        # openai/tiktoken을 불러오는 데 오래 걸리므로 처음 미리 분석할 때 불러옴
+        from reels_extraction import (
+            AnalysisCancelled,
+            extract_reels_info,
+            precompute_reel_analysis,
+            reel_analysis_cached,
+        )
+
+        if cancel.is_set():
+            return
+        input_data = {"video_analysis": video_analysis, "content_info": {"topic": ""}}
+        info = extract_reels_info(input_data)
+        if reel_analysis_cached(info, input_data):
+            outcome = "cached"
+        elif not self._reserve(session):
+            outcome = "over_budget"
+        else:
+            self._set_status(session, cancel, "running")
+            try:
+                with metrics.trace_analysis("speculation"):
+                    precompute_reel_analysis(info, input_data, cancel.is_set)
+                outcome = "done"
+            except AnalysisCancelled:
+                outcome = "cancelled"
+            except Exception:
+                # 미리 분석이 실패해도 분석 버튼을 누르면 다시 요청하므로 기록만 함
+                outcome = "failed"
+        metrics.SPECULATIONS.inc(outcome=outcome)
+        self._set_status(session, cancel, outcome)
+
+
+_speculator = None
+_speculator_lock = threading.Lock()
+
+
+def get_speculator():
+    """
+    프로세스 전체에서 공유하는 미리 분석 관리자
+    """
+    global _speculator
+    if _speculator is None:
+        with _speculator_lock:
+            if _speculator is None:
+                _speculator = Speculator()
+    return _speculator
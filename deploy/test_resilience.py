@@ -0,0 +1,43 @@
+"""
+헤지 요청이 느린 응답의 꼬리 지연(p99)을 줄이는지 확인 (resilience.py)
+
+장애(429/500, 첫 응답 지연)를 주입한 가짜 OpenAI 서버(fake_openai_server.py)에 같은 요청을 보내
+헤지를 끈 설정과 켠 설정의 p99를 비교합니다. (bench_resilience.py의 축소판)
+
+    python -m pytest deploy/test_resilience.py
+"""
+import openai
+
+from bench_resilience import _percentile, run_scenario
+from fake_openai_server import FakeOpenAIServer
+from resilience import LatencyTracker, ResiliencePolicy
+
+REQUESTS = 100
+WARMUP = 40
+CONCURRENCY = 8
+# 5% 요청은 첫 응답이 1초 늦음 (p99에 그대로 드러나는 꼬리 지연)
+SLOW_RATE = 0.05
+SLOW_DELAY = 1.0
+
+
+def _p99(server, **options):
+    client = openai.OpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+    policy = ResiliencePolicy(deadline=10, max_attempts=4, backoff_base=0.05, tracker=LatencyTracker(), **options)
+    # 헤지 기준 지연(첫 토큰 지연의 백분위)을 잡기 위한 사전 요청
+    run_scenario(client, policy, WARMUP, CONCURRENCY)
+    latencies, failures = run_scenario(client, policy, REQUESTS, CONCURRENCY)
+    assert failures == 0
+    return _percentile(latencies, 99)
+
+
+def test_hedging_cuts_tail_latency():
+    with FakeOpenAIServer(
+        chunk_size=64, chunk_delay=0.002, error_rate=0.05, retry_after=0.05,
+        slow_rate=SLOW_RATE, slow_delay=SLOW_DELAY, seed=7
+    ) as server:
+        unhedged = _p99(server, hedge=False)
+        hedged = _p99(server, hedge=True, hedge_percentile=90)
+    assert unhedged >= SLOW_DELAY
+    # 원래 요청과 헤지 요청이 모두 느릴 확률은 0.25%뿐이므로 p99가 느린 응답보다 짧아짐
+    assert hedged < SLOW_DELAY
+    assert hedged < unhedged
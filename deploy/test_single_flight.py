@@ -0,0 +1,110 @@
+"""
+같은 분석 요청이 동시에 여러 번 들어와도 GPT 호출은 한 번만 나가는지 확인 (single_flight.py)
+
+가짜 OpenAI 서버(fake_openai_server.py)가 받은 요청 수로 확인합니다.
+- 스레드 모드: 한 프로세스의 여러 스레드가 동시에 분석
+- 파일 잠금 모드: 캐시 파일을 함께 쓰는 여러 프로세스(워커)가 동시에 분석
+  (Streamlit 앱의 스레드 파이프라인과 API 서버의 asyncio 파이프라인이 섞여 있어도 한 번)
+
+    python -m pytest deploy/test_single_flight.py
+"""
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from fake_openai_server import FakeOpenAIServer
+
+DEPLOY_DIR = Path(__file__).parent
+REQUESTS = 8
+# 응답 하나가 1초쯤 걸리게 해서 모든 요청이 첫 요청이 끝나기 전에 들어오게 함
+CHUNK_DELAY = 0.003
+
+# 워커 프로세스: start_at 시각에 threads개 스레드(pipeline=async이면 코루틴)가 같은 입력을 동시에 분석
+WORKER = """
+import asyncio, sys, threading, time
+from async_analysis import analyze_async
+from reels_extraction import analyze_with_gpt4, extract_reels_info
+
+threads, start_at, pipeline = int(sys.argv[1]), float(sys.argv[2]), sys.argv[3]
+input_data = {
+    "video_analysis": {
+        "transcript": "PPT 만들 때 이 기능 모르면 손해입니다. 디자이너 버튼 하나면 3초 만에 완성돼요.",
+        "caption": "PPT 3초 완성 저장해두고 써보세요",
+        "intro_copy": "PPT 3초 완성",
+        "intro_structure": "", "narration": "", "music": "", "font": ""
+    },
+    "content_info": {"topic": ""}
+}
+info = extract_reels_info(input_data)
+results = []
+
+def run():
+    results.append(analyze_with_gpt4(info, input_data))
+
+async def run_async():
+    results.extend(await asyncio.gather(*(analyze_async(info, input_data) for _ in range(threads))))
+
+workers = [threading.Thread(target=run) for _ in range(threads)]
+time.sleep(max(0.0, start_at - time.time()))
+if pipeline == "async":
+    asyncio.run(run_async())
+else:
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+assert len(results) == threads and len(set(results)) == 1, results
+"""
+
+
+def _spawn(server, tmp_path, mode, threads, start_at, pipeline="sync"):
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=server.base_url,
+        OPENAI_API_KEY="test",
+        SINGLE_FLIGHT_MODE=mode,
+        ANALYSIS_EXECUTION_MODE="single",
+        METRICS_JSON_LOG="0",
+        # 캐시/잠금 파일/기록 저장소를 모두 이 테스트의 임시 디렉토리에 만듦
+        TMPDIR=str(tmp_path)
+    )
+    for name in ("ANALYSIS_CACHE_PATH", "NEAR_DUPLICATE_PATH", "HISTORY_DB_PATH", "JOB_DB_PATH"):
+        env.pop(name, None)
+    return subprocess.Popen(
+        [sys.executable, "-c", WORKER, str(threads), str(start_at), pipeline],
+        cwd=DEPLOY_DIR, env=env
+    )
+
+
+def _wait(processes):
+    for process in processes:
+        assert process.wait(timeout=120) == 0
+
+
+def test_thread_mode_coalesces_concurrent_requests(tmp_path):
+    with FakeOpenAIServer(chunk_delay=CHUNK_DELAY) as server:
+        _wait([_spawn(server, tmp_path, "thread", REQUESTS, time.time() + 3)])
+        assert server.request_count == 1
+
+
+def test_file_mode_coalesces_across_processes(tmp_path):
+    with FakeOpenAIServer(chunk_delay=CHUNK_DELAY) as server:
+        # 프로세스 시작(모듈 import)이 끝난 뒤 같은 시각에 요청하도록 시작 시각을 넉넉히 줌
+        start_at = time.time() + 5
+        _wait([_spawn(server, tmp_path, "file", 2, start_at) for _ in range(REQUESTS // 2)])
+        assert server.request_count == 1
+    # 실행이 끝난 키의 잠금 파일은 남지 않음
+    assert not list((tmp_path / "reels_benchmark" / "locks").iterdir())
+
+
+def test_file_mode_coalesces_sync_and_async_workers(tmp_path):
+    with FakeOpenAIServer(chunk_delay=CHUNK_DELAY) as server:
+        start_at = time.time() + 5
+        _wait([
+            _spawn(server, tmp_path, "file", 2, start_at, pipeline)
+            for pipeline in ("sync", "async", "async", "sync")
+        ])
+        assert server.request_count == 1
+    assert not list((tmp_path / "reels_benchmark" / "locks").iterdir())
@@ -0,0 +1,180 @@
+"""
+릴스 스크립트 정리와 긴 스크립트 줄이기
+
+스크래퍼가 받아 온 스크립트는 음성 인식 결과라 "너무 웃긴다 너무 웃긴다"처럼 같은 말이 반복되고
+"음", "어" 같은 군말이 섞여 있습니다. refine_transcript는 API 호출 없이 이런 부분만 걷어냅니다.
+
+강의처럼 긴 스크립트는 분석 프롬프트 하나에 다 넣으면 컨텍스트 한도를 넘거나 비용이 커지므로,
+문장 단위로 구간을 나눠 구간마다 특징(요약/후킹 문장/구성)을 동시에 정리한 뒤(map)
+도입부 원문과 구간별 정리를 이어 붙인 텍스트로 체크리스트 분석을 합니다(reduce).
+구간 정리 요청과 캐시는 호출하는 쪽(reels_extraction / async_analysis)이 맡습니다.
+"""
+import asyncio
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from api_config import TRANSCRIPT_TOKEN_BUDGET, TRANSCRIPT_CHUNK_TOKENS
+from prompts import CHUNK_MAX_TOKENS, count_tokens
+
+# 단독으로 쓰인 군말 (문장 중간의 "그", "막" 같은 말은 뜻이 있을 수 있어 넣지 않음)
+FILLERS = {"음", "음음", "으음", "흠", "어", "어어", "엄", "아", "에", "um", "uh", "uhm", "umm"}
+# 바로 이어서 반복되면 하나만 남기는 구절의 최대 단어 수
+MAX_REPEAT_WORDS = 8
+# 줄인 스크립트에 원문 그대로 남기는 도입부 길이 (초반 3초 분석용)
+OPENING_TOKENS = 200
+MAX_CHUNK_WORKERS = 8
+# 구간이 많아도 구간 정리 하나에 주는 최소 출력 토큰
+MIN_SUMMARY_TOKENS = 150
+
+_PUNCT_SPLIT = re.compile(r"(?<=[.?!…。])\s+|\n+")
+# 문장부호 없는 음성 인식 결과에서 문장 끝으로 보는 어미
+_SENTENCE_END = re.compile(r"(?:니다|[요죠다까])[.?!…~]*$")
+_LAUGH = re.compile(r"([ㅋㅎㅠㅜ])\1{2,}")
+_REPEATED_PUNCT = re.compile(r"([!?.~])\1+")
+_WORD_KEY = re.compile(r"[^\w]")
+
+
+def _word_key(word):
+    return _WORD_KEY.sub("", word).lower()
+
+
+def _collapse_repeats(words):
+    # 직전에 나온 구절(1~MAX_REPEAT_WORDS 단어)이 바로 다시 나오면 건너뜀
+    out = []
+    keys = []
+    i = 0
+    while i < len(words):
+        for n in range(min(MAX_REPEAT_WORDS, len(out), len(words) - i), 0, -1):
+            if [_word_key(w) for w in words[i:i + n]] == keys[-n:]:
+                i += n
+                break
+        else:
+            out.append(words[i])
+            keys.append(_word_key(words[i]))
+            i += 1
+    return out
+
+
+def refine_transcript(text):
+    """
+    음성 인식 스크립트 정리: 반복 구절/같은 줄 합치기, 군말 빼기, 늘어진 웃음/문장부호 줄이기
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    lines = []
+    for line in text.splitlines():
+        line = _REPEATED_PUNCT.sub(r"\1", _LAUGH.sub(r"\1\1", line))
+        # 군말과 문장부호만 있는 조각은 빼고, 이모지 같은 기호는 남김
+        words = [w for w in line.split() if _word_key(w) not in FILLERS and (_word_key(w) or w.strip(".,!?~…"))]
+        line = " ".join(_collapse_repeats(words))
+        if line and (not lines or _word_key(line) != _word_key(lines[-1])):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def split_sentences(text):
+    """
+    문장 단위로 나눔 (문장부호나 줄바꿈이 없으면 '~니다/~요/~다' 같은 어미 뒤에서 나눔)
+    """
+    sentences = []
+    for segment in _PUNCT_SPLIT.split(text or ""):
+        current = []
+        for word in segment.split():
+            current.append(word)
+            if _SENTENCE_END.search(word):
+                sentences.append(" ".join(current))
+                current = []
+        if current:
+            sentences.append(" ".join(current))
+    return sentences
+
+
+def chunk_transcript(text, max_tokens=TRANSCRIPT_CHUNK_TOKENS):
+    """
+    문장을 이어 붙여 max_tokens 안쪽의 구간 목록으로 나눔 (한 문장이 더 길면 단어 단위로 자름)
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for sentence in split_sentences(text):
+        tokens = count_tokens(sentence)
+        pieces = [sentence]
+        if tokens > max_tokens:
+            pieces, piece = [], []
+            for word in sentence.split():
+                if piece and count_tokens(" ".join(piece + [word])) > max_tokens:
+                    pieces.append(" ".join(piece))
+                    piece = []
+                piece.append(word)
+            pieces.append(" ".join(piece))
+        for piece in pieces:
+            piece_tokens = count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def needs_reduction(text, budget=TRANSCRIPT_TOKEN_BUDGET):
+    return bool(budget) and count_tokens(text) > budget
+
+
+def summary_budget(total, budget=TRANSCRIPT_TOKEN_BUDGET):
+    """
+    구간 정리 하나의 max_tokens (정리를 모두 이어 붙여도 budget 안쪽이 되도록 구간 수로 나눔)
+    """
+    return max(MIN_SUMMARY_TOKENS, min(CHUNK_MAX_TOKENS, (budget - OPENING_TOKENS) // max(total, 1)))
+
+
+def _opening(text, max_tokens=OPENING_TOKENS):
+    words = []
+    for sentence in split_sentences(text):
+        if words and count_tokens(" ".join(words + [sentence])) > max_tokens:
+            break
+        words.append(sentence)
+    return " ".join(words)
+
+
+def join_summaries(text, summaries):
+    """
+    reduce 단계에 넣을 스크립트: 도입부 원문 + 구간별 정리
+    """
+    blocks = [
+        f"(전체 스크립트가 길어 도입부 원문과 구간 {len(summaries)}개의 정리로 줄였습니다)",
+        f"[도입부 원문]\n{_opening(text)}"
+    ]
+    for index, summary in enumerate(summaries, 1):
+        blocks.append(f"[구간 {index}/{len(summaries)}]\n{summary.strip()}")
+    return "\n\n".join(blocks)
+
+
+def reduce_transcript(text, summarize, max_tokens=TRANSCRIPT_CHUNK_TOKENS):
+    """
+    긴 스크립트를 구간별로 동시에 정리해 줄인 텍스트 반환
+    summarize(구간, 순번(1부터), 전체 구간 수, 출력 토큰 한도) -> 정리 텍스트
+    """
+    chunks = chunk_transcript(text, max_tokens)
+    total = len(chunks)
+    limit = summary_budget(total)
+    with ThreadPoolExecutor(max_workers=min(total, MAX_CHUNK_WORKERS) or 1) as pool:
+        summaries = list(pool.map(
+            metrics.bind(lambda item: summarize(item[1], item[0], total, limit)), enumerate(chunks, 1)
+        ))
+    return join_summaries(text, summaries)
+
+
+async def reduce_transcript_async(text, summarize, max_tokens=TRANSCRIPT_CHUNK_TOKENS):
+    """
+    reduce_transcript의 asyncio 버전 (summarize는 코루틴 함수)
+    """
+    chunks = chunk_transcript(text, max_tokens)
+    total = len(chunks)
+    limit = summary_budget(total)
+    summaries = await asyncio.gather(*(
+        summarize(chunk, index, total, limit) for index, chunk in enumerate(chunks, 1)
+    ))
+    return join_summaries(text, summaries)